@@ -0,0 +1,99 @@
+'''
+Concurrent projection of the elements of a synchronous iterable to
+asynchronous sequences, shared by Queryable and AsyncQueryable.
+'''
+
+import asyncio
+import collections
+import inspect
+
+from ._types import is_async_iterable
+
+__author__ = "Sixty North"
+
+
+# The maximum number of elements buffered for each projection which is not
+# being consumed
+BUFFER_SIZE = 64
+
+
+async def generate_concurrent_projections(iterable, projector,
+                                          max_concurrency, ordered):
+    '''Project each element of a synchronous iterable to an awaitable or
+    asynchronous sequence, with at most max_concurrency projections in
+    progress at once, yielding the elements of the projected sequences.
+
+    At most BUFFER_SIZE elements are buffered for each projection in ordered
+    mode, or for all projections together otherwise, so a projection which
+    gets ahead of the consumer is suspended until it catches up.
+
+    Args:
+        iterable: A synchronous iterable over the source elements.
+        projector: A unary function mapping each source element to an async
+            iterable, an iterable or an awaitable of either.
+        max_concurrency: The maximum number of projections in progress.
+        ordered: If True, the elements of each projected sequence are yielded
+            after all of those of the preceding projections and before any of
+            those of the following projections. Otherwise elements are yielded
+            as they arrive from any projection.
+    '''
+    iterator = iter(iterable)
+    shared = None if ordered else asyncio.Queue(BUFFER_SIZE)
+    active = collections.deque()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(active) < max_concurrency:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                queue = asyncio.Queue(BUFFER_SIZE) if ordered else shared
+                task = asyncio.ensure_future(_drain(projector, item, queue))
+                active.append((task, queue))
+
+            if not active:
+                return
+
+            queue = active[0][1] if ordered else shared
+            task, kind, value = await queue.get()
+            if kind is _ITEM:
+                yield value
+                continue
+            if kind is _ERROR:
+                raise value
+            if ordered:
+                active.popleft()
+            else:
+                active.remove(next(entry for entry in active if entry[0] is task))
+    finally:
+        tasks = [task for task, _ in active]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_ITEM = object()
+_DONE = object()
+_ERROR = object()
+
+
+async def _drain(projector, item, queue):
+    '''Put each element of the projection of an item onto a queue, followed
+    by a marker for completion or failure.'''
+    task = asyncio.current_task()
+    try:
+        collection = projector(item)
+        if inspect.isawaitable(collection):
+            collection = await collection
+        if is_async_iterable(collection):
+            async for element in collection:
+                await queue.put((task, _ITEM, element))
+        else:
+            for element in collection:
+                await queue.put((task, _ITEM, element))
+    except Exception as e:
+        await queue.put((task, _ERROR, e))
+    else:
+        await queue.put((task, _DONE, None))
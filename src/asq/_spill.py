@@ -0,0 +1,259 @@
+'''
+Temporary files for spilling intermediate results to disk.
+'''
+
+import heapq
+import itertools
+import pickle
+import tempfile
+from collections import OrderedDict
+
+__author__ = "Sixty North"
+
+
+# The number of items pickled together in each block of a run file
+BLOCK_SIZE = 1024
+
+
+class Run(object):
+    '''A sequence of items pickled to an anonymous temporary file.
+
+    Items are appended with write() and read back, in the order in which they
+    were written, by iterating. The file is created when items are first
+    written and is deleted when the Run is closed or garbage collected.
+    '''
+
+    def __init__(self, directory=None):
+        '''Create an empty Run.
+
+        Args:
+            directory: The directory in which to create the temporary file,
+                or None for the default temporary directory.
+        '''
+        self._directory = directory
+        self._file = None
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def write(self, items):
+        '''Append items to the run.
+
+        Args:
+            items: An iterable of picklable items.
+        '''
+        iterator = iter(items)
+        while True:
+            block = list(itertools.islice(iterator, BLOCK_SIZE))
+            if not block:
+                return
+            if self._file is None:
+                self._file = tempfile.TemporaryFile(dir=self._directory)
+            pickle.dump(block, self._file, pickle.HIGHEST_PROTOCOL)
+            self._count += len(block)
+
+    def __iter__(self):
+        '''Read the items of the run from the start.
+
+        The run may not be written to while it is being read.
+        '''
+        if self._file is None:
+            return
+        self._file.flush()
+        self._file.seek(0)
+        while True:
+            try:
+                block = pickle.load(self._file)
+            except EOFError:
+                return
+            for item in block:
+                yield item
+
+    def close(self):
+        '''Delete the temporary file.'''
+        if self._file is not None:
+            self._file.close()
+
+
+def write_run(items, directory=None):
+    '''Write items to a new Run.
+
+    Args:
+        items: An iterable of picklable items.
+        directory: The directory in which to create the temporary file, or
+            None for the default temporary directory.
+
+    Returns:
+        A Run containing the items.
+    '''
+    run = Run(directory)
+    try:
+        run.write(items)
+    except BaseException:
+        run.close()
+        raise
+    return run
+
+
+# The number of partitions into which the groups of group_pairs() are hashed
+PARTITIONS = 16
+
+# The number of times a partition which is too large is repartitioned
+MAX_REPARTITIONS = 2
+
+
+def group_pairs(pairs, max_items, directory=None, ordered=True):
+    '''Group the values of (key, value) pairs by key with a memory budget.
+
+    Pairs are grouped in memory until max_items values have been read. If
+    the source is not exhausted by then, groups are hash-partitioned by key
+    into temporary files, max_items values at a time, and the partitions are
+    then grouped one at a time. A partition which is still too large is
+    repartitioned with a different hash.
+
+    Args:
+        pairs: An iterable of (key, value) pairs. Keys must be hashable and
+            both keys and values must be picklable.
+        max_items: The maximum number of values to group in memory at once,
+            although a single group larger than this is always held in memory.
+        directory: The directory in which to create temporary files, or None
+            for the default temporary directory.
+        ordered: If True, groups are produced in the order in which their
+            keys were first encountered. If False, groups are produced in an
+            arbitrary order, which avoids writing the grouped partitions to
+            disk again in order to merge them.
+
+    Returns:
+        An iterator over (key, values) pairs, where values is a list of the
+        values for key in source order.
+    '''
+    numbered = enumerate(pairs)
+    groups, count = _fill(numbered, max_items)
+    if count < max_items:
+        return ((key, entry[1]) for key, entry in groups.items())
+    return _generate_spilled_groups(numbered, groups, max_items, directory,
+                                    ordered)
+
+
+def _generate_spilled_groups(numbered, groups, max_items, directory, ordered):
+    runs = [Run(directory) for _ in range(PARTITIONS)]
+    counts = [0] * PARTITIONS
+    sorted_runs = []
+    try:
+        while groups:
+            _flush(groups, runs, counts, 0)
+            groups, _ = _fill(numbered, max_items)
+
+        partitions = _partition_groups(runs, counts, max_items, directory, 0)
+        if not ordered:
+            for partition in partitions:
+                for key, entry in partition.items():
+                    yield key, entry[1]
+            return
+
+        for partition in partitions:
+            records = sorted(((entry[0], key, entry[1])
+                              for key, entry in partition.items()),
+                             key=_first)
+            del partition
+            sorted_runs.append(write_run(records, directory))
+            del records
+
+        for first_seen, key, values in heapq.merge(*sorted_runs, key=_first):
+            yield key, values
+    finally:
+        for run in runs + sorted_runs:
+            run.close()
+
+
+def _first(record):
+    return record[0]
+
+
+def _fill(numbered, max_items):
+    '''Group up to max_items numbered (key, value) pairs in memory.
+
+    Returns:
+        A tuple of a dictionary mapping each key to a list containing the
+        sequence number at which the key was first encountered and a list of
+        values, and the number of pairs read.
+    '''
+    groups = OrderedDict()
+    count = 0
+    for seq, (key, value) in itertools.islice(numbered, max_items):
+        count += 1
+        entry = groups.get(key)
+        if entry is None:
+            groups[key] = [seq, [value]]
+        else:
+            entry[1].append(value)
+    return groups, count
+
+
+def _partition(key, depth):
+    '''The partition of a key, using a different hash at each depth.'''
+    return (hash(key) if depth == 0 else hash((depth, key))) % PARTITIONS
+
+
+def _flush(groups, runs, counts, depth):
+    '''Append in-memory groups to the runs for their partitions.'''
+    buckets = [[] for _ in runs]
+    for key, (first_seen, values) in groups.items():
+        index = _partition(key, depth)
+        buckets[index].append((first_seen, key, values))
+        counts[index] += len(values)
+    for run, bucket in zip(runs, buckets):
+        run.write(bucket)
+
+
+def _partition_groups(runs, counts, max_items, directory, depth):
+    '''Group the records of each partition in memory.
+
+    Yields:
+        For each partition, a dictionary mapping each key to a list of the
+        sequence number at which the key was first encountered and a list of
+        values.
+    '''
+    for run, count in zip(runs, counts):
+        if count > max_items and depth < MAX_REPARTITIONS:
+            for groups in _repartition_groups(run, max_items, directory,
+                                              depth + 1):
+                yield groups
+            continue
+
+        groups = OrderedDict()
+        for first_seen, key, values in run:
+            entry = groups.get(key)
+            if entry is None:
+                groups[key] = [first_seen, values]
+            else:
+                entry[1].extend(values)
+        run.close()
+        yield groups
+
+
+def _repartition_groups(run, max_items, directory, depth):
+    '''Divide the records of an oversized partition between new runs.'''
+    runs = [Run(directory) for _ in range(PARTITIONS)]
+    counts = [0] * PARTITIONS
+    try:
+        buckets = [[] for _ in runs]
+        for record in run:
+            index = _partition(record[1], depth)
+            buckets[index].append(record)
+            counts[index] += len(record[2])
+            if len(buckets[index]) >= BLOCK_SIZE:
+                runs[index].write(buckets[index])
+                buckets[index] = []
+        for sub_run, bucket in zip(runs, buckets):
+            sub_run.write(bucket)
+        del buckets
+        run.close()
+
+        for groups in _partition_groups(runs, counts, max_items, directory,
+                                        depth):
+            yield groups
+    finally:
+        for sub_run in runs:
+            sub_run.close()
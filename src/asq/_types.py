@@ -21,6 +21,18 @@ def is_iterable(obj):
         return False
 
 
+def is_async_iterable(obj):
+    '''Determine if an object is asynchronously iterable.
+
+    Args:
+        obj: The object to be tested for supporting asynchronous iteration.
+
+    Returns:
+        True if the object has an __aiter__ method, otherwise False.
+    '''
+    return callable(getattr(obj, '__aiter__', None))
+
+
 def is_type(obj):
     '''Determine if an object is a type.
 
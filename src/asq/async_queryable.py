@@ -0,0 +1,1937 @@
+'''Queries over asynchronous iterables.
+
+AsyncQueryable offers the query operators of Queryable over asynchronous
+iterables, such as asynchronous generators or database cursors, as well as
+over ordinary iterables. Selectors, predicates and key selectors may be
+ordinary functions or may return awaitables, which are awaited. Operators
+using deferred execution return a new AsyncQueryable, over which the results
+may be retrieved with ``async for``. Operators using immediate execution are
+coroutines, which must be awaited.
+
+Example:
+
+    async def total_size(cursor):
+        return await query_async(cursor).where(is_active) \
+                                        .select(fetch_size, concurrency=16) \
+                                        .sum()
+'''
+
+import asyncio
+import collections
+import inspect
+import operator
+
+from .queryables import Lookup, identity, default, OutOfRangeError
+from .selectors import make_selector
+from .namedelements import IndexedElement, KeyedElement
+from ._types import is_iterable, is_async_iterable, is_type
+
+__author__ = 'Sixty North'
+
+
+class AsyncQueryable(object):
+    '''Queries over asynchronous iterables executed in an event loop.
+
+    AsyncQueryable objects are constructed from asynchronous iterables or from
+    ordinary iterables.
+    '''
+
+    def __init__(self, iterable):
+        '''Construct an AsyncQueryable from any iterable or async iterable.
+
+        Args:
+            iterable: Any object supporting the asynchronous iterator protocol
+                or the iterator protocol.
+
+        Raises:
+            TypeError: If iterable supports neither protocol.
+        '''
+        if not (is_async_iterable(iterable) or is_iterable(iterable)):
+            raise TypeError("Cannot construct AsyncQueryable from "
+                            "non-iterable {0}".format(str(type(iterable))[7: -2]))
+
+        self._iterable = iterable
+
+    def __aiter__(self):
+        '''Support for the asynchronous iterator protocol.
+
+        Returns:
+            An asynchronous iterator over the values in the query result.
+
+        Raises:
+            ValueError: If the AsyncQueryable has been closed().
+        '''
+        if self.closed():
+            raise ValueError("Attempt to use closed() AsyncQueryable")
+
+        return self._aiter()
+
+    def _aiter(self):
+        '''Return an asynchronous iterator over the iterable.'''
+        return _aiter(self._iterable)
+
+    def _create(self, iterable):
+        '''Create an AsyncQueryable using the the supplied iterable.
+
+        This method exists to allow it to be overridden by subclasses of
+        AsyncQueryable.
+        '''
+        return AsyncQueryable(iterable)
+
+    def _create_ordered(self, iterable, direction, func):
+        return OrderedAsyncQueryable(iterable, direction, func)
+
+    async def __aenter__(self):
+        '''Support for the asynchronous context manager protocol.'''
+        return self
+
+    async def __aexit__(self, *_):
+        '''Support for the asynchronous context manager protocol.
+
+        Ensures that close() is called on the AsyncQueryable.
+        '''
+        self.close()
+        return False
+
+    def closed(self):
+        '''Determine whether the AsyncQueryable has been closed.
+
+        Returns:
+            True if closed, otherwise False.
+        '''
+        return self._iterable is None
+
+    def close(self):
+        '''Closes the AsyncQueryable.
+
+        This method is idempotent. Other calls to an AsyncQueryable following
+        close() will raise ValueError.
+        '''
+        self._iterable = None
+
+    def __repr__(self):
+        '''Returns a stringified representation of the AsyncQueryable.
+
+        The string will *not* contain the sequence data.
+        '''
+        return 'AsyncQueryable({0})'.format(repr(self._iterable))
+
+    # Deferred operators
+
+    def select(self, selector, concurrency=1, ordered=True):
+        '''Transforms each element of a sequence into a new form.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            selector: A unary function mapping a value in the source sequence
+                to the corresponding value in the result sequence. If it
+                returns an awaitable, the awaitable is awaited.
+
+            concurrency: The maximum number of selector awaitables in flight
+                at once. With the default of one, each element is awaited
+                before the next is requested from the source.
+
+            ordered: If True (the default) the results are in source order,
+                otherwise they are in order of completion. Only relevant if
+                concurrency is greater than one.
+
+        Returns:
+            An AsyncQueryable over the results of the selector.
+
+        Raises:
+            ValueError: If this AsyncQueryable has been closed.
+            ValueError: If concurrency is less than one.
+            TypeError: If selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call select() on a closed "
+                             "AsyncQueryable.")
+
+        try:
+            selector = make_selector(selector)
+        except ValueError:
+            raise TypeError("select() parameter selector={selector} cannot be"
+                            "converted into a callable "
+                            "selector".format(selector=repr(selector)))
+
+        if concurrency < 1:
+            raise ValueError("select() parameter concurrency={0} must be at "
+                             "least one".format(concurrency))
+
+        if concurrency == 1:
+            return self._create(self._generate_select_result(selector))
+
+        return self._create(_generate_second(_generate_concurrent_result(
+            self, selector, concurrency, ordered)))
+
+    async def _generate_select_result(self, selector):
+        async for item in self:
+            yield await _resolve(selector(item))
+
+    def select_with_index(self, selector=IndexedElement, transform=identity):
+        '''Transforms each element of a sequence into a new form, incorporating
+        the index of the element.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            selector: A binary function mapping the zero-based index of an
+                element and the (transformed) element value to the
+                corresponding value in the result sequence.
+
+            transform: An optional unary function applied to each element
+                before it is passed to the selector.
+
+        Returns:
+            An AsyncQueryable over the results of the selector.
+
+        Raises:
+            ValueError: If this AsyncQueryable has been closed.
+            TypeError: If selector or transform is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call select_with_index() on a "
+                             "closed AsyncQueryable.")
+
+        if not callable(selector):
+            raise TypeError("select_with_index() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        if not callable(transform):
+            raise TypeError("select_with_index() parameter transform={0} is "
+                            "not callable".format(repr(transform)))
+
+        return self._create(self._generate_select_with_index_result(selector,
+                                                                    transform))
+
+    async def _generate_select_with_index_result(self, selector, transform):
+        index = 0
+        async for item in self:
+            item = await _resolve(transform(item))
+            yield await _resolve(selector(index, item))
+            index += 1
+
+    def select_with_correspondence(self, selector,
+                                   result_selector=KeyedElement):
+        '''Apply a callable to each element, generating a sequence of the
+        results of a binary result selector applied to each element and its
+        transformed value.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            selector: A unary function mapping a value in the source sequence
+                to the second argument of the result selector.
+
+            result_selector: A binary function of the source element and the
+                transformed value. The default produces a KeyedElement.
+
+        Returns:
+            An AsyncQueryable over the results of the result_selector.
+
+        Raises:
+            ValueError: If this AsyncQueryable has been closed.
+            TypeError: If selector or result_selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call select_with_correspondence() on "
+                             "a closed AsyncQueryable.")
+
+        if not callable(selector):
+            raise TypeError("select_with_correspondence() parameter "
+                            "selector={0} is not callable".format(repr(selector)))
+
+        if not callable(result_selector):
+            raise TypeError("select_with_correspondence() parameter "
+                            "result_selector={0} is not "
+                            "callable".format(repr(result_selector)))
+
+        return self._create(self._generate_select_with_correspondence_result(
+            selector, result_selector))
+
+    async def _generate_select_with_correspondence_result(self, selector,
+                                                          result_selector):
+        async for item in self:
+            value = await _resolve(selector(item))
+            yield await _resolve(result_selector(item, value))
+
+    def select_many(self, collection_selector=identity,
+                    result_selector=identity):
+        '''Projects each element of a sequence to an intermediate sequence,
+        flattens the resulting sequences into one sequence and optionally
+        transforms the flattened sequence using a selector function.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            collection_selector: A unary function mapping each element of the
+                source to an iterable, an async iterable or an awaitable of
+                either.
+
+            result_selector: An optional unary function mapping the elements
+                of the flattened intermediate sequence to the result sequence.
+
+        Returns:
+            An AsyncQueryable over the flattened, selected elements.
+
+        Raises:
+            ValueError: If this AsyncQueryable has been closed.
+            TypeError: If either selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call select_many() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(collection_selector):
+            raise TypeError("select_many() parameter projector={0} is not "
+                            "callable".format(repr(collection_selector)))
+
+        if not callable(result_selector):
+            raise TypeError("select_many() parameter selector={0} is not "
+                            "callable".format(repr(result_selector)))
+
+        return self._create(self._generate_select_many_result(
+            _enumerated_unary(collection_selector),
+            _correspondence_unary(result_selector)))
+
+    def select_many_with_index(
+            self,
+            collection_selector=IndexedElement,
+            result_selector=lambda source_element,
+                                   collection_element: collection_element):
+        '''Projects each element of a sequence, and its index, to an
+        intermediate sequence, flattens the resulting sequences into one
+        sequence and transforms the flattened sequence using a selector
+        function.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            collection_selector: A binary function mapping the zero-based
+                index and value of each element of the source to an iterable,
+                an async iterable or an awaitable of either.
+
+            result_selector: A binary function mapping each source element
+                and each element of its intermediate sequence to the result.
+
+        Returns:
+            An AsyncQueryable over the flattened, selected elements.
+
+        Raises:
+            ValueError: If this AsyncQueryable has been closed.
+            TypeError: If either selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call select_many_with_index() on a "
+                             "closed AsyncQueryable.")
+
+        if not callable(collection_selector):
+            raise TypeError("select_many_with_index() parameter "
+                            "projector={0} is not "
+                            "callable".format(repr(collection_selector)))
+
+        if not callable(result_selector):
+            raise TypeError("select_many_with_index() parameter "
+                            "selector={0} is not "
+                            "callable".format(repr(result_selector)))
+
+        return self._create(self._generate_select_many_result(
+            collection_selector, result_selector))
+
+    def select_many_with_correspondence(self, collection_selector=identity,
+                                        result_selector=KeyedElement):
+        '''Projects each element of a sequence to an intermediate sequence,
+        flattens the resulting sequences into one sequence and uses a binary
+        selector to incorporate the corresponding source element for each item
+        in the result sequence.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            collection_selector: A unary function mapping each element of the
+                source to an iterable, an async iterable or an awaitable of
+                either.
+
+            result_selector: A binary function mapping each source element
+                and each element of its intermediate sequence to the result.
+                The default produces a KeyedElement.
+
+        Returns:
+            An AsyncQueryable over the flattened, selected elements.
+
+        Raises:
+            ValueError: If this AsyncQueryable has been closed.
+            TypeError: If either selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call select_many_with_correspondence() "
+                             "on a closed AsyncQueryable.")
+
+        if not callable(collection_selector):
+            raise TypeError("select_many_with_correspondence() parameter "
+                            "projector={0} is not "
+                            "callable".format(repr(collection_selector)))
+
+        if not callable(result_selector):
+            raise TypeError("select_many_with_correspondence() parameter "
+                            "selector={0} is not "
+                            "callable".format(repr(result_selector)))
+
+        return self._create(self._generate_select_many_result(
+            _enumerated_unary(collection_selector), result_selector))
+
+    async def _generate_select_many_result(self, collection_selector,
+                                           result_selector):
+        index = 0
+        async for source_element in self:
+            collection = await _resolve(collection_selector(index,
+                                                            source_element))
+            async for collection_element in _aiter(collection):
+                yield await _resolve(result_selector(source_element,
+                                                     collection_element))
+            index += 1
+
+    def where(self, predicate, concurrency=1, ordered=True):
+        '''Filters elements according to whether they match a predicate.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            predicate: A unary function which is applied to each element in the
+                source sequence. If it returns an awaitable, the awaitable is
+                awaited. Source elements for which the predicate returns True
+                will be present in the result.
+
+            concurrency: The maximum number of predicate awaitables in flight
+                at once.
+
+            ordered: If True (the default) the results are in source order,
+                otherwise they are in order of completion. Only relevant if
+                concurrency is greater than one.
+
+        Returns:
+            An AsyncQueryable over those elements of the source sequence for
+            which the predicate is True.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            ValueError: If concurrency is less than one.
+            TypeError: If the predicate is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call where() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(predicate):
+            raise TypeError("where() parameter predicate={predicate} is not "
+                            "callable".format(predicate=repr(predicate)))
+
+        if concurrency < 1:
+            raise ValueError("where() parameter concurrency={0} must be at "
+                             "least one".format(concurrency))
+
+        if concurrency == 1:
+            return self._create(self._generate_where_result(predicate))
+
+        return self._create(_generate_matching_first(_generate_concurrent_result(
+            self, predicate, concurrency, ordered)))
+
+    async def _generate_where_result(self, predicate):
+        async for item in self:
+            if await _resolve(predicate(item)):
+                yield item
+
+    def of_type(self, classinfo):
+        '''Filters elements according to whether they are of a certain type.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            classinfo: If classinfo is neither a class object nor a type object
+                it may be a tuple of class or type objects, or may recursively
+                contain other such tuples (other sequence types are not
+                accepted).
+
+        Returns:
+            An AsyncQueryable over those elements of the source sequence for
+            which the predicate is True.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            TypeError: If classinfo is not a class, type, or tuple of classes,
+                types, and such tuples.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call of_type() on a closed "
+                             "AsyncQueryable.")
+
+        if not is_type(classinfo):
+            raise TypeError("of_type() parameter classinfo={0} is not a class "
+                            "object or a type objector a tuple of class or "
+                            "type objects.".format(classinfo))
+
+        return self.where(lambda x: isinstance(x, classinfo))
+
+    def take(self, count=1):
+        '''Returns a specified number of elements from the start of a sequence.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            count: The number of elements to take.
+
+        Returns:
+            An AsyncQueryable over the first count elements.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call take() on a closed "
+                             "AsyncQueryable.")
+
+        count = max(0, count)
+
+        return self._create(self._generate_take_result(count))
+
+    async def _generate_take_result(self, count):
+        if count == 0:
+            return
+        taken = 0
+        async for item in self:
+            yield item
+            taken += 1
+            if taken == count:
+                return
+
+    def take_while(self, predicate):
+        '''Returns elements from the start while the predicate is True.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            predicate: A unary function returning True or False, or an
+                awaitable of either.
+
+        Returns:
+            An AsyncQueryable over the leading elements for which the predicate
+            is True.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            TypeError: If the predicate is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call take_while() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(predicate):
+            raise TypeError("take_while() parameter predicate={0} is "
+                            "not callable".format(repr(predicate)))
+
+        return self._create(self._generate_take_while_result(predicate))
+
+    async def _generate_take_while_result(self, predicate):
+        async for item in self:
+            if not await _resolve(predicate(item)):
+                return
+            yield item
+
+    def skip(self, count=1):
+        '''Skip the first count contiguous elements of the source sequence.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            count: The number of elements to skip.
+
+        Returns:
+            An AsyncQueryable over the elements following the first count.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call skip() on a closed "
+                             "AsyncQueryable.")
+
+        count = max(0, count)
+
+        if count == 0:
+            return self
+
+        return self._create(self._generate_skip_result(count))
+
+    async def _generate_skip_result(self, count):
+        index = 0
+        async for item in self:
+            if index >= count:
+                yield item
+            index += 1
+
+    def skip_while(self, predicate):
+        '''Omit elements from the start for which a predicate is True.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            predicate: A unary function returning True or False, or an
+                awaitable of either.
+
+        Returns:
+            An AsyncQueryable over the elements from the first for which the
+            predicate is False.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            TypeError: If the predicate is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call skip_while() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(predicate):
+            raise TypeError("skip_while() parameter predicate={0} is "
+                            "not callable".format(repr(predicate)))
+
+        return self._create(self._generate_skip_while_result(predicate))
+
+    async def _generate_skip_while_result(self, predicate):
+        skipping = True
+        async for item in self:
+            if skipping and await _resolve(predicate(item)):
+                continue
+            skipping = False
+            yield item
+
+    def concat(self, second_iterable):
+        '''Concatenates two sequences.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            second_iterable: The iterable or async iterable to concatenate to
+                this sequence.
+
+        Returns:
+            An AsyncQueryable over the concatenated sequences.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            TypeError: If second_iterable is not in fact iterable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call concat() on a closed "
+                             "AsyncQueryable.")
+
+        _check_iterable('concat', second_iterable)
+
+        return self._create(self._generate_concat_result(second_iterable))
+
+    async def _generate_concat_result(self, second_iterable):
+        async for item in self:
+            yield item
+        async for item in _aiter(second_iterable):
+            yield item
+
+    def reverse(self):
+        '''Returns the sequence reversed.
+
+        Note: This method uses deferred execution, but the whole source
+            sequence is consumed once execution commences.
+
+        Returns:
+            The source sequence in reverse order.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call reverse() on a closed "
+                             "AsyncQueryable.")
+
+        return self._create(self._generate_reverse_result())
+
+    async def _generate_reverse_result(self):
+        lst = await self._to_list()
+        for item in reversed(lst):
+            yield item
+
+    def default_if_empty(self, default):
+        '''If the source sequence is empty return a single element sequence
+        containing the supplied default value, otherwise return the source
+        sequence unchanged.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            default: The element to be returned if the source sequence is empty.
+
+        Returns:
+            The source sequence, or if the source sequence is empty a sequence
+            containing a single element with the supplied default value.
+
+        Raises:
+            ValueError: If the AsyncQueryable has been closed.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call default_if_empty() on a "
+                             "closed AsyncQueryable.")
+
+        return self._create(self._generate_default_if_empty_result(default))
+
+    async def _generate_default_if_empty_result(self, default):
+        empty = True
+        async for item in self:
+            empty = False
+            yield item
+        if empty:
+            yield default
+
+    def distinct(self, selector=identity):
+        '''Eliminate duplicate elements from a sequence.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            selector: An optional unary function the result of which is the
+                value compared for uniqueness.
+
+        Returns:
+            An AsyncQueryable over the unique elements, in order of first
+            occurrence.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed().
+            TypeError: If the selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call distinct() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(selector):
+            raise TypeError("distinct() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        return self._create(self._generate_distinct_result(selector))
+
+    async def _generate_distinct_result(self, selector):
+        seen = set()
+        async for item in self:
+            t_item = await _resolve(selector(item))
+            if t_item in seen:
+                continue
+            seen.add(t_item)
+            yield item
+
+    def difference(self, second_iterable, selector=identity):
+        '''Returns those elements which are in the source sequence which are
+        not in the second_iterable.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            second_iterable: Elements from this iterable or async iterable are
+                excluded from the returned sequence. It is consumed in full
+                when iteration commences.
+
+            selector: An optional unary function used to select the values
+                which are compared for equality.
+
+        Returns:
+            An AsyncQueryable over the distinct elements of the source which
+            are not in second_iterable.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed().
+            TypeError: If second_iterable is not in fact iterable.
+            TypeError: If selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call difference() on a closed "
+                             "AsyncQueryable.")
+
+        _check_iterable('difference', second_iterable)
+
+        if not callable(selector):
+            raise TypeError("difference() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        return self._create(self._generate_difference_result(second_iterable,
+                                                             selector))
+
+    async def _generate_difference_result(self, second_iterable, selector):
+        seen_elements = await _selected_set(second_iterable, selector)
+        async for item in self:
+            sitem = await _resolve(selector(item))
+            if sitem not in seen_elements:
+                seen_elements.add(sitem)
+                yield item
+
+    def intersect(self, second_iterable, selector=identity):
+        '''Returns those elements which are both in the source sequence and in
+        the second_iterable.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            second_iterable: Elements are returned if they are also in this
+                iterable or async iterable. It is consumed in full when
+                iteration commences.
+
+            selector: An optional unary function used to select the values
+                which are compared for equality.
+
+        Returns:
+            An AsyncQueryable over the distinct elements of the source which
+            are also in second_iterable.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed().
+            TypeError: If second_iterable is not in fact iterable.
+            TypeError: If selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call intersect() on a closed "
+                             "AsyncQueryable.")
+
+        _check_iterable('intersect', second_iterable)
+
+        if not callable(selector):
+            raise TypeError("intersect() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        return self._create(self._generate_intersect_result(second_iterable,
+                                                            selector))
+
+    async def _generate_intersect_result(self, second_iterable, selector):
+        second_set = await _selected_set(second_iterable, selector)
+        async for item in self:
+            sitem = await _resolve(selector(item))
+            if sitem in second_set:
+                second_set.remove(sitem)
+                yield item
+
+    def union(self, second_iterable, selector=identity):
+        '''Returns those elements which are either in the source sequence or in
+        the second_iterable, or in both.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            second_iterable: Elements from this iterable or async iterable are
+                returned if they are not also in the source sequence.
+
+            selector: An optional unary function used to select the values
+                which are compared for equality.
+
+        Returns:
+            An AsyncQueryable over the distinct elements of both sequences.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed().
+            TypeError: If second_iterable is not in fact iterable.
+            TypeError: If selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call union() on a closed "
+                             "AsyncQueryable.")
+
+        _check_iterable('union', second_iterable)
+
+        return self.concat(second_iterable).distinct(selector)
+
+    def zip(self, second_iterable, result_selector=lambda x, y: (x, y)):
+        '''Elementwise combination of two sequences.
+
+        The length of the result sequence is equal to the length of the
+        shorter of the two input sequences.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            second_iterable: The iterable or async iterable to be combined
+                with the source sequence.
+
+            result_selector: An optional binary function for combining
+                corresponding elements of the source sequences.
+
+        Returns:
+            An AsyncQueryable over the merged elements.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            TypeError: If second_iterable is not in fact iterable.
+            TypeError: If result_selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call zip() on a closed "
+                             "AsyncQueryable.")
+
+        _check_iterable('zip', second_iterable)
+
+        if not callable(result_selector):
+            raise TypeError("zip() parameter result_selector={0} is "
+                            "not callable".format(repr(result_selector)))
+
+        return self._create(self._generate_zip_result(second_iterable,
+                                                      result_selector))
+
+    async def _generate_zip_result(self, second_iterable, result_selector):
+        second = _aiter(second_iterable)
+        async for item in self:
+            try:
+                other = await second.__anext__()
+            except StopAsyncIteration:
+                return
+            yield await _resolve(result_selector(item, other))
+
+    def scan(self, func=operator.add):
+        '''An inclusive prefix sum which returns the cumulative application of
+        the supplied function up to and including the current element.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            func: An optional binary function which is commutative - that is,
+                the order of the arguments is unimportant. Defaults to a
+                summing operator.
+
+        Returns:
+            An AsyncQueryable over the accumulated values.
+
+        Raises:
+            ValueError: If the AsyncQueryable has been closed.
+            TypeError: If func is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call scan() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(func):
+            raise TypeError("scan() parameter func={0} is "
+                            "not callable".format(repr(func)))
+
+        return self._create(self._generate_scan_result(func))
+
+    async def _generate_scan_result(self, func):
+        first = True
+        async for item in self:
+            if first:
+                accumulator = item
+                first = False
+            else:
+                accumulator = await _resolve(func(accumulator, item))
+            yield accumulator
+
+    def pre_scan(self, func=operator.add, seed=0):
+        '''An exclusive prefix sum which returns the cumulative application of
+        the supplied function up to but excluding the current element.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            func: An optional binary function which is commutative. Defaults
+                to a summing operator.
+
+            seed: The first element of the prefix sum and therefore also the
+                first element of the returned sequence.
+
+        Returns:
+            An AsyncQueryable over the accumulated values.
+
+        Raises:
+            ValueError: If the AsyncQueryable has been closed.
+            TypeError: If func is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call pre_scan() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(func):
+            raise TypeError("pre_scan() parameter func={0} is "
+                            "not callable".format(repr(func)))
+
+        return self._create(self._generate_pre_scan_result(func, seed))
+
+    async def _generate_pre_scan_result(self, func, seed):
+        accumulator = seed
+        async for item in self:
+            yield accumulator
+            accumulator = await _resolve(func(accumulator, item))
+
+    def order_by(self, key_selector=identity):
+        '''Sorts by a key in ascending order.
+
+        Note: This method uses deferred execution, but the whole source
+            sequence is consumed once execution commences.
+
+        Args:
+            key_selector: A unary function returning the key for an element,
+                or an awaitable of the key.
+
+        Returns:
+            An OrderedAsyncQueryable over the sorted elements.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed().
+            TypeError: If the key_selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call order_by() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(key_selector):
+            raise TypeError("order_by() parameter key_selector={key_selector} "
+                            "is not callable".format(key_selector=repr(key_selector)))
+
+        return self._create_ordered(self, -1, key_selector)
+
+    def order_by_descending(self, key_selector=identity):
+        '''Sorts by a key in descending order.
+
+        Note: This method uses deferred execution, but the whole source
+            sequence is consumed once execution commences.
+
+        Args:
+            key_selector: A unary function returning the key for an element,
+                or an awaitable of the key.
+
+        Returns:
+            An OrderedAsyncQueryable over the sorted elements.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed().
+            TypeError: If the key_selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call order_by_descending() on a "
+                             "closed AsyncQueryable.")
+
+        if not callable(key_selector):
+            raise TypeError("order_by_descending() parameter key_selector={0} "
+                            "is not callable".format(repr(key_selector)))
+
+        return self._create_ordered(self, +1, key_selector)
+
+    def group_by(self, key_selector=identity, element_selector=identity,
+                 result_selector=lambda key, grouping: grouping):
+        '''Groups the elements according to the value of a key extracted by a
+        selector function.
+
+        Note: This method uses deferred execution, but consumption of a single
+            result will lead to evaluation of the whole source sequence.
+
+        Args:
+            key_selector: An optional unary function used to extract a key from
+                each element in the source sequence.
+
+            element_selector: An optional unary function to map elements in the
+                source sequence to elements in a resulting Grouping.
+
+            result_selector: An optional binary function to create a result
+                from the key and Grouping of each group.
+
+        Returns:
+            An AsyncQueryable over the results of the result_selector, by
+            default the Groupings, in order of first occurrence of each key.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed().
+            TypeError: If any selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call group_by() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(key_selector):
+            raise TypeError("group_by() parameter key_selector={0} is not "
+                            "callable".format(repr(key_selector)))
+
+        if not callable(element_selector):
+            raise TypeError("group_by() parameter element_selector={0} is not "
+                            "callable".format(repr(element_selector)))
+
+        if not callable(result_selector):
+            raise TypeError("group_by() parameter result_selector={0} is not "
+                            "callable".format(repr(result_selector)))
+
+        return self._create(self._generate_group_by_result(
+            key_selector, element_selector, result_selector))
+
+    async def _generate_group_by_result(self, key_selector, element_selector,
+                                        result_selector):
+        lookup = await self.to_lookup(key_selector, element_selector)
+        for grouping in lookup:
+            yield await _resolve(result_selector(grouping.key, grouping))
+
+    def join(self, inner_iterable, outer_key_selector=identity,
+             inner_key_selector=identity,
+             result_selector=lambda outer, inner: (outer, inner)):
+        '''Perform an inner join with a second sequence using selected keys.
+
+        The order of elements from outer is maintained. For each of these the
+        order of elements from inner is also preserved.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            inner_iterable: The iterable or async iterable to join with the
+                outer sequence. It is consumed in full when iteration
+                commences.
+
+            outer_key_selector: An optional unary function to extract keys from
+                elements of the outer (source) sequence.
+
+            inner_key_selector: An optional unary function to extract keys
+                from elements of the inner_iterable.
+
+            result_selector: An optional binary function to create a result
+                element from two matching elements of the outer and inner.
+
+        Returns:
+            An AsyncQueryable over the results of the result_selector.
+
+        Raises:
+            ValueError: If the AsyncQueryable has been closed.
+            TypeError: If the inner_iterable is not in fact iterable.
+            TypeError: If any selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call join() on a closed "
+                             "AsyncQueryable.")
+
+        _check_iterable('join', inner_iterable, 'inner_iterable')
+        _check_join_selectors('join', outer_key_selector, inner_key_selector,
+                              result_selector)
+
+        return self._create(self._generate_join_result(
+            inner_iterable, outer_key_selector, inner_key_selector,
+            result_selector))
+
+    async def _generate_join_result(self, inner_iterable, outer_key_selector,
+                                    inner_key_selector, result_selector):
+        lookup = await self._create(inner_iterable).to_lookup(inner_key_selector)
+        async for outer in self:
+            for inner in lookup[await _resolve(outer_key_selector(outer))]:
+                yield await _resolve(result_selector(outer, inner))
+
+    def group_join(self, inner_iterable, outer_key_selector=identity,
+                   inner_key_selector=identity,
+                   result_selector=lambda outer, grouping: grouping):
+        '''Match elements of two sequences using keys and group the results.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            inner_iterable: The iterable or async iterable to join with the
+                outer sequence. It is consumed in full when iteration
+                commences.
+
+            outer_key_selector: An optional unary function to extract keys from
+                elements of the outer (source) sequence.
+
+            inner_key_selector: An optional unary function to extract keys
+                from elements of the inner_iterable.
+
+            result_selector: An optional binary function to create a result
+                element from an outer element and the Grouping of matching
+                inner elements.
+
+        Returns:
+            An AsyncQueryable with one result for each outer element.
+
+        Raises:
+            ValueError: If the AsyncQueryable has been closed.
+            TypeError: If the inner_iterable is not in fact iterable.
+            TypeError: If any selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call group_join() on a closed "
+                             "AsyncQueryable.")
+
+        _check_iterable('group_join', inner_iterable, 'inner_iterable')
+        _check_join_selectors('group_join', outer_key_selector,
+                              inner_key_selector, result_selector)
+
+        return self._create(self._generate_group_join_result(
+            inner_iterable, outer_key_selector, inner_key_selector,
+            result_selector))
+
+    async def _generate_group_join_result(self, inner_iterable,
+                                          outer_key_selector,
+                                          inner_key_selector, result_selector):
+        lookup = await self._create(inner_iterable).to_lookup(inner_key_selector)
+        async for outer in self:
+            grouping = lookup[await _resolve(outer_key_selector(outer))]
+            yield await _resolve(result_selector(outer, grouping))
+
+    # Immediate operators
+
+    async def to_list(self):
+        '''Convert the source sequence to a list.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call to_list() on a closed "
+                             "AsyncQueryable.")
+
+        return await self._to_list()
+
+    async def _to_list(self):
+        return [item async for item in self]
+
+    async def to_tuple(self):
+        '''Convert the source sequence to a tuple.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call to_tuple() on a closed "
+                             "AsyncQueryable.")
+
+        return tuple(await self._to_list())
+
+    async def to_set(self):
+        '''Convert the source sequence to a set.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If duplicate keys are in the projected source sequence.
+            ValueError: If the AsyncQueryable is closed.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call to_set() on a closed "
+                             "AsyncQueryable.")
+
+        s = set()
+        async for item in self:
+            if item in s:
+                raise ValueError("Duplicate item value {0} in sequence "
+                                 "during to_set()".format(repr(item)))
+            s.add(item)
+        return s
+
+    async def to_lookup(self, key_selector=identity, value_selector=identity):
+        '''Returns a Lookup object, using the provided selectors to generate a
+        key and value for each item.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            TypeError: If either selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call to_lookup() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(key_selector):
+            raise TypeError("to_lookup() parameter key_selector={0} is not "
+                            "callable".format(repr(key_selector)))
+
+        if not callable(value_selector):
+            raise TypeError("to_lookup() parameter value_selector={0} is not "
+                            "callable".format(repr(value_selector)))
+
+        return Lookup(await self._selected_pairs(key_selector, value_selector))
+
+    async def to_dictionary(self, key_selector=identity,
+                            value_selector=identity):
+        '''Build a dictionary from the source sequence.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            TypeError: If either selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call to_dictionary() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(key_selector):
+            raise TypeError("to_dictionary() parameter key_selector={0} is "
+                            "not callable".format(repr(key_selector)))
+
+        if not callable(value_selector):
+            raise TypeError("to_dictionary() parameter value_selector={0} is "
+                            "not callable".format(repr(value_selector)))
+
+        return dict(await self._selected_pairs(key_selector, value_selector))
+
+    async def _selected_pairs(self, key_selector, value_selector):
+        return [(await _resolve(key_selector(item)),
+                 await _resolve(value_selector(item))) async for item in self]
+
+    async def to_str(self, separator=''):
+        '''Build a string from the source sequence.
+
+        Note: This method uses immediate execution.
+
+        Args:
+            separator: An optional separator which will be coerced to a string
+                and inserted between each source item in the resulting string.
+
+        Raises:
+            TypeError: If any element cannot be coerced to a string.
+            ValueError: If the AsyncQueryable is closed.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call to_str() on a closed "
+                             "AsyncQueryable.")
+
+        return str(separator).join([str(item) async for item in self])
+
+    async def count(self, predicate=None):
+        '''Return the number of elements (which match an optional predicate).
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed().
+            TypeError: If predicate is neither None nor a callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call count() on a closed "
+                             "AsyncQueryable.")
+
+        if predicate is not None and not callable(predicate):
+            raise TypeError("count() parameter predicate={0} is "
+                            "not callable".format(repr(predicate)))
+
+        source = self if predicate is None else self.where(predicate)
+        count = 0
+        async for _ in source:
+            count += 1
+        return count
+
+    async def any(self, predicate=None):
+        '''Determine if the source sequence contains any elements which satisfy
+        the predicate.
+
+        Only enough of the sequence to satisfy the predicate once is consumed.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed()
+            TypeError: If predicate is neither None nor a callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call any() on a closed "
+                             "AsyncQueryable.")
+
+        if predicate is None:
+            predicate = bool
+
+        if not callable(predicate):
+            raise TypeError("any() parameter predicate={0} is not "
+                            "callable".format(repr(predicate)))
+
+        async for item in self:
+            if await _resolve(predicate(item)):
+                return True
+        return False
+
+    async def all(self, predicate=bool):
+        '''Determine if all elements in the source sequence satisfy a condition.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed()
+            TypeError: If predicate is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call all() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(predicate):
+            raise TypeError("all() parameter predicate={0} is "
+                            "not callable".format(repr(predicate)))
+
+        async for item in self:
+            if not await _resolve(predicate(item)):
+                return False
+        return True
+
+    async def contains(self, value, equality_comparer=operator.eq):
+        '''Determines whether the sequence contains a particular value.
+
+        Execution is terminated as soon as the value is found.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed()
+            TypeError: If equality_comparer is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call contains() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(equality_comparer):
+            raise TypeError("contains() parameter equality_comparer={0} is "
+                            "not callable".format(repr(equality_comparer)))
+
+        async for item in self:
+            if equality_comparer(value, item):
+                return True
+        return False
+
+    async def min(self, selector=identity):
+        '''Return the minimum value in a sequence.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable has been closed.
+            ValueError: If the sequence is empty.
+            TypeError: If selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call min() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(selector):
+            raise TypeError("min() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        return min(await self.select(selector)._to_list())
+
+    async def max(self, selector=identity):
+        '''Return the maximum value in a sequence.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable has been closed.
+            ValueError: If the sequence is empty.
+            TypeError: If selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call max() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(selector):
+            raise TypeError("max() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        return max(await self.select(selector)._to_list())
+
+    async def sum(self, selector=identity):
+        '''Return the arithmetic sum of the values in the sequence.
+
+        Note: This method uses immediate execution.
+
+        Returns:
+            The total value of the projected sequence, or zero for an empty
+            sequence.
+
+        Raises:
+            ValueError: If the AsyncQueryable has been closed.
+            TypeError: If selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call sum() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(selector):
+            raise TypeError("sum() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        total = 0
+        async for item in self.select(selector):
+            total += item
+        return total
+
+    async def average(self, selector=identity):
+        '''Return the arithmetic mean of the values in the sequence.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable has been closed.
+            ValueError: If the source sequence is empty.
+            TypeError: If selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call average() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(selector):
+            raise TypeError("average() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        total = 0
+        count = 0
+        async for item in self.select(selector):
+            total += item
+            count += 1
+        if count == 0:
+            raise ValueError("Cannot compute average() of an empty sequence.")
+        return total / count
+
+    async def aggregate(self, reducer, seed=default, result_selector=identity):
+        '''Apply a function over a sequence to produce a single result.
+
+        Note: This method uses immediate execution.
+
+        Args:
+            reducer: A binary function of the accumulated value and the next
+                element, returning the new accumulated value or an awaitable
+                of it.
+
+            seed: An optional value used to initialise the accumulator.
+
+            result_selector: An optional unary function applied to the final
+                accumulator value to produce the result.
+
+        Raises:
+            ValueError: If the AsyncQueryable has been closed.
+            ValueError: If called on an empty sequence with no seed value.
+            TypeError: If reducer or result_selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call aggregate() on a closed "
+                             "AsyncQueryable.")
+
+        if not callable(reducer):
+            raise TypeError("aggregate() parameter reducer={0} is "
+                            "not callable".format(repr(reducer)))
+
+        if not callable(result_selector):
+            raise TypeError("aggregate() parameter result_selector={0} is "
+                            "not callable".format(repr(result_selector)))
+
+        accumulator = seed
+        async for item in self:
+            if accumulator is default:
+                accumulator = item
+            else:
+                accumulator = await _resolve(reducer(accumulator, item))
+        if accumulator is default:
+            raise ValueError("Cannot aggregate() empty sequence with no seed "
+                             "value")
+        return await _resolve(result_selector(accumulator))
+
+    async def element_at(self, index):
+        '''Return the element at ordinal index.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed().
+            OutOfRangeError: If index is out of range.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call element_at() on a closed "
+                             "AsyncQueryable.")
+
+        if index < 0:
+            raise OutOfRangeError("Attempt to use negative index.")
+
+        i = 0
+        async for item in self:
+            if i == index:
+                return item
+            i += 1
+        raise OutOfRangeError("element_at(index) out of range.")
+
+    async def first(self, predicate=None):
+        '''The first element in a sequence (optionally satisfying a predicate).
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            ValueError: If the source sequence is empty.
+            ValueError: If there are no elements matching the predicate.
+            TypeError: If the predicate is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call first() on a closed "
+                             "AsyncQueryable.")
+
+        source = self if predicate is None else self.where(predicate)
+        async for item in source:
+            return item
+        if predicate is None:
+            raise ValueError("Cannot return first() from an empty sequence.")
+        raise ValueError("No elements matching predicate in call to first()")
+
+    async def first_or_default(self, default, predicate=None):
+        '''The first element (optionally satisfying a predicate) or a default.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            TypeError: If the predicate is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call first_or_default() on a "
+                             "closed AsyncQueryable.")
+
+        source = self if predicate is None else self.where(predicate)
+        async for item in source:
+            return item
+        return default
+
+    async def single(self, predicate=None):
+        '''The only element (which satisfies a condition).
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            ValueError: If, when predicate is None, the source sequence is
+                empty or contains more than one element.
+            ValueError: If there is not exactly one element matching the
+                predicate.
+            TypeError: If the predicate is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call single() on a closed "
+                             "AsyncQueryable.")
+
+        items = await (self if predicate is None
+                       else self.where(predicate)).take(2)._to_list()
+        if len(items) == 1:
+            return items[0]
+        if predicate is None:
+            if not items:
+                raise ValueError("Cannot return single() from an empty "
+                                 "sequence.")
+            raise ValueError("Sequence for single() contains multiple "
+                             "elements")
+        if not items:
+            raise ValueError("Sequence for single() contains no items "
+                             "matching the predicate.")
+        raise ValueError("Sequence contains more than one value matching "
+                         "single() predicate.")
+
+    async def single_or_default(self, default, predicate=None):
+        '''The only element (which satisfies a condition) or a default.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            ValueError: If there is more than one (matching) element.
+            TypeError: If the predicate is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call single_or_default() on a "
+                             "closed AsyncQueryable.")
+
+        items = await (self if predicate is None
+                       else self.where(predicate)).take(2)._to_list()
+        if not items:
+            return default
+        if len(items) == 1:
+            return items[0]
+        if predicate is None:
+            raise ValueError("Sequence for single_or_default() contains "
+                             "multiple elements.")
+        raise ValueError("Sequence contains more than one value matching "
+                         "single_or_default() predicate.")
+
+    async def last(self, predicate=None):
+        '''The last element in a sequence (optionally satisfying a predicate).
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            ValueError: If the source sequence is empty.
+            ValueError: If there are no elements matching the predicate.
+            TypeError: If the predicate is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call last() on a closed "
+                             "AsyncQueryable.")
+
+        source = self if predicate is None else self.where(predicate)
+        found = False
+        async for item in source:
+            last = item
+            found = True
+        if found:
+            return last
+        if predicate is None:
+            raise ValueError("Cannot return last() from an empty sequence.")
+        raise ValueError("No item matching predicate in call to last().")
+
+    async def last_or_default(self, default, predicate=None):
+        '''The last element (optionally satisfying a predicate) or a default.
+
+        Note: This method uses immediate execution.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            TypeError: If the predicate is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call last_or_default() on a "
+                             "closed AsyncQueryable.")
+
+        source = self if predicate is None else self.where(predicate)
+        last = default
+        async for item in source:
+            last = item
+        return last
+
+    async def sequence_equal(self, second_iterable,
+                             equality_comparer=operator.eq):
+        '''Determine whether two sequences are equal by elementwise comparison.
+
+        Note: This method uses immediate execution.
+
+        Args:
+            second_iterable: The iterable or async iterable to be compared
+                with the source sequence.
+
+            equality_comparer: An optional binary predicate function.
+
+        Raises:
+            ValueError: If the AsyncQueryable is closed.
+            TypeError: If second_iterable is not in fact iterable.
+            TypeError: If equality_comparer is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call sequence_equal() on a closed "
+                             "AsyncQueryable.")
+
+        _check_iterable('sequence_equal', second_iterable)
+
+        if not callable(equality_comparer):
+            raise TypeError("sequence_equal() parameter equality_comparer={0} "
+                            "is not callable".format(repr(equality_comparer)))
+
+        first = self._aiter()
+        second = _aiter(second_iterable)
+        while True:
+            first_item = await _anext(first)
+            second_item = await _anext(second)
+            if first_item is _END or second_item is _END:
+                return first_item is second_item
+            if not equality_comparer(first_item, second_item):
+                return False
+
+
+class OrderedAsyncQueryable(AsyncQueryable):
+    '''An AsyncQueryable representing an ordered sequence.
+
+    The whole source is consumed when iteration commences. The keys for each
+    sort criterion are then computed, awaiting them if necessary, and the
+    elements are sorted with one stable sort pass per key, least significant
+    key first.
+    '''
+
+    def __init__(self, iterable, order, func):
+        '''Create an OrderedAsyncQueryable.
+
+            Args:
+                iterable: The iterable sequence to be ordered.
+                order: -1 for ascending, +1 for descending.
+                func: The function to select the sorting key.
+        '''
+        assert abs(order) == 1, 'order argument must be +1 or -1'
+        super(OrderedAsyncQueryable, self).__init__(iterable)
+        self._funcs = [(order, func)]
+
+    def then_by(self, key_selector=identity):
+        '''Introduce subsequent ordering to the sequence with an optional key.
+
+        Note: This method uses deferred execution.
+
+        Raises:
+            ValueError: If the OrderedAsyncQueryable is closed().
+            TypeError: If key_selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call then_by() on a closed "
+                             "OrderedAsyncQueryable.")
+
+        if not callable(key_selector):
+            raise TypeError("then_by() parameter key_selector={0} is "
+                            "not callable".format(repr(key_selector)))
+
+        self._funcs.append((-1, key_selector))
+        return self
+
+    def then_by_descending(self, key_selector=identity):
+        '''Introduce subsequent descending ordering to the sequence with an
+        optional key.
+
+        Note: This method uses deferred execution.
+
+        Raises:
+            ValueError: If the OrderedAsyncQueryable is closed().
+            TypeError: If key_selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call then_by_descending() on a closed "
+                             "OrderedAsyncQueryable.")
+
+        if not callable(key_selector):
+            raise TypeError("then_by_descending() parameter key_selector={0} "
+                            "is not callable".format(repr(key_selector)))
+
+        self._funcs.append((+1, key_selector))
+        return self
+
+    def _aiter(self):
+        return self._generate_sorted_result()
+
+    async def _generate_sorted_result(self):
+        lst = [item async for item in _aiter(self._iterable)]
+        for direction, func in reversed(self._funcs):
+            if func is identity:
+                lst.sort(reverse=direction == +1)
+                continue
+            decorated = [(await _resolve(func(item)), item) for item in lst]
+            decorated.sort(key=operator.itemgetter(0),
+                           reverse=direction == +1)
+            lst = [item for _, item in decorated]
+        for item in lst:
+            yield item
+
+
+_END = object()
+
+
+def _aiter(iterable):
+    '''An asynchronous iterator over an iterable or an async iterable.'''
+    if is_async_iterable(iterable):
+        return iterable.__aiter__()
+    return _generate_async(iterable)
+
+
+async def _generate_async(iterable):
+    for item in iterable:
+        yield item
+
+
+async def _anext(iterator):
+    '''The next item from an asynchronous iterator, or _END.'''
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return _END
+
+
+async def _resolve(value):
+    '''Await value if it is awaitable, otherwise return it.'''
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+async def _selected_set(iterable, selector):
+    return {await _resolve(selector(item)) async for item in _aiter(iterable)}
+
+
+async def _correspond(func, item):
+    return item, await _resolve(func(item))
+
+
+async def _generate_concurrent_result(source, func, concurrency, ordered):
+    '''Apply func to each element with at most concurrency results awaited
+    at once, yielding (element, result) pairs.
+
+    Args:
+        source: An async iterable.
+        func: A unary function, which may return an awaitable.
+        concurrency: The maximum number of outstanding awaitables.
+        ordered: If True, pairs are yielded in source order, otherwise in
+            order of completion.
+    '''
+    iterator = _aiter(source)
+    pending = collections.deque() if ordered else set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                item = await _anext(iterator)
+                if item is _END:
+                    exhausted = True
+                    break
+                task = asyncio.ensure_future(_correspond(func, item))
+                if ordered:
+                    pending.append(task)
+                else:
+                    pending.add(task)
+
+            if not pending:
+                return
+
+            if ordered:
+                yield await pending.popleft()
+            else:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.remove(task)
+                    yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _generate_second(pairs):
+    try:
+        async for _, second in pairs:
+            yield second
+    finally:
+        await pairs.aclose()
+
+
+async def _generate_matching_first(pairs):
+    try:
+        async for first, matched in pairs:
+            if matched:
+                yield first
+    finally:
+        await pairs.aclose()
+
+
+def _enumerated_unary(func):
+    return lambda index, item: func(item)
+
+
+def _correspondence_unary(func):
+    return lambda source_element, item: func(item)
+
+
+def _check_iterable(name, iterable, parameter='second_iterable'):
+    if not (is_async_iterable(iterable) or is_iterable(iterable)):
+        raise TypeError("Cannot compute {0}() with {1} of non-iterable "
+                        "{2}".format(name, parameter, str(type(iterable))[7: -2]))
+
+
+def _check_join_selectors(name, outer_key_selector, inner_key_selector,
+                          result_selector):
+    if not callable(outer_key_selector):
+        raise TypeError("{0}() parameter outer_key_selector={1} is not "
+                        "callable".format(name, repr(outer_key_selector)))
+
+    if not callable(inner_key_selector):
+        raise TypeError("{0}() parameter inner_key_selector={1} is not "
+                        "callable".format(name, repr(inner_key_selector)))
+
+    if not callable(result_selector):
+        raise TypeError("{0}() parameter result_selector={1} is not "
+                        "callable".format(name, repr(result_selector)))
@@ -0,0 +1,515 @@
+'''Batched execution of queries over columnar data.
+
+A BatchedQueryable carries its elements between operators in batches rather
+than one at a time. Each batch is either a ColumnBatch, a mapping of field
+names to equal length columns, the elements of which are records with one
+attribute per column, or any other sequence, the elements of which are the
+items of the sequence.
+
+The operators of BatchedQueryable which are overridden process whole
+batches:
+
+  select(): An attribute selector created with asq.selectors.a_, or an
+      attribute name, selects a column of each ColumnBatch without creating
+      any records. A projection of attributes created with
+      asq.selectors.project() zips columns. Other selectors are mapped over
+      each batch.
+
+  where(): Predicates on the attributes of records, created with
+      asq.predicates.attr_() and combined with and_(), or_() and not_(), are
+      evaluated over the columns of each ColumnBatch without creating any
+      records. Other predicates are compiled once and used to filter each
+      batch. When NumPy is installed, predicates created by asq.predicates
+      are applied to batches, or columns, which are NumPy arrays as array
+      operations.
+
+  count(), sum(), average(), min(), max(), to_lookup() and group_by(): Each
+      batch, or each selected column of each ColumnBatch, is reduced at once.
+
+All other operators process elements one at a time and return a Queryable.
+Sums are accumulated batch by batch, so floating point results may differ
+from those of Queryable in the least significant digits.
+'''
+
+import itertools
+import operator
+from collections import OrderedDict
+
+from .predicates import (compile_predicate, Predicate, Attribute, Comparison,
+                         Constant, And, Or, Not)
+from .queryables import Queryable, Lookup
+from .record import Record, record_type
+from .selectors import identity, make_selector
+from .vectorized import evaluate_mask, is_array, sum_array, to_python
+
+__author__ = 'Sixty North'
+
+
+class ColumnBatch(object):
+    '''A batch of records stored as columns.
+
+    Iterating over a ColumnBatch produces one record for each row, with one
+    attribute for each column. The values of NumPy array columns are
+    converted to the equivalent Python objects. If the column names cannot
+    be used as the field names of a record_type() the records are Records.
+    '''
+
+    __slots__ = ('columns', '_length')
+
+    def __init__(self, columns):
+        '''Construct a ColumnBatch from a mapping of columns.
+
+        Args:
+            columns: A mapping of field names to sequences, such as lists or
+                NumPy arrays, all of the same length.
+
+        Raises:
+            ValueError: If the columns are not all of the same length.
+        '''
+        self.columns = OrderedDict(columns)
+        lengths = set(map(len, self.columns.values()))
+        if len(lengths) > 1:
+            raise ValueError("ColumnBatch columns have different lengths "
+                             "{lengths}".format(lengths=sorted(lengths)))
+        self._length = lengths.pop() if lengths else 0
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        names = tuple(self.columns)
+        try:
+            cls = record_type(names)
+        except ValueError:
+            cls = _record
+        columns = map(to_python, self.columns.values())
+        for values in zip(*columns):
+            yield cls(**dict(zip(names, values)))
+
+    def __repr__(self):
+        return 'ColumnBatch({0})'.format(
+            ', '.join('{0}=[{1} values]'.format(name, len(column))
+                      for name, column in self.columns.items()))
+
+    def compress(self, mask):
+        '''Select the rows for which the corresponding mask value is True.
+
+        Args:
+            mask: A sequence of truth values, one per row.
+
+        Returns:
+            A new ColumnBatch.
+        '''
+        return ColumnBatch((name, _compress(column, mask))
+                           for name, column in self.columns.items())
+
+    def take(self, indices):
+        '''Select the rows at the given indices.
+
+        Args:
+            indices: A sequence of row indices.
+
+        Returns:
+            A new ColumnBatch.
+        '''
+        return ColumnBatch((name, _take(column, indices))
+                           for name, column in self.columns.items())
+
+
+class BatchedQueryable(Queryable):
+    '''A Queryable which processes its elements in batches.'''
+
+    def __init__(self, batches):
+        '''Construct a BatchedQueryable from an iterable of batches.
+
+        Args:
+            batches: An iterable of batches, each of which is either a
+                ColumnBatch or a sequence of elements.
+
+        Raises:
+            TypeError: If batches does not support the iterator protocol.
+        '''
+        super(BatchedQueryable, self).__init__(batches)
+
+    def _iter(self):
+        return itertools.chain.from_iterable(map(to_python, self._iterable))
+
+    def _create(self, iterable):
+        return Queryable(iterable)
+
+    def _create_batched(self, batches):
+        return BatchedQueryable(batches)
+
+    def batches(self):
+        '''The batches of this BatchedQueryable.
+
+        Note: This method uses deferred execution.
+
+        Returns:
+            A Queryable over the batches, each of which is either a
+            ColumnBatch or a sequence of elements.
+
+        Raises:
+            ValueError: If the BatchedQueryable has been closed.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call batches() on a closed "
+                             "Queryable.")
+
+        return Queryable(self._iterable)
+
+    def select(self, selector):
+        if self.closed():
+            raise ValueError("Attempt to call select() on a closed Queryable.")
+
+        try:
+            selector = make_selector(selector)
+        except ValueError:
+            raise TypeError("select() parameter selector={selector} cannot be"
+                            "converted into a callable "
+                            "selector".format(selector=repr(selector)))
+
+        if selector is identity:
+            return self
+
+        return self._create_batched(
+            self._generate_select_result(selector))
+
+    select.__doc__ = Queryable.select.__doc__
+
+    def _generate_select_result(self, selector):
+        for batch in self._iterable:
+            yield _select_column(batch, selector)
+
+    def where(self, predicate):
+        if self.closed():
+            raise ValueError("Attempt to call where() on a closed Queryable.")
+
+        if not callable(predicate):
+            raise TypeError("where() parameter predicate={predicate} is not "
+                            "callable".format(predicate=repr(predicate)))
+
+        return self._create_batched(self._generate_where_result(predicate))
+
+    where.__doc__ = Queryable.where.__doc__
+
+    def _generate_where_result(self, predicate):
+        compiled = compile_predicate(predicate)
+        if isinstance(predicate, Predicate):
+            predicate = predicate.simplify()
+        for batch in self._iterable:
+            batch = _filter_batch(batch, predicate, compiled)
+            if len(batch):
+                yield batch
+
+    def count(self, predicate=None):
+        if self.closed():
+            raise ValueError("Attempt to call count() on a closed Queryable.")
+
+        if predicate is None:
+            return sum(map(len, self._iterable))
+
+        return super(BatchedQueryable, self).count(predicate)
+
+    count.__doc__ = Queryable.count.__doc__
+
+    def sum(self, selector=identity):
+        if self.closed():
+            raise ValueError("Attempt to call sum() on a closed Queryable.")
+
+        if not callable(selector):
+            raise TypeError("sum() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        return sum(_sum(_select_column(batch, selector))
+                   for batch in self._iterable)
+
+    sum.__doc__ = Queryable.sum.__doc__
+
+    def average(self, selector=identity):
+        if self.closed():
+            raise ValueError("Attempt to call average() on a "
+                             "closed Queryable.")
+
+        if not callable(selector):
+            raise TypeError("average() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        total = 0
+        count = 0
+        for batch in self._iterable:
+            column = _select_column(batch, selector)
+            total += _sum(column)
+            count += len(column)
+        if count == 0:
+            raise ValueError("Cannot compute average() of an empty sequence.")
+        return total / count
+
+    average.__doc__ = Queryable.average.__doc__
+
+    def min(self, selector=identity):
+        if self.closed():
+            raise ValueError("Attempt to call min() on a closed Queryable.")
+
+        if not callable(selector):
+            raise TypeError("min() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        return min(_extreme(min, batch, selector) for batch in self._iterable
+                   if len(batch))
+
+    min.__doc__ = Queryable.min.__doc__
+
+    def max(self, selector=identity):
+        if self.closed():
+            raise ValueError("Attempt to call max() on a closed Queryable.")
+
+        if not callable(selector):
+            raise TypeError("max() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        return max(_extreme(max, batch, selector) for batch in self._iterable
+                   if len(batch))
+
+    max.__doc__ = Queryable.max.__doc__
+
+    def to_lookup(self, key_selector=identity, value_selector=identity):
+        '''Returns a Lookup object, using the provided selector to generate a
+        key for each item.
+
+        The keys and values of each batch are selected as columns, as by
+        select(), and grouped without creating intermediate pairs.
+
+        Note: This method uses immediate execution.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call to_lookup() on a closed Queryable.")
+
+        if not callable(key_selector):
+            raise TypeError("to_lookup() parameter key_selector={key_selector} is not callable".format(
+                    key_selector=repr(key_selector)))
+
+        if not callable(value_selector):
+            raise TypeError("to_lookup() parameter value_selector={value_selector} is not callable".format(
+                    value_selector=repr(value_selector)))
+
+        groups = OrderedDict()
+        for batch in self._iterable:
+            keys = to_python(_select_column(batch, key_selector))
+            values = to_python(_select_column(batch, value_selector))
+            for key, value in zip(keys, values):
+                try:
+                    groups[key].append(value)
+                except KeyError:
+                    groups[key] = [value]
+        return Lookup._from_dict(groups)
+
+
+def batch_rows(iterable, batch_size, fields=None):
+    '''Divide the elements of an iterable into batches.
+
+    Args:
+        iterable: An iterable series of elements.
+        batch_size: The maximum number of elements in each batch.
+        fields: An optional sequence of attribute names. If provided each
+            batch is a ColumnBatch with one column for each named attribute
+            of the elements, otherwise each batch is a list of elements.
+
+    Returns:
+        An iterable over the batches, which may be iterated again if
+        iterable may be.
+
+    Raises:
+        ValueError: If batch_size is less than one.
+    '''
+    if batch_size < 1:
+        raise ValueError("batch_size {0} is less than one".format(batch_size))
+
+    return _Batches(_generate_batch_rows, iterable, batch_size, fields)
+
+
+def _generate_batch_rows(iterable, batch_size, fields):
+    iterator = iter(iterable)
+    while True:
+        rows = list(itertools.islice(iterator, batch_size))
+        if not rows:
+            return
+        if fields is None:
+            yield rows
+        else:
+            yield ColumnBatch((name, list(map(operator.attrgetter(name), rows)))
+                              for name in fields)
+
+
+def batch_columns(columns, batch_size):
+    '''Divide a mapping of columns into ColumnBatches.
+
+    The columns are sliced, so the batches of columns which are NumPy arrays
+    are views of the original arrays.
+
+    Args:
+        columns: A mapping of field names to sequences, such as lists or NumPy
+            arrays, all of the same length.
+        batch_size: The maximum number of rows in each batch.
+
+    Returns:
+        An iterable over the ColumnBatches.
+
+    Raises:
+        ValueError: If batch_size is less than one or the columns are not
+            all of the same length.
+    '''
+    if batch_size < 1:
+        raise ValueError("batch_size {0} is less than one".format(batch_size))
+
+    whole = ColumnBatch(columns)
+    return _Batches(_generate_batch_columns, whole, batch_size)
+
+
+class _Batches(object):
+    '''An iterable which calls a generator function each time it is
+    iterated.'''
+
+    def __init__(self, generator, *args):
+        self._generator = generator
+        self._args = args
+
+    def __iter__(self):
+        return self._generator(*self._args)
+
+
+def _generate_batch_columns(whole, batch_size):
+    for start in range(0, len(whole), batch_size):
+        yield ColumnBatch((name, column[start:start + batch_size])
+                          for name, column in whole.columns.items())
+
+
+def _record(**kwargs):
+    '''Create a Record with any attribute names, including 'self'.'''
+    record = Record()
+    record.__dict__.update(kwargs)
+    return record
+
+
+def _compress(column, mask):
+    if is_array(column) and is_array(mask):
+        return column[mask]
+    return list(itertools.compress(column, mask))
+
+
+def _attribute_name(selector):
+    '''The name of a single attribute selected by selector, or None.'''
+    if type(selector) is operator.attrgetter:
+        names = selector.__reduce__()[1]
+        if len(names) == 1 and '.' not in names[0]:
+            return names[0]
+    return None
+
+
+def _select_column(batch, selector):
+    '''Apply a selector to every element of a batch.
+
+    Returns:
+        A sequence of the selected values.
+    '''
+    if selector is identity:
+        return batch
+    if isinstance(batch, ColumnBatch):
+        name = _attribute_name(selector)
+        if name is not None and name in batch.columns:
+            return batch.columns[name]
+        selectors = getattr(selector, 'selectors', None)
+        if isinstance(selectors, tuple) and selectors:
+            names = [_attribute_name(s) if callable(s) else None
+                     for s in selectors]
+            if all(name in batch.columns for name in names):
+                return list(zip(*(batch.columns[name] for name in names)))
+    return list(map(selector, batch))
+
+
+def _filter_batch(batch, predicate, compiled):
+    if isinstance(batch, ColumnBatch):
+        if _is_columnar(predicate, batch.columns):
+            rows = _select_rows(batch, predicate, range(len(batch)))
+            if len(rows) == len(batch):
+                return batch
+            return batch.take(rows)
+        return batch.compress(list(map(compiled, batch)))
+    if is_array(batch) and batch.ndim == 1:
+        mask = evaluate_mask(batch, predicate)
+        if mask is not None:
+            return batch[mask]
+    return list(filter(compiled, batch))
+
+
+def _take(column, indices):
+    if is_array(column):
+        return column[list(indices)]
+    return list(map(column.__getitem__, indices))
+
+
+def _is_columnar(predicate, columns):
+    '''Determine whether a predicate can be evaluated over the columns of a
+    ColumnBatch.'''
+    if isinstance(predicate, Attribute):
+        return predicate.operands[0] in columns
+    if isinstance(predicate, (And, Or, Not)):
+        return all(_is_columnar(operand, columns)
+                   for operand in predicate.operands)
+    return isinstance(predicate, Constant)
+
+
+def _select_rows(batch, predicate, rows):
+    '''Evaluate a columnar predicate over some of the rows of a ColumnBatch.
+
+    The operands of and_() and or_() are evaluated only for the rows for
+    which they would be evaluated row by row.
+
+    Args:
+        batch: A ColumnBatch.
+        predicate: A predicate for which _is_columnar() is True.
+        rows: An ascending sequence of the indices of the rows to test.
+
+    Returns:
+        A list of the indices in rows of the rows which satisfy predicate.
+    '''
+    if isinstance(predicate, Attribute):
+        name, test = predicate.operands
+        column = batch.columns[name]
+        values = column if len(rows) == len(column) else _take(column, rows)
+        mask = evaluate_mask(values, test) if is_array(values) else None
+        if mask is None and isinstance(test, Comparison):
+            mask = map(test.operator, values, itertools.repeat(test.operands[0]))
+        elif mask is None:
+            mask = map(compile_predicate(test), values)
+        return list(itertools.compress(rows, mask))
+    if isinstance(predicate, And):
+        selected = _select_rows(batch, predicate.operands[0], rows)
+        return _select_rows(batch, predicate.operands[1], selected)
+    if isinstance(predicate, Or):
+        selected = _select_rows(batch, predicate.operands[0], rows)
+        remaining = _difference(rows, selected)
+        return sorted(selected + _select_rows(batch, predicate.operands[1],
+                                              remaining))
+    if isinstance(predicate, Not):
+        return _difference(rows,
+                           _select_rows(batch, predicate.operands[0], rows))
+    return list(rows) if predicate.operands[0] else []
+
+
+def _difference(rows, selected):
+    excluded = set(selected)
+    return [row for row in rows if row not in excluded]
+
+
+def _sum(column):
+    if is_array(column):
+        return sum_array(column)
+    return sum(column)
+
+
+def _extreme(func, batch, selector):
+    column = _select_column(batch, selector)
+    if is_array(column):
+        return getattr(column, func.__name__)().item()
+    return func(column)
@@ -0,0 +1,662 @@
+'''Executors which provide execution resources for parallel queries.
+
+ParallelQueryable dispatches all of its work through the small Executor
+interface defined here, so that any of several backends can be used:
+
+  'multiprocessing': A multiprocessing.Pool. Selectors and elements must be
+      picklable. This is the default.
+
+  'process': A concurrent.futures.ProcessPoolExecutor. Selectors and elements
+      must be picklable.
+
+  'thread': A concurrent.futures.ThreadPoolExecutor. Nothing is pickled, so
+      lambdas may be used, but only I/O-bound selectors, or those which
+      release the GIL, will execute in parallel.
+
+  'free-threaded': As 'thread', but only available on a free-threaded
+      CPython build with the GIL disabled, where pure Python selectors
+      execute in parallel.
+'''
+
+import atexit
+import collections
+import concurrent.futures
+import contextlib
+import functools
+import itertools
+import multiprocessing
+import multiprocessing.pool
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+import weakref
+
+__author__ = 'Sixty North'
+
+
+DEFAULT_BACKEND = 'multiprocessing'
+
+
+def gil_enabled():
+    '''Determine whether the running interpreter has the GIL enabled.
+
+    Returns:
+        False on a free-threaded CPython build running with the GIL disabled,
+        otherwise True.
+    '''
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+class Executor(object):
+    '''The interface through which parallel queries dispatch work.
+
+    Subclasses need only implement submit() and shutdown(). The mapping
+    methods submit the source in chunks, keeping a bounded number of chunks in
+    flight, so that the source is consumed lazily and may be infinite.
+    '''
+
+    def __init__(self, max_in_flight=None):
+        '''Initialise an Executor.
+
+        Args:
+            max_in_flight: The maximum number of submitted chunks which may
+                be outstanding at any time. If omitted, twice the number of
+                CPUs.
+        '''
+        if max_in_flight is None:
+            max_in_flight = 2 * (os.cpu_count() or 1)
+        if max_in_flight < 1:
+            raise ValueError("Executor max_in_flight must be at least one")
+        self._max_in_flight = max_in_flight
+
+    max_in_flight = property(lambda self: self._max_in_flight,
+                             doc="The maximum number of outstanding chunks.")
+
+    def submit(self, func, *args):
+        '''Schedule func(*args) for execution.
+
+        Args:
+            func: The callable to be executed.
+            *args: Positional arguments for func.
+
+        Returns:
+            A concurrent.futures.Future representing the execution.
+        '''
+        raise NotImplementedError
+
+    def shutdown(self, wait=True):
+        '''Release the execution resources of the Executor.
+
+        Args:
+            wait: If True, wait for outstanding work to complete.
+        '''
+        raise NotImplementedError
+
+    def shares_memory(self):
+        '''Determine whether tasks execute in the caller's process, so that
+        module-level state set by the caller is visible to them.
+
+        Returns:
+            True for thread-based executors, otherwise False.
+        '''
+        return False
+
+    @contextlib.contextmanager
+    def sharing(self, value):
+        '''A context manager which makes a read-only value available to
+        tasks, without it being sent with each task.
+
+        Tasks retrieve the value by passing the token to shared_value(). If
+        the Executor shares memory with the caller, tasks read the value from
+        the caller directly. Otherwise the value is pickled once to a
+        temporary file, which each worker loads the first time it needs the
+        value, so the existing workers are reused. The file is deleted on
+        exit, after which each worker discards its copy of the value within
+        SHARED_VALUE_POLL_INTERVAL seconds.
+
+        Args:
+            value: The value to be shared.
+
+        Returns:
+            A context manager yielding a 2-tuple of the Executor to which tasks
+            using the value should be submitted and the token for the value.
+        '''
+        number = next(_shared_value_tokens)
+        if self.shares_memory():
+            token = (number, None)
+            _shared_values[token] = value
+            try:
+                yield self, token
+            finally:
+                del _shared_values[token]
+        else:
+            shared = SharedValue(value, number)
+            try:
+                yield self, shared.token
+            finally:
+                shared.release()
+
+    def map(self, func, iterable, chunksize=None):
+        '''Apply func to each element, returning a list of results in source
+        order.'''
+        return list(self.imap(func, iterable, chunksize))
+
+    def imap(self, func, iterable, chunksize=None):
+        '''Lazily apply func to each element, yielding results in source
+        order.'''
+        return self.imap_chunks(functools.partial(apply_chunk, func),
+                                iterable, chunksize, True)
+
+    def imap_unordered(self, func, iterable, chunksize=None):
+        '''Lazily apply func to each element, yielding results in order of
+        completion.'''
+        return self.imap_chunks(functools.partial(apply_chunk, func),
+                                iterable, chunksize, False)
+
+    def imap_chunks(self, chunk_func, iterable, chunksize=None, ordered=True,
+                    max_in_flight=None):
+        '''Lazily apply a function to whole chunks of the source.
+
+        Args:
+            chunk_func: A unary function executed in a worker which accepts a
+                list of source elements and returns a list of results.
+            iterable: The source elements.
+            chunksize: The number of elements in each chunk. If None, chunks
+                are sized adaptively by an AdaptivePartitioner.
+            ordered: If True, results are yielded in source order, otherwise in
+                order of completion.
+            max_in_flight: The maximum number of chunks submitted but not yet
+                consumed, which in ordered mode bounds the reorder buffer. If
+                None, the max_in_flight of the Executor is used.
+
+        Returns:
+            An iterator over the concatenated results of chunk_func.
+        '''
+        if max_in_flight is None:
+            max_in_flight = self._max_in_flight
+        if max_in_flight < 1:
+            raise ValueError("imap_chunks() max_in_flight must be at least one")
+        return self._generate_chunk_results(chunk_func, iterable, chunksize,
+                                            ordered, max_in_flight)
+
+    def _generate_chunk_results(self, chunk_func, iterable, chunksize,
+                                ordered, max_in_flight):
+        partitioner = create_partitioner(iterable, chunksize)
+        futures = (self.submit(timed_apply, chunk_func, chunk)
+                   for chunk in partitioner)
+        for count, elapsed, results in completed(futures, max_in_flight,
+                                                 ordered):
+            partitioner.record(count, elapsed)
+            for result in results:
+                yield result
+
+
+class PoolExecutor(Executor):
+    '''An Executor backed by a multiprocessing.Pool.'''
+
+    def __init__(self, pool, max_in_flight=None):
+        '''Wrap a multiprocessing pool.
+
+        Args:
+            pool: A multiprocessing.Pool.
+            max_in_flight: The maximum number of outstanding chunks.
+        '''
+        super(PoolExecutor, self).__init__(max_in_flight)
+        self._pool = pool
+
+    pool = property(lambda self: self._pool,
+                    doc="The underlying multiprocessing.Pool.")
+
+    def submit(self, func, *args):
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+        self._pool.apply_async(func, args, callback=future.set_result,
+                               error_callback=future.set_exception)
+        return future
+
+    def shares_memory(self):
+        return isinstance(self._pool, multiprocessing.pool.ThreadPool)
+
+    def shutdown(self, wait=True):
+        if wait:
+            self._pool.close()
+            self._pool.join()
+        else:
+            self._pool.terminate()
+
+
+class FuturesExecutor(Executor):
+    '''An Executor backed by a concurrent.futures.Executor.'''
+
+    def __init__(self, executor, max_in_flight=None):
+        '''Wrap a concurrent.futures executor.
+
+        Args:
+            executor: A concurrent.futures.Executor such as a
+                ThreadPoolExecutor or ProcessPoolExecutor.
+            max_in_flight: The maximum number of outstanding chunks.
+        '''
+        super(FuturesExecutor, self).__init__(max_in_flight)
+        self._executor = executor
+
+    executor = property(lambda self: self._executor,
+                        doc="The underlying concurrent.futures.Executor.")
+
+    def submit(self, func, *args):
+        return self._executor.submit(func, *args)
+
+    def shares_memory(self):
+        return isinstance(self._executor, concurrent.futures.ThreadPoolExecutor)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait)
+
+
+def as_executor(pool):
+    '''Adapt a pool to the Executor interface.
+
+    Args:
+        pool: An Executor, a multiprocessing.Pool or a
+            concurrent.futures.Executor.
+
+    Returns:
+        An Executor.
+
+    Raises:
+        TypeError: If pool is not of a supported type.
+    '''
+    if isinstance(pool, Executor):
+        return pool
+    if isinstance(pool, concurrent.futures.Executor):
+        return FuturesExecutor(pool)
+    if isinstance(pool, multiprocessing.pool.Pool):
+        return PoolExecutor(pool)
+    raise TypeError("Cannot use {0} as an executor for parallel "
+                    "queries".format(repr(pool)))
+
+
+def create_executor(backend=DEFAULT_BACKEND, workers=None):
+    '''Create a new Executor for the named backend.
+
+    Args:
+        backend: One of 'multiprocessing', 'process', 'thread' or
+            'free-threaded'.
+        workers: The number of worker processes or threads. If None, the
+            default for the backend is used.
+
+    Returns:
+        A new Executor, for which the caller is responsible for calling
+        shutdown().
+
+    Raises:
+        ValueError: If backend is not recognised or, for 'free-threaded', if
+            the interpreter has the GIL enabled.
+    '''
+    if backend == 'multiprocessing':
+        return PoolExecutor(multiprocessing.Pool(workers))
+    if backend == 'process':
+        return FuturesExecutor(concurrent.futures.ProcessPoolExecutor(workers))
+    if backend == 'thread':
+        return FuturesExecutor(concurrent.futures.ThreadPoolExecutor(workers))
+    if backend == 'free-threaded':
+        if gil_enabled():
+            raise ValueError("The 'free-threaded' backend requires a "
+                             "free-threaded Python with the GIL disabled")
+        return FuturesExecutor(concurrent.futures.ThreadPoolExecutor(workers))
+    raise ValueError("Unknown parallel backend {0}".format(repr(backend)))
+
+
+_shared_pools = {}
+_shared_pool_workers = None
+_shared_pool_lock = threading.Lock()
+
+
+def set_shared_pool_size(workers=None):
+    '''Configure the number of workers in each shared pool.
+
+    Shared pools are created lazily, so the new size takes effect the next
+    time a pool is required. Any shared pools which are already running are
+    shut down if the size changes.
+
+    Args:
+        workers: The number of worker processes or threads. If None, the
+            default for each backend is used.
+
+    Raises:
+        ValueError: If workers is less than one.
+    '''
+    global _shared_pool_workers
+    if workers is not None and workers < 1:
+        raise ValueError("set_shared_pool_size() workers must be at least "
+                         "one")
+    with _shared_pool_lock:
+        if workers != _shared_pool_workers:
+            _shutdown_shared_pools(None)
+        _shared_pool_workers = workers
+
+
+def shared_pool(backend=DEFAULT_BACKEND):
+    '''The process-wide Executor for a backend, used by ParallelQueryables for
+    which no pool was explicitly supplied.
+
+    The pool is created on first use and reused until shutdown_shared_pool()
+    is called.
+
+    Args:
+        backend: The name of the backend. See create_executor().
+
+    Returns:
+        An Executor.
+    '''
+    with _shared_pool_lock:
+        if backend not in _shared_pools:
+            _shared_pools[backend] = create_executor(backend,
+                                                     _shared_pool_workers)
+        return _shared_pools[backend]
+
+
+def shutdown_shared_pool(backend=None):
+    '''Shut down shared pools, waiting for outstanding work to complete.
+
+    A new shared pool will be created if one is subsequently required. This
+    function is idempotent and is called automatically at interpreter exit.
+
+    Args:
+        backend: The backend for which to shut down the shared pool. If None,
+            the shared pools for all backends are shut down.
+    '''
+    with _shared_pool_lock:
+        _shutdown_shared_pools(backend)
+
+
+def _shutdown_shared_pools(backend):
+    backends = list(_shared_pools) if backend is None else [backend]
+    for name in backends:
+        executor = _shared_pools.pop(name, None)
+        if executor is not None:
+            executor.shutdown()
+
+
+atexit.register(shutdown_shared_pool)
+
+
+# The interval in seconds at which workers discard values shared through
+# temporary files which are no longer shared
+SHARED_VALUE_POLL_INTERVAL = 0.5
+
+_shared_values = {}
+_shared_value_tokens = itertools.count()
+_shared_values_lock = threading.Lock()
+_evictor_pid = None
+
+
+class SharedValue(object):
+    '''A value shared with the workers of process-based Executors through
+    a temporary file.
+
+    The file remains available to tasks, which retrieve the value by passing
+    the token to shared_value(), until the SharedValue is released or
+    garbage collected, so a value which is used by many successive tasks
+    need only be pickled once. Executor.sharing() uses a SharedValue for the
+    lifetime of its context.
+    '''
+
+    def __init__(self, value, number=None):
+        '''Pickle a value to a new temporary file.
+
+        Args:
+            value: The picklable value to be shared.
+            number: The number of the token. If omitted, a new number is
+                allocated.
+        '''
+        if number is None:
+            number = next(_shared_value_tokens)
+        fd, path = tempfile.mkstemp(prefix='asq-shared-')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump(value, file, pickle.HIGHEST_PROTOCOL)
+        except BaseException:
+            os.remove(path)
+            raise
+        self._token = (number, path)
+        self._finalizer = weakref.finalize(self, _remove_file, path)
+
+    token = property(lambda self: self._token,
+                     doc="The token with which tasks retrieve the value.")
+
+    def release(self):
+        '''Delete the temporary file, after which workers discard the value.
+        This method is idempotent.'''
+        self._finalizer()
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def shared_value(token):
+    '''Retrieve a value shared with Executor.sharing(). Executed in a
+    worker.
+
+    A value shared through a temporary file is loaded by each worker the
+    first time it is required, and is retained until the sharing() context
+    which created it exits.
+
+    Args:
+        token: The token yielded by Executor.sharing().
+
+    Returns:
+        The shared value.
+
+    Raises:
+        KeyError: If the value is no longer shared.
+    '''
+    try:
+        return _shared_values[token]
+    except KeyError:
+        if token[1] is None:
+            raise
+    with _shared_values_lock:
+        if token not in _shared_values:
+            _shared_values[token] = _load_shared_value(token)
+            _start_evictor()
+        return _shared_values[token]
+
+
+def _load_shared_value(token):
+    try:
+        with open(token[1], 'rb') as file:
+            return pickle.load(file)
+    except FileNotFoundError:
+        raise KeyError(token)
+
+
+def _start_evictor():
+    '''Start a thread in this process, if there is not already one, which
+    discards loaded values once their files have been deleted.'''
+    global _evictor_pid
+    if _evictor_pid != os.getpid():
+        _evictor_pid = os.getpid()
+        threading.Thread(target=_evict_released_values, daemon=True).start()
+
+
+def _evict_released_values():
+    while True:
+        time.sleep(SHARED_VALUE_POLL_INTERVAL)
+        with _shared_values_lock:
+            for token in list(_shared_values):
+                if token[1] is not None and not os.path.exists(token[1]):
+                    del _shared_values[token]
+
+
+def apply_chunk(func, chunk):
+    '''Apply func to each element of a chunk. Executed in a worker.'''
+    return [func(item) for item in chunk]
+
+
+def timed_apply(chunk_func, chunk):
+    '''Apply chunk_func to a chunk, measuring the time taken. Executed in a
+    worker.
+
+    Returns:
+        A 3-tuple of the number of elements in the chunk, the elapsed time in
+        seconds and the result of chunk_func.
+    '''
+    start = time.perf_counter()
+    result = chunk_func(chunk)
+    return len(chunk), time.perf_counter() - start, result
+
+
+def create_partitioner(iterable, chunksize=None):
+    '''Create a partitioner for an iterable.
+
+    Args:
+        iterable: The iterable to be partitioned.
+        chunksize: A fixed chunk size, or None for adaptive chunk sizes.
+
+    Returns:
+        A FixedPartitioner or an AdaptivePartitioner.
+    '''
+    if chunksize is None:
+        return AdaptivePartitioner(iterable)
+    return FixedPartitioner(iterable, chunksize)
+
+
+class FixedPartitioner(object):
+    '''Lazily splits an iterable into lists of a fixed size.'''
+
+    def __init__(self, iterable, chunksize):
+        '''Create a FixedPartitioner.
+
+        Args:
+            iterable: The iterable to be partitioned.
+            chunksize: The number of elements in each chunk. The last chunk
+                may be shorter.
+
+        Raises:
+            ValueError: If chunksize is less than one.
+        '''
+        if chunksize < 1:
+            raise ValueError("chunksize must be at least one")
+        self._iterable = iterable
+        self._chunksize = chunksize
+
+    def __iter__(self):
+        iterator = iter(self._iterable)
+        while True:
+            chunk = list(itertools.islice(iterator, self._chunksize))
+            if not chunk:
+                return
+            yield chunk
+
+    def record(self, count, elapsed):
+        '''Fixed size chunks ignore measurements.'''
+        pass
+
+
+class AdaptivePartitioner(object):
+    '''Lazily splits an iterable into lists sized to a target wall-time.
+
+    Chunk sizes start at floor and double with each chunk until the time
+    taken to process a chunk has been recorded. Thereafter each chunk is sized
+    so that, at the measured cost per element, it will take approximately
+    target_seconds to process. The source is consumed in a single pass with
+    no intermediate buffering beyond the chunk itself.
+    '''
+
+    def __init__(self, iterable, target_seconds=0.02, floor=1, ceiling=32768):
+        '''Create an AdaptivePartitioner.
+
+        Args:
+            iterable: The iterable to be partitioned.
+            target_seconds: The desired processing time per chunk.
+            floor: The minimum chunk size.
+            ceiling: The maximum chunk size.
+
+        Raises:
+            ValueError: If target_seconds is not positive, or if floor and
+                ceiling do not satisfy 1 <= floor <= ceiling.
+        '''
+        if target_seconds <= 0:
+            raise ValueError("target_seconds must be positive")
+        if not 1 <= floor <= ceiling:
+            raise ValueError("floor and ceiling must satisfy "
+                             "1 <= floor <= ceiling")
+        self._iterable = iterable
+        self._target_seconds = target_seconds
+        self._floor = floor
+        self._ceiling = ceiling
+        self._cost = None
+        self._size = floor
+
+    size = property(lambda self: self._size,
+                    doc="The size of the next chunk.")
+
+    cost = property(lambda self: self._cost,
+                    doc="The estimated time in seconds to process one "
+                        "element, or None if no chunk has been measured.")
+
+    def __iter__(self):
+        iterator = iter(self._iterable)
+        while True:
+            chunk = list(itertools.islice(iterator, self._size))
+            if not chunk:
+                return
+            if self._cost is None:
+                self._size = min(self._size * 2, self._ceiling)
+            yield chunk
+
+    def record(self, count, elapsed):
+        '''Record the time taken to process a chunk.
+
+        Args:
+            count: The number of elements in the chunk.
+            elapsed: The time in seconds taken to process the chunk.
+        '''
+        sample = elapsed / count
+        # An exponentially weighted moving average smooths out noise
+        self._cost = sample if self._cost is None else (self._cost + sample) / 2
+        if self._cost > 0:
+            size = int(self._target_seconds / self._cost)
+        else:
+            size = self._ceiling
+        self._size = max(self._floor, min(size, self._ceiling))
+
+
+def completed(futures, max_in_flight, ordered):
+    '''Lazily submit work and yield the results as they become available.
+
+    Args:
+        futures: An iterable of futures. Since each future is only created when
+            it is drawn from this iterable, it controls the rate of submission.
+        max_in_flight: The maximum number of futures drawn but not yet
+            yielded.
+        ordered: If True, results are yielded in the order of the futures,
+            buffering at most max_in_flight results. If False, results are
+            yielded in order of completion.
+
+    Returns:
+        An iterator over the results of the futures.
+    '''
+    futures = iter(futures)
+    if ordered:
+        pending = collections.deque(itertools.islice(futures, max_in_flight))
+        while pending:
+            result = pending.popleft().result()
+            pending.extend(itertools.islice(futures, 1))
+            yield result
+    else:
+        pending = set(itertools.islice(futures, max_in_flight))
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            pending.update(itertools.islice(futures, len(done)))
+            for future in done:
+                yield future.result()
@@ -28,6 +28,53 @@ def query(iterable):
     return Queryable(iterable)
 
 
+def query_async(iterable):
+    '''Make an asynchronous iterable queryable.
+
+    Use this function as an entry-point to asynchronous queries, the results
+    of which are retrieved with ``async for`` or by awaiting an operator which
+    uses immediate execution.
+
+    Args:
+        iterable: Any object supporting the asynchronous iterator protocol,
+            such as an asynchronous generator, or the iterator protocol.
+
+    Returns:
+        An instance of AsyncQueryable.
+
+    Raises:
+        TypeError: If iterable is not actually iterable
+    '''
+    # Avoid a circular module dependency
+    from .async_queryable import AsyncQueryable
+    return AsyncQueryable(iterable)
+
+
+def query_columns(columns, batch_size=4096):
+    '''Make a mapping of columns queryable in batches.
+
+    Use this function as an entry-point to batched queries over columnar
+    data. The elements of the query are records with one attribute for each
+    column.
+
+    Args:
+        columns: A mapping of field names to sequences, such as lists or NumPy
+            arrays, all of the same length.
+        batch_size: The maximum number of rows in each batch. Defaults to
+            4096.
+
+    Returns:
+        An instance of BatchedQueryable.
+
+    Raises:
+        ValueError: If batch_size is less than one or the columns are not all
+            of the same length.
+    '''
+    # Avoid a circular module dependency
+    from .batched import BatchedQueryable, batch_columns
+    return BatchedQueryable(batch_columns(columns, batch_size))
+
+
 def integers(start, count):
     '''Generates in sequence the integral numbers within a range.
 
@@ -1,21 +1,48 @@
+import contextlib
 import heapq
 import itertools
 import functools
 import multiprocessing
+import operator
+import weakref
 
 # Temporary warning
 import sys
 sys.stderr.write("Warning: The asq parallel query functionality should be "
                  "considered to be alpha quality.")
 
-from .queryables import (Queryable, identity, default)
+from .queryables import (Queryable, Lookup, Grouping, JoinIndex, identity,
+                         default)
+from .executors import (as_executor, shared_pool, set_shared_pool_size,  # noqa
+                        shutdown_shared_pool, shared_value, SharedValue,
+                        DEFAULT_BACKEND)
 
 
-def star(func_and_args):
-    func, args = func_and_args
+# The maximum number of partial results combined by a single task in a
+# parallel reduction
+FAN_IN = 16
+
+
+def star(func, args):
     return func(*args)
 
 
+def singleton(item):
+    return [item]
+
+
+def singleton_with_index(index, item):
+    return [item]
+
+
+def second(first, second):
+    return second
+
+
+def pair(first, second):
+    return (first, second)
+
+
 class ParallelQueryable(Queryable):
     '''
     A parallel version of Queryable using the multiprocessing module.
@@ -23,29 +50,86 @@ class ParallelQueryable(Queryable):
     Warning: This parallel query functionality should be considered to be
         alpha quality.
     '''
-    def __init__(self, iterable, pool=None, chunksize=1):
-        super(ParallelQueryable, self).__init__(iterable)
+    def __init__(self, iterable, pool=None, chunksize=None, backend=None,
+                 ordered=False, max_in_flight=None):
+        '''Construct a ParallelQueryable from any iterable.
+
+        Args:
+            iterable: Any object supporting the iterator protocol.
+
+            pool: An optional multiprocessing.Pool, concurrent.futures.Executor
+                or asq.executors.Executor. If omitted, the shared pool for the
+                backend is used.
 
-        #TODO [asq 2.0] Support for shared pools
+            chunksize: The number of elements sent to a worker in each task.
+                If omitted, chunks are sized adaptively so that each task
+                takes a similar wall-time. See asq.executors.AdaptivePartitioner.
 
-        self._own_pool = pool is None
+            backend: The name of the backend whose shared pool is used if no
+                pool is supplied; one of 'multiprocessing' (the default),
+                'process', 'thread' or 'free-threaded'. See asq.executors.
 
-        if self._own_pool:
-            pool = multiprocessing.Pool()
+            ordered: If True, operators yield their results in source order,
+                otherwise in order of completion.
 
-        self._pool = pool
+            max_in_flight: The maximum number of chunks dispatched but not yet
+                consumed. In ordered mode this bounds the reorder buffer. If
+                omitted, the default for the executor is used.
+
+        Raises:
+            TypeError: If pool is not a supported type of pool.
+            ValueError: If backend is not recognised or is not available.
+        '''
+        super(ParallelQueryable, self).__init__(iterable)
+
+        if pool is None:
+            executor = shared_pool(backend or DEFAULT_BACKEND)
+        else:
+            executor = as_executor(pool)
+
+        self._executor = executor
         self._chunksize = chunksize
+        self._ordered = ordered
+        self._max_in_flight = max_in_flight
 
     def _create(self, iterable):
-        return ParallelQueryable(iterable, self._pool, self._chunksize)
+        return ParallelQueryable(iterable, self._executor, self._chunksize,
+                                 ordered=self._ordered,
+                                 max_in_flight=self._max_in_flight)
+
+    def _map_chunks(self, chunk_func, iterable):
+        '''Dispatch chunks of iterable to the executor, respecting the
+        ordering mode of this ParallelQueryable.
+
+        Args:
+            chunk_func: A picklable unary function accepting a list of
+                elements and returning a list of results.
+            iterable: The source elements.
+
+        Returns:
+            An iterator over the concatenated results.
+        '''
+        return self._executor.imap_chunks(chunk_func, iterable, self._chunksize,
+                                          self._ordered, self._max_in_flight)
+
+    def is_ordered(self):
+        '''Determine whether operators preserve the source order.
+
+        Returns:
+            True if in ordered mode, otherwise False.
+        '''
+        return self._ordered
 
     def _create_ordered(self, iterable, func=None):
-        return OrderedParallelQueryable(iterable, func, self._pool,
-                                        self._chunksize)
+        return OrderedParallelQueryable(iterable, func, self._executor,
+                                        self._chunksize, self._max_in_flight)
 
     def close(self):
-        if self._own_pool:
-            self._pool.close()
+        '''Closes the queryable.
+
+        The executor is not shut down, since it is either a shared pool or was
+        supplied by, and so remains the responsibility of, the caller.
+        '''
         super(ParallelQueryable, self).close()
 
     def select(self, selector):
@@ -71,8 +155,8 @@ class ParallelQueryable(Queryable):
             A generated sequence whose elements are the result of invoking the
             selector function on each element of the source sequence.
         '''
-        return self._create(self._pool.imap_unordered(selector, iter(self),
-                                                      self._chunksize))
+        return self._create(self._map_chunks(
+            functools.partial(select_chunk, selector), iter(self)))
 
     def select_with_index(self, selector):
         '''Transforms each element of a sequence into a new form, incorporating
@@ -101,9 +185,9 @@ class ParallelQueryable(Queryable):
             selector function on each element of the source sequence
         '''
 
-        return self._create(self._pool.imap_unordered(star,
-                                    zip(itertools.repeat(selector),
-                                      enumerate(iter(self))), self._chunksize))
+        return self._create(self._map_chunks(
+            functools.partial(select_chunk, functools.partial(star, selector)),
+            enumerate(iter(self))))
 
     def select_many(self, projector, selector=identity):
         '''Projects each element of a sequence to an intermediate new sequence,
@@ -142,26 +226,59 @@ class ParallelQueryable(Queryable):
             each element of the source sequence using projector function and
             then mapping each element through an optional selector function.
         '''
-        sequences = (self._create(item).select(projector) for item in iter(self))
-        # TODO: [asq 2.0] Without the list() to force evaluation
-        # multiprocessing deadlocks...
-        chained_sequence = list(itertools.chain.from_iterable(sequences))
-        return self._create(self._pool.imap_unordered(selector,
-                                            chained_sequence, self._chunksize))
-
-    # TODO: [asq 2.0] Replace lambda with a named module-scope function
-    def select_many_with_index(self, projector=lambda i, x: [x], selector=identity):
-        sequences = (self._create(item).select_with_index(projector) for item in iter(self))
-        chained_sequence = itertools.chain.from_iterable(sequences)
-        return self._create(self._pool.imap_unordered(selector, chained_sequence, self._chunksize))
-
-    def select_many_with_correspondence(self, projector=lambda x: [x], selector=lambda x, y: y):
-        corresponding_projector = lambda x: (x, projector(x))
-        corresponding_selector = lambda x_y: selector(x_y[0], x_y[1])
-
-        sequences = (Queryable(item).select(corresponding_projector) for item in iter(self))
-        chained_sequence = itertools.chain.from_iterable(sequences)
-        return self._create(self._pool.imap_unordered(corresponding_selector, chained_sequence, self._chunksize))
+        return self._create(self._map_chunks(
+            functools.partial(select_many_chunk, projector, selector),
+            iter(self)))
+
+    def select_many_with_index(self, projector=singleton_with_index,
+                               selector=identity):
+        '''Projects each element of a sequence to an intermediate new sequence,
+        incorporating the index of the element, flattens the resulting sequence
+        into one sequence and optionally transforms the flattened sequence
+        using a selector function.
+
+        Args:
+            projector: A binary function mapping the index of each element of
+                the source sequence and the element itself into an
+                intermediate sequence.
+
+            selector: An optional unary function mapping the elements in the
+                flattened intermediate sequence to corresponding elements of
+                the result sequence.
+
+        Returns:
+            A generated sequence whose elements are the result of projecting
+            each element of the source sequence and its index using the
+            projector function and then mapping each element through an
+            optional selector function.
+        '''
+        return self._create(self._map_chunks(
+            functools.partial(select_many_chunk, functools.partial(star, projector),
+                              selector),
+            enumerate(iter(self))))
+
+    def select_many_with_correspondence(self, projector=singleton,
+                                        selector=second):
+        '''Projects each element of a sequence to an intermediate new sequence,
+        and flattens the resulting sequence, into one sequence and uses a
+        selector function to incorporate the corresponding source for each item
+        in the result sequence.
+
+        Args:
+            projector: A unary function mapping each element of the source
+                sequence into an intermediate sequence.
+
+            selector: An optional binary function mapping each source element
+                and each element of the corresponding intermediate sequence to
+                an element of the result sequence.
+
+        Returns:
+            A generated sequence of the results of the selector function.
+        '''
+        return self._create(self._map_chunks(
+            functools.partial(select_many_with_correspondence_chunk, projector,
+                              selector),
+            iter(self)))
 
     def order_by(self, func=identity):
         return self._create_ordered(iter(self), func)
@@ -169,71 +286,493 @@ class ParallelQueryable(Queryable):
     # TODO: [asq 2.0] order_by_descending
 
     def where(self, predicate):
-        partitions = realize_partitions(iter(self))
-        filterer = functools.partial(filter, predicate)
-        filtered_partitions = self._pool.imap_unordered(filterer, partitions, self._chunksize)
-        return itertools.chain.from_iterable(filtered_partitions)
-
-    def aggregate(self, func, seed=default):
-        partitions = realize_partitions(iter(self))
-        if len(partitions) == 1 and len(partitions[0]) == 1:
+        return self._create(self._map_chunks(
+            functools.partial(filter_chunk, predicate), iter(self)))
+
+    def to_lookup(self, key_selector=identity, value_selector=identity):
+        '''Returns a Lookup object, using the provided selector to generate a
+        key for each item.
+
+        Each worker groups a chunk of the source into a partial lookup. The
+        partial lookups are merged by the caller in source order, so the
+        order of first occurrence of each key, and the order of the values
+        within each group, is the same as for Queryable.to_lookup()
+        regardless of whether this ParallelQueryable is ordered.
+
+        Note: This method uses immediate execution.
+
+        Args:
+            key_selector: A picklable unary function used to extract a key
+                from each element.
+
+            value_selector: A picklable unary function used to extract the
+                value stored for each element.
+
+        Returns:
+            A Lookup.
+
+        Raises:
+            ValueError: If the ParallelQueryable is closed.
+            TypeError: If key_selector is not callable.
+            TypeError: If value_selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call to_lookup() on a closed Queryable.")
+
+        if not callable(key_selector):
+            raise TypeError("to_lookup() parameter key_selector={key_selector} is not callable".format(
+                    key_selector=repr(key_selector)))
+
+        if not callable(value_selector):
+            raise TypeError("to_lookup() parameter value_selector={value_selector} is not callable".format(
+                    value_selector=repr(value_selector)))
+
+        partial_groups = self._executor.imap_chunks(
+            functools.partial(lookup_chunk, key_selector, value_selector),
+            iter(self), self._chunksize, True, self._max_in_flight)
+        return Lookup._from_groups(partial_groups)
+
+    def join(self, inner_iterable, outer_key_selector=identity,
+             inner_key_selector=identity, result_selector=pair):
+        '''Perform an inner join with a second sequence using selected keys.
+
+        The inner sequence is indexed once by the caller. The index is shared
+        read-only with the workers, which probe it with chunks of the outer
+        sequence. For process-based pools the index is pickled once to a
+        temporary file, which each worker of the pool loads on first use.
+
+        In ordered mode the order of elements from outer is maintained. For
+        each of these the order of elements from inner is always preserved.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            inner_iterable: The sequence to join with the outer sequence,
+                or a JoinIndex of it built in advance, in which case
+                inner_key_selector is not used.
+
+            outer_key_selector: An optional picklable unary function to
+                extract keys from elements of the outer (source) sequence. If
+                omitted, the identity function is used.
+
+            inner_key_selector: An optional unary function to extract keys
+                from elements of the inner_iterable. It is called only by the
+                caller. If omitted, the identity function is used.
+
+            result_selector: An optional picklable binary function to create
+                a result element from two matching elements of the outer and
+                inner. If omitted the result elements will be a 2-tuple pair
+                of the matching outer and inner elements.
+
+        Returns:
+            A ParallelQueryable whose elements are the result of performing an
+            inner-join on two sequences.
+
+        Raises:
+            ValueError: If the ParallelQueryable has been closed.
+            TypeError: If the inner_iterable is not in fact iterable.
+            TypeError: If the outer_key_selector is not callable.
+            TypeError: If the inner_key_selector is not callable.
+            TypeError: If the result_selector is not callable.
+        '''
+        return super(ParallelQueryable, self).join(
+            inner_iterable, outer_key_selector, inner_key_selector,
+            result_selector)
+
+    def _generate_join_result(self, inner_iterable, outer_key_selector,
+                              inner_key_selector, result_selector):
+        return self._generate_probe_result(join_chunk, inner_iterable,
+                                           outer_key_selector,
+                                           inner_key_selector, result_selector)
+
+    def group_join(self, inner_iterable, outer_key_selector=identity,
+                   inner_key_selector=identity, result_selector=second):
+        '''Match elements of two sequences using keys and group the results.
+
+        The inner sequence is indexed and shared with the workers as for
+        join().
+
+        Note: This method uses deferred execution.
+
+        Args:
+            inner_iterable: The sequence to join with the outer sequence,
+                or a JoinIndex of it built in advance, in which case
+                inner_key_selector is not used.
+
+            outer_key_selector: An optional picklable unary function to
+                extract keys from elements of the outer (source) sequence. If
+                omitted, the identity function is used.
+
+            inner_key_selector: An optional unary function to extract keys
+                from elements of the inner_iterable. It is called only by the
+                caller. If omitted, the identity function is used.
+
+            result_selector: An optional picklable binary function to create
+                a result element from an outer element and the Grouping of
+                matching inner elements. If omitted, the result elements will
+                be the Groupings directly.
+
+        Returns:
+            A ParallelQueryable over a sequence with one element for each
+            element of the outer sequence as returned by the result_selector.
+
+        Raises:
+            ValueError: If the ParallelQueryable has been closed.
+            TypeError: If the inner_iterable is not in fact iterable.
+            TypeError: If the outer_key_selector is not callable.
+            TypeError: If the inner_key_selector is not callable.
+            TypeError: If the result_selector is not callable.
+        '''
+        return super(ParallelQueryable, self).group_join(
+            inner_iterable, outer_key_selector, inner_key_selector,
+            result_selector)
+
+    def _generate_group_join_result(self, inner_iterable, outer_key_selector,
+                                    inner_key_selector, result_selector):
+        return self._generate_probe_result(group_join_chunk, inner_iterable,
+                                           outer_key_selector,
+                                           inner_key_selector, result_selector)
+
+    def _generate_probe_result(self, probe_chunk, inner_iterable,
+                               outer_key_selector, inner_key_selector,
+                               result_selector):
+        if isinstance(inner_iterable, JoinIndex):
+            sharing = _sharing_index(self._executor, inner_iterable)
+        else:
+            table = dict(lookup_chunk(inner_key_selector, identity,
+                                      inner_iterable))
+            sharing = self._executor.sharing(table)
+        with sharing as (executor, token):
+            results = executor.imap_chunks(
+                functools.partial(probe_chunk, token, outer_key_selector,
+                                  result_selector),
+                iter(self), self._chunksize, self._ordered,
+                self._max_in_flight)
+            for result in results:
+                yield result
+
+    def _reduce(self, chunk_reducer, combiner):
+        '''Reduce the source by a tree reduction.
+
+        Each chunk of the source is reduced to a single partial result in a
+        worker. The partials are then combined in groups of at most FAN_IN,
+        again in the workers, level by level until no more than FAN_IN remain,
+        which are combined by the caller. Chunks are dispatched in ordered
+        mode, so the combiner need be associative but not commutative.
+
+        Args:
+            chunk_reducer: A picklable unary function accepting a non-empty
+                list of source elements and returning a list containing a
+                single partial result.
+
+            combiner: A picklable binary function which combines two partial
+                results.
+
+        Returns:
+            A list containing the single result, or an empty list if the
+            source is empty.
+        '''
+        partials = list(self._executor.imap_chunks(
+            chunk_reducer, iter(self), self._chunksize, True,
+            self._max_in_flight))
+        combine_chunk = functools.partial(reduce_chunk, combiner)
+        while len(partials) > FAN_IN:
+            partials = list(self._executor.imap_chunks(
+                combine_chunk, partials, FAN_IN, True, self._max_in_flight))
+        return reduce_chunk(combiner, partials) if partials else []
+
+    def aggregate(self, reducer, seed=default, result_selector=identity,
+                  combiner=None):
+        '''Apply a function over a sequence to produce a single result.
+
+        The source is reduced by a tree reduction: each chunk is reduced in
+        a worker and the partial results are combined with a bounded fan-in.
+        The reducer must therefore be associative, although it need not be
+        commutative.
+
+        Note: This method uses immediate execution.
+
+        Args:
+            reducer: A picklable binary function the first positional argument
+                of which is an accumulated value and the second is the update
+                value from the source sequence. The return value should be the
+                new accumulated value after the update value has been
+                incorporated.
+
+            seed: An optional value used to initialise the accumulator. If
+                there is no combiner the seed is incorporated once, after the
+                elements have been reduced. If there is a combiner the seed
+                initialises the accumulator for each chunk, so it should be an
+                identity element for the combiner.
+
+            result_selector: An optional unary function applied to the final
+                accumulator value to produce the result. If omitted, defaults
+                to the identity function.
+
+            combiner: An optional picklable binary function which combines two
+                partial accumulator values. If omitted, the reducer is used.
+                A combiner is required if the accumulator is of a different
+                type to the elements, for example when summing the lengths
+                of strings from a seed of zero.
+
+        Raises:
+            ValueError: If the ParallelQueryable is closed.
+            ValueError: If called on an empty sequence with no seed value.
+            TypeError: If reducer is not callable.
+            TypeError: If result_selector is not callable.
+            TypeError: If combiner is neither None nor callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call aggregate() on a "
+                             "closed Queryable.")
+
+        if not callable(reducer):
+            raise TypeError("aggregate() parameter reducer={0} is "
+                            "not callable".format(repr(reducer)))
+
+        if not callable(result_selector):
+            raise TypeError("aggregate() parameter result_selector={0} is "
+                            "not callable".format(repr(result_selector)))
+
+        if combiner is not None and not callable(combiner):
+            raise TypeError("aggregate() parameter combiner={0} is "
+                            "not callable".format(repr(combiner)))
+
+        if combiner is None:
+            result = self._reduce(functools.partial(reduce_chunk, reducer),
+                                  reducer)
+            if seed is not default:
+                result = [reducer(seed, result[0])] if result else [seed]
+        else:
             if seed is default:
-                return partitions[0][0]
+                chunk_reducer = functools.partial(reduce_chunk, reducer)
             else:
-                return func(seed, partitions[0][0])
-        reducer = functools.partial(functools.reduce, func)
-        reduced_partitions = self._pool.map_unordered(reducer, partitions, self._chunksize)
-        return ParallelQueryable(reduced_partitions).aggregate(func, seed)
+                chunk_reducer = functools.partial(fold_chunk, reducer, seed)
+            result = self._reduce(chunk_reducer, combiner)
+            if not result and seed is not default:
+                result = [seed]
 
-    def as_ordered(self):
-        return self._create_ordered(iter(self))
+        if not result:
+            raise ValueError("Cannot aggregate() empty sequence with "
+                             "no seed value")
+        return result_selector(result[0])
 
-    def as_sequential(self):
-        import queryable
-        return queryable.Queryable(iter(self))
+    def count(self, predicate=None):
+        '''Return the number of elements (which match an optional predicate).
 
+        If a predicate is supplied, matching elements are counted in the
+        workers and the counts summed. Otherwise the elements are counted
+        by the caller, since that is cheaper than sending them to a worker.
 
-class OrderedParallelQueryable(ParallelQueryable):
-    '''A ParallelQueryable representing an ordered iterable.
+        Note: This method uses immediate execution.
 
-    Warning: This parallel query functionality should be considered to be
-        alpha quality.
-    '''
+        Args:
+            predicate: An optional picklable unary predicate function used to
+                identify elements which will be counted.
 
-    def __init__(self, iterable, func=None, pool=None, chunksize=1):
-        super(OrderedParallelQueryable, self).__init__(iterable, pool, chunksize)
-        self.funcs = [func] if func is not None else []
+        Returns:
+            The number of elements in the sequence if the predicate is None
+            (the default), or if the predicate is supplied the number of
+            elements for which the predicate evaluates to True.
 
-    def create(self, iterable):
-        return OrderedParallelQueryable(iterable, self._pool, self._chunksize)
+        Raises:
+            ValueError: If the ParallelQueryable is closed().
+            TypeError: If predicate is neither None nor a callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call count() on a "
+                             "closed Queryable.")
 
-    def select(self, selector):
-        '''Transforms each element of a sequence into a new form.
+        if predicate is None:
+            return self._count()
 
-        Each element is transformed through a selector function to produce a
-        value for each value in the source sequence. The generated sequence is
-        lazily evaluated.
+        if not callable(predicate):
+            raise TypeError("count() parameter predicate={0} is "
+                            "not callable".format(repr(predicate)))
+
+        result = self._reduce(functools.partial(count_chunk, predicate),
+                              operator.add)
+        return result[0] if result else 0
+
+    def min(self, selector=identity):
+        '''Return the minimum value in a sequence.
+
+        The minimum of each chunk is found in a worker.
+
+        Note: This method uses immediate execution.
 
         Args:
-            selector: A unary function mapping a value in the source sequence
-                to the corresponding value in the generated generated sequence.
-                The argument of the selector function (which can have any name)
-                is,
+            selector: An optional picklable unary function which will be used
+                to project the elements of the sequence. If omitted, the
+                identity function is used.
 
-                Args:
-                    element: The value of the element
+        Returns:
+            The minimum value of the projected sequence.
 
-                Returns:
-                    The selected value derived from the element value
+        Raises:
+            ValueError: If the ParallelQueryable has been closed.
+            ValueError: If the sequence is empty.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call min() on a closed Queryable.")
+
+        if not callable(selector):
+            raise TypeError("min() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        result = self._reduce(functools.partial(min_chunk, selector), min)
+        if not result:
+            raise ValueError("Cannot compute min() of an empty sequence.")
+        return result[0]
+
+    def max(self, selector=identity):
+        '''Return the maximum value in a sequence.
+
+        The maximum of each chunk is found in a worker.
+
+        Note: This method uses immediate execution.
+
+        Args:
+            selector: An optional picklable unary function which will be used
+                to project the elements of the sequence. If omitted, the
+                identity function is used.
 
         Returns:
-            A generated sequence whose elements are the result of invoking the
-            selector function on each element of the source sequence.
+            The maximum value of the projected sequence.
+
+        Raises:
+            ValueError: If the ParallelQueryable has been closed.
+            ValueError: If the sequence is empty.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call max() on a closed Queryable.")
+
+        if not callable(selector):
+            raise TypeError("max() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        result = self._reduce(functools.partial(max_chunk, selector), max)
+        if not result:
+            raise ValueError("Cannot compute max() of an empty sequence.")
+        return result[0]
+
+    def sum(self, selector=identity):
+        '''Return the arithmetic sum of the values in the sequence.
+
+        Each chunk is summed in a worker.
+
+        Note: This method uses immediate execution.
+
+        Args:
+            selector: An optional picklable unary function which will be used
+                to project the elements of the sequence. If omitted, the
+                identity function is used.
+
+        Returns:
+            The total value of the projected sequence, or zero for an empty
+            sequence.
+
+        Raises:
+            ValueError: If the ParallelQueryable has been closed.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call sum() on a closed Queryable.")
+
+        if not callable(selector):
+            raise TypeError("sum() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        result = self._reduce(functools.partial(sum_chunk, selector),
+                              operator.add)
+        return result[0] if result else 0
+
+    def average(self, selector=identity):
+        '''Return the arithmetic mean of the values in the sequence.
+
+        Each chunk is reduced to a (total, count) pair in a worker.
+
+        Note: This method uses immediate execution.
+
+        Args:
+            selector: An optional picklable unary function which will be used
+                to project the elements of the sequence. If omitted, the
+                identity function is used.
+
+        Returns:
+            The arithmetic mean value of the projected sequence.
+
+        Raises:
+            ValueError: If the ParallelQueryable has been closed.
+            ValueError: If the source sequence is empty.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call average() on a "
+                             "closed Queryable.")
+
+        if not callable(selector):
+            raise TypeError("average() parameter selector={0} is "
+                            "not callable".format(repr(selector)))
+
+        result = self._reduce(functools.partial(average_chunk, selector),
+                              add_pairs)
+        if not result:
+            raise ValueError("Cannot compute average() of an empty sequence.")
+        total, count = result[0]
+        return total / count
+
+    def as_ordered(self, max_in_flight=None):
+        '''Switch to ordered mode, in which operators yield results in source
+        order.
+
+        Results are streamed through a bounded reorder buffer, so the source
+        is never materialized. At most max_in_flight chunks are dispatched but
+        not yet consumed at any time.
+
+        Args:
+            max_in_flight: An optional bound on the number of outstanding
+                chunks. If omitted, the current bound is retained.
+
+        Returns:
+            A ParallelQueryable in ordered mode.
         '''
-        return self.create(self._pool.imap(selector, iter(self), self._chunksize))
+        if max_in_flight is None:
+            max_in_flight = self._max_in_flight
+        return ParallelQueryable(iter(self), self._executor, self._chunksize,
+                                 ordered=True, max_in_flight=max_in_flight)
 
     def as_unordered(self):
-        return self._create(iter(self))
+        '''Switch to unordered mode, in which operators yield results in
+        order of completion.
+
+        Returns:
+            A ParallelQueryable in unordered mode.
+        '''
+        return ParallelQueryable(iter(self), self._executor, self._chunksize,
+                                 ordered=False,
+                                 max_in_flight=self._max_in_flight)
+
+    def as_sequential(self):
+        '''Return a Queryable for serial execution of subsequent operators.'''
+        return Queryable(iter(self))
+
+
+class OrderedParallelQueryable(ParallelQueryable):
+    '''A ParallelQueryable representing an ordered iterable.
+
+    Warning: This parallel query functionality should be considered to be
+        alpha quality.
+    '''
+
+    def __init__(self, iterable, func=None, pool=None, chunksize=None,
+                 max_in_flight=None):
+        super(OrderedParallelQueryable, self).__init__(
+            iterable, pool, chunksize, ordered=True, max_in_flight=max_in_flight)
+        self.funcs = [func] if func is not None else []
+
+    def _create(self, iterable):
+        return ParallelQueryable(iterable, self._executor, self._chunksize,
+                                 ordered=True,
+                                 max_in_flight=self._max_in_flight)
 
     def then_by(self, func=identity):
         self.funcs.append(func)
@@ -242,62 +781,145 @@ class OrderedParallelQueryable(ParallelQueryable):
     # TODO: [asq 2.0] order_by_descending, then_by_descending
 
     def __iter__(self):
-        partitions = realize_partitions(self._iter())
-        # TODO: [asq 2.0] Ensure that the sort is stable
         # TODO: [asq 2.0] Try using functools.partial and respond to
         # http://techguyinmidtown.com/2009/01/23/hack-for-functoolspartial-and-multiprocessing/
         # Actually, maybe functools.partial is pickleable in Python 3
         # http://www.mail-archive.com/python-bugs-list@python.org/msg47732.html
-        sorted_partitions = self._pool.map(sorter, zip(itertools.repeat(self.funcs), partitions), self._chunksize)
-        return heapq.merge(*sorted_partitions)
+        partitions = geometric_partitions(self._iter())
+        sorted_partitions = self._executor.map(
+            sorter, zip(itertools.repeat(self.funcs), partitions), 1)
+        # Partitions are in source order and heapq.merge() prefers earlier
+        # iterables when keys are equal, so the merge is stable
+        merged = heapq.merge(*sorted_partitions, key=operator.itemgetter(0))
+        return (item for _, item in merged)
+
+
+def select_chunk(selector, chunk):
+    return [selector(item) for item in chunk]
+
+
+def filter_chunk(predicate, chunk):
+    return [item for item in chunk if predicate(item)]
+
+
+def select_many_chunk(projector, selector, chunk):
+    return [selector(element) for item in chunk for element in projector(item)]
+
+
+def select_many_with_correspondence_chunk(projector, selector, chunk):
+    return [selector(item, element) for item in chunk
+            for element in projector(item)]
+
+
+def lookup_chunk(key_selector, value_selector, chunk):
+    '''Group a chunk into a list of (key, values) pairs in order of first
+    occurrence.'''
+    groups = {}
+    for item in chunk:
+        key = key_selector(item)
+        value = value_selector(item)
+        if key in groups:
+            groups[key].append(value)
+        else:
+            groups[key] = [value]
+    return list(groups.items())
+
+
+# The SharedValue of the table of each JoinIndex which has been joined using
+# a process-based executor
+_shared_indexes = weakref.WeakKeyDictionary()
+
+
+def _sharing_index(executor, index):
+    '''A context manager sharing the table of a JoinIndex with tasks, as
+    Executor.sharing() does, except that for process-based executors the
+    table is pickled only once and reused until the JoinIndex is garbage
+    collected.'''
+    if executor.shares_memory():
+        return executor.sharing(index._table)
+    shared = _shared_indexes.get(index)
+    if shared is None:
+        shared = _shared_indexes[index] = SharedValue(index._table)
+    return contextlib.nullcontext((executor, shared.token))
+
+
+def join_chunk(token, outer_key_selector, result_selector, chunk):
+    table = shared_value(token)
+    return [result_selector(outer, inner) for outer in chunk
+            for inner in table.get(outer_key_selector(outer), ())]
+
+
+def group_join_chunk(token, outer_key_selector, result_selector, chunk):
+    table = shared_value(token)
+    results = []
+    for outer in chunk:
+        key = outer_key_selector(outer)
+        results.append(result_selector(outer, Grouping._view(key, table.get(key, ()))))
+    return results
+
+
+def reduce_chunk(reducer, chunk):
+    return [functools.reduce(reducer, chunk)]
+
+
+def fold_chunk(reducer, seed, chunk):
+    return [functools.reduce(reducer, chunk, seed)]
+
+
+def count_chunk(predicate, chunk):
+    return [sum(1 for item in chunk if predicate(item))]
+
+
+def min_chunk(selector, chunk):
+    return [min(selector(item) for item in chunk)]
+
+
+def max_chunk(selector, chunk):
+    return [max(selector(item) for item in chunk)]
+
+
+def sum_chunk(selector, chunk):
+    return [sum(selector(item) for item in chunk)]
+
+
+def average_chunk(selector, chunk):
+    return [(sum(selector(item) for item in chunk), len(chunk))]
+
+
+def add_pairs(a, b):
+    return (a[0] + b[0], a[1] + b[1])
 
 
 def sorter(funcs_iterable):
+    '''Stable sort of a partition, returning (key, item) pairs.'''
     funcs, iterable = funcs_iterable
     decorated = [(tuple(func(item) for func in funcs), item) for item in iterable]
-    decorated.sort()
-    undecorated = [item for funcs, item in decorated]
-    return undecorated
-
-
-def realize_partitions(iterable, floor=1, ceiling=32768):
-    '''Partition the input sequence into a list of lists'''
-    return [list(part) for part in geometric_partitions(iterable)]
+    decorated.sort(key=operator.itemgetter(0))
+    return decorated
 
 
 def geometric_partitions(iterable, floor=1, ceiling=32768):
     '''
-    Partition an iterable into chunks.  Returns an iterator over partitions.
+    Partition an iterable into chunks.  Returns an iterator over partitions,
+    each of which is a list.
+
+    The partition size doubles after each run of cpu_count() partitions,
+    until it reaches the ceiling. The iterable is consumed in a single pass.
     '''
+    iterator = iter(iterable)
     partition_size = floor
     run_length = multiprocessing.cpu_count()
     run_count = 0
 
-    try:
-        while True:
-            #print("partition_size =", partition_size)
-            # Split the iterable and replace the original iterator to avoid
-            # advancing it
-            partition, iterable = itertools.tee(iterable)
-
-            # Yield the first partition, limited to the partition size
-            yield Queryable(partition).take(partition_size)
-
-            # Advance to the start of the next partition, this will raise
-            # StopIteration if the iterator is exhausted
-            for i in range(partition_size):
-                next(iterable)
-
-            # If we've reached the end of a run of this size, double the
-            # partition size
-            run_count += 1
-            if run_count >= run_length:
-                partition_size *= 2
-                run_count = 0
-
-            # Unless we have hit the ceiling
-            if partition_size > ceiling:
-                partition_size = ceiling
-
-    except StopIteration:
-        pass
+    while True:
+        partition = list(itertools.islice(iterator, partition_size))
+        if not partition:
+            return
+        yield partition
+
+        # If we've reached the end of a run of this size, double the
+        # partition size, unless we have hit the ceiling
+        run_count += 1
+        if run_count >= run_length:
+            partition_size = min(partition_size * 2, ceiling)
+            run_count = 0
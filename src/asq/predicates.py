@@ -1,8 +1,502 @@
-'''Predicate function factories'''
+'''Predicate function factories
+
+The factories and combinators in this module return Predicate objects. These
+are callable, so they can be used anywhere a unary predicate function is
+required, but unlike plain functions they can be inspected: each exposes an
+operator attribute, the function from the standard operator module which it
+applies, and an operands attribute, a tuple of the values or predicates to
+which it is applied. Query engines use these to evaluate predicates more
+efficiently, for example by compiling a tree of combined predicates into a
+single function.
+'''
+
+import keyword
+import operator
 
 __author__ = 'Sixty North'
 
 
+# The estimated relative cost of calling a predicate which is not a Predicate
+# object and so cannot be inspected.
+OPAQUE_COST = 10
+
+
+class Predicate(object):
+    '''The base class of inspectable unary predicates.
+
+    Subclasses must set the operator and operands attributes and implement
+    __call__(), _source() and _rebuild().
+    '''
+
+    __slots__ = ('operator', 'operands', '_compiled')
+
+    def __init__(self, op, *operands):
+        self.operator = op
+        self.operands = operands
+        self._compiled = None
+
+    def __call__(self, lhs):
+        raise NotImplementedError
+
+    def __reduce__(self):
+        return (type(self), self.operands)
+
+    def __repr__(self):
+        return '{name}({operands})'.format(
+            name=self._name, operands=', '.join(map(repr, self.operands)))
+
+    def cost(self):
+        '''Estimate the relative cost of evaluating this predicate.
+
+        Returns:
+            A number, where a single comparison has a cost of one.
+        '''
+        return 1
+
+    def simplify(self):
+        '''Fold constants and eliminate redundant operations.
+
+        The simplified predicate returns the same truth value as this
+        predicate for every argument, but may not evaluate every operand of
+        the original. The rules applied are double negation, absorption of
+        the constants True and False, and combination of a predicate with
+        itself or its negation. Operands which are not Predicate objects may
+        have side effects, so they are never treated as equal to one another
+        and are never removed if the original would have called them.
+
+        Returns:
+            An equivalent Predicate, which may be this predicate.
+        '''
+        return self
+
+    def reorder(self):
+        '''Reorder the operands of conjunctions and disjunctions so that
+        the operand with the lower estimated cost is evaluated first.
+
+        Reordering is only valid if evaluating the operands has no side
+        effects and neither operand raises an exception for arguments which
+        the other operand would have excluded. For example and_(ne_(None),
+        gt_(5)) relies on its order to avoid comparing None with five.
+
+        Returns:
+            An equivalent Predicate, which may be this predicate.
+        '''
+        return self
+
+    def compile(self, reorder=False):
+        '''Compile this predicate into a single function.
+
+        The operator tree is simplified and translated into one generated
+        function in which comparisons are evaluated inline, avoiding a
+        function call for each node of the tree. Operands which are not
+        Predicate objects are called from the generated function.
+
+        Args:
+            reorder: If True, operands are reordered by estimated cost before
+                compilation. See reorder() for when this is valid. Defaults to
+                False.
+
+        Returns:
+            A unary function returning the same truth values as this
+            predicate.
+        '''
+        if reorder:
+            return _compile(self.simplify().reorder())
+        if self._compiled is None:
+            self._compiled = _compile(self.simplify())
+        return self._compiled
+
+    def _source(self, constants, lhs='lhs'):
+        '''Return a Python expression which evaluates this predicate.
+
+        Args:
+            constants: A list to which any values referred to by the
+                expression are appended. The expression refers to the value
+                at index i as _ki.
+            lhs: The expression for the argument of the predicate.
+        '''
+        raise NotImplementedError
+
+
+class Comparison(Predicate):
+    '''A predicate which compares its argument with a value.'''
+
+    __slots__ = ()
+
+    _SYMBOLS = {operator.eq: ('eq_', '=='),
+                operator.ne: ('ne_', '!='),
+                operator.lt: ('lt_', '<'),
+                operator.le: ('le_', '<='),
+                operator.ge: ('ge_', '>='),
+                operator.gt: ('gt_', '>'),
+                operator.is_: ('is_', 'is')}
+
+    def __init__(self, op, rhs):
+        if op not in self._SYMBOLS:
+            raise ValueError("Comparison operator {op} is not "
+                             "supported".format(op=repr(op)))
+        super(Comparison, self).__init__(op, rhs)
+
+    def __call__(self, lhs):
+        return self.operator(lhs, self.operands[0])
+
+    def __reduce__(self):
+        return (Comparison, (self.operator, self.operands[0]))
+
+    @property
+    def _name(self):
+        return self._SYMBOLS[self.operator][0]
+
+    def _source(self, constants, lhs='lhs'):
+        constants.append(self.operands[0])
+        return '({lhs} {symbol} _k{i})'.format(
+            lhs=lhs, symbol=self._SYMBOLS[self.operator][1],
+            i=len(constants) - 1)
+
+
+class Contains(Predicate):
+    '''A predicate which tests whether its argument contains a value.'''
+
+    __slots__ = ()
+
+    _name = 'contains_'
+
+    def __init__(self, lhs):
+        super(Contains, self).__init__(operator.contains, lhs)
+
+    def __call__(self, rhs):
+        return self.operands[0] in rhs
+
+    def cost(self):
+        return 2
+
+    def _source(self, constants, lhs='lhs'):
+        constants.append(self.operands[0])
+        return '(_k{i} in {lhs})'.format(i=len(constants) - 1, lhs=lhs)
+
+
+class Constant(Predicate):
+    '''A predicate which ignores its argument and returns a constant.
+
+    Constants are produced by simplify(). They have no operator.
+    '''
+
+    __slots__ = ()
+
+    _name = 'Constant'
+
+    def __init__(self, value):
+        super(Constant, self).__init__(None, bool(value))
+
+    def __call__(self, lhs):
+        return self.operands[0]
+
+    def cost(self):
+        return 0
+
+    def _source(self, constants, lhs='lhs'):
+        return repr(self.operands[0])
+
+
+class Not(Predicate):
+    '''The logical inverse of a predicate.'''
+
+    __slots__ = ()
+
+    _name = 'not_'
+
+    def __init__(self, predicate):
+        super(Not, self).__init__(operator.not_, predicate)
+
+    def __call__(self, lhs):
+        return not self.operands[0](lhs)
+
+    def cost(self):
+        return _cost(self.operands[0])
+
+    def simplify(self):
+        predicate = _simplify(self.operands[0])
+        if isinstance(predicate, Constant):
+            return Constant(not predicate.operands[0])
+        if isinstance(predicate, Not):
+            return predicate.operands[0]
+        return self if predicate is self.operands[0] else Not(predicate)
+
+    def reorder(self):
+        predicate = _reorder(self.operands[0])
+        return self if predicate is self.operands[0] else Not(predicate)
+
+    def _source(self, constants, lhs='lhs'):
+        return '(not {0})'.format(_source(self.operands[0], constants, lhs))
+
+
+class _Binary(Predicate):
+    '''The base class of the binary predicate combinators.'''
+
+    __slots__ = ()
+
+    def __init__(self, predicate1, predicate2):
+        super(_Binary, self).__init__(self._operator, predicate1, predicate2)
+
+    def cost(self):
+        return _cost(self.operands[0]) + _cost(self.operands[1])
+
+    def simplify(self):
+        predicate1, predicate2 = map(_simplify, self.operands)
+        result = self._fold(predicate1, predicate2)
+        if result is not None:
+            return result
+        if predicate1 is self.operands[0] and predicate2 is self.operands[1]:
+            return self
+        return type(self)(predicate1, predicate2)
+
+    def reorder(self):
+        predicate1, predicate2 = map(_reorder, self.operands)
+        if predicate1 is self.operands[0] and predicate2 is self.operands[1]:
+            return self
+        return type(self)(predicate1, predicate2)
+
+    def _fold(self, predicate1, predicate2):
+        '''Combine simplified operands, returning None if no rule applies.'''
+        return None
+
+    def _source(self, constants, lhs='lhs'):
+        return '({0} {symbol} {1})'.format(
+            _source(self.operands[0], constants, lhs),
+            _source(self.operands[1], constants, lhs), symbol=self._symbol)
+
+
+class And(_Binary):
+    '''The logical conjunction of two predicates.'''
+
+    __slots__ = ()
+
+    _name = 'and_'
+    _operator = operator.and_
+    _symbol = 'and'
+
+    def __call__(self, lhs):
+        return self.operands[0](lhs) and self.operands[1](lhs)
+
+    def reorder(self):
+        result = super(And, self).reorder()
+        return _cheapest_first(result)
+
+    def _fold(self, predicate1, predicate2):
+        for constant, other in ((predicate1, predicate2),
+                                (predicate2, predicate1)):
+            if isinstance(constant, Constant):
+                if constant.operands[0]:
+                    return other
+                if constant is predicate1 or _inspectable(other):
+                    return constant
+        if _same(predicate1, predicate2):
+            return predicate1
+        if _complementary(predicate1, predicate2):
+            return Constant(False)
+        return None
+
+
+class Or(_Binary):
+    '''The logical disjunction of two predicates.'''
+
+    __slots__ = ()
+
+    _name = 'or_'
+    _operator = operator.or_
+    _symbol = 'or'
+
+    def __call__(self, lhs):
+        return self.operands[0](lhs) or self.operands[1](lhs)
+
+    def reorder(self):
+        result = super(Or, self).reorder()
+        return _cheapest_first(result)
+
+    def _fold(self, predicate1, predicate2):
+        for constant, other in ((predicate1, predicate2),
+                                (predicate2, predicate1)):
+            if isinstance(constant, Constant):
+                if not constant.operands[0]:
+                    return other
+                if constant is predicate1 or _inspectable(other):
+                    return constant
+        if _same(predicate1, predicate2):
+            return predicate1
+        if _complementary(predicate1, predicate2):
+            return Constant(True)
+        return None
+
+
+class Xor(_Binary):
+    '''The logical exclusive disjunction of two predicates.'''
+
+    __slots__ = ()
+
+    _name = 'xor_'
+    _operator = operator.xor
+    _symbol = '!='
+
+    def __call__(self, lhs):
+        return self.operands[0](lhs) != self.operands[1](lhs)
+
+    def _fold(self, predicate1, predicate2):
+        for constant, other in ((predicate1, predicate2),
+                                (predicate2, predicate1)):
+            # Only bool valued operands can be folded, since the inequality
+            # of other values with True or False may differ from their truth
+            if isinstance(constant, Constant) and isinstance(other, (Constant, Not)):
+                return Not(other) if constant.operands[0] else other
+        if _same(predicate1, predicate2):
+            return Constant(False)
+        if _complementary(predicate1, predicate2):
+            return Constant(True)
+        return None
+
+
+class Attribute(Predicate):
+    '''A predicate which applies a predicate to an attribute of its
+    argument.
+
+    The operator of an Attribute is the built-in getattr() and its operands
+    are the attribute name and the predicate.
+    '''
+
+    __slots__ = ()
+
+    _name = 'attr_'
+
+    def __init__(self, name, predicate):
+        if (not isinstance(name, str) or not name.isidentifier()
+                or keyword.iskeyword(name)):
+            raise ValueError("attr_() name {name} is not a valid "
+                             "identifier".format(name=repr(name)))
+        if not callable(predicate):
+            raise TypeError("attr_() parameter predicate={predicate} is not "
+                            "callable".format(predicate=repr(predicate)))
+        super(Attribute, self).__init__(getattr, name, predicate)
+
+    def __call__(self, lhs):
+        return self.operands[1](getattr(lhs, self.operands[0]))
+
+    def cost(self):
+        return _cost(self.operands[1])
+
+    def simplify(self):
+        predicate = _simplify(self.operands[1])
+        if isinstance(predicate, Constant):
+            return predicate
+        if predicate is self.operands[1]:
+            return self
+        return Attribute(self.operands[0], predicate)
+
+    def reorder(self):
+        predicate = _reorder(self.operands[1])
+        if predicate is self.operands[1]:
+            return self
+        return Attribute(self.operands[0], predicate)
+
+    def _source(self, constants, lhs='lhs'):
+        return _source(self.operands[1], constants,
+                       '{lhs}.{name}'.format(lhs=lhs, name=self.operands[0]))
+
+
+def _cost(predicate):
+    return predicate.cost() if isinstance(predicate, Predicate) else OPAQUE_COST
+
+
+def _simplify(predicate):
+    return predicate.simplify() if isinstance(predicate, Predicate) else predicate
+
+
+def _reorder(predicate):
+    return predicate.reorder() if isinstance(predicate, Predicate) else predicate
+
+
+def _source(predicate, constants, lhs='lhs'):
+    if isinstance(predicate, Predicate):
+        return predicate._source(constants, lhs)
+    constants.append(predicate)
+    return '_k{i}({lhs})'.format(i=len(constants) - 1, lhs=lhs)
+
+
+def _cheapest_first(predicate):
+    first, second = predicate.operands
+    if _cost(second) < _cost(first):
+        return type(predicate)(second, first)
+    return predicate
+
+
+def _inspectable(predicate):
+    '''Determine whether a predicate is a Predicate containing no operands
+    which are opaque callables.'''
+    if isinstance(predicate, Attribute):
+        return _inspectable(predicate.operands[1])
+    if isinstance(predicate, (Not, _Binary)):
+        return all(map(_inspectable, predicate.operands))
+    return isinstance(predicate, Predicate)
+
+
+def _same(predicate1, predicate2):
+    '''Determine whether two predicates are structurally identical and
+    contain no opaque callables.'''
+    if not (_inspectable(predicate1) and _inspectable(predicate2)):
+        return False
+    if predicate1 is predicate2:
+        return True
+    if (type(predicate1) is not type(predicate2)
+            or predicate1.operator is not predicate2.operator
+            or len(predicate1.operands) != len(predicate2.operands)):
+        return False
+    for operand1, operand2 in zip(predicate1.operands, predicate2.operands):
+        if isinstance(operand1, Predicate) or isinstance(operand2, Predicate):
+            if not _same(operand1, operand2):
+                return False
+        elif predicate1.operator is operator.is_:
+            if operand1 is not operand2:
+                return False
+        else:
+            try:
+                if type(operand1) is not type(operand2) or not bool(operand1 == operand2):
+                    return False
+            except Exception:
+                return False
+    return True
+
+
+def _complementary(predicate1, predicate2):
+    '''Determine whether one predicate is the negation of the other.'''
+    return ((isinstance(predicate1, Not) and _same(predicate1.operands[0], predicate2))
+            or (isinstance(predicate2, Not) and _same(predicate2.operands[0], predicate1)))
+
+
+def _compile(predicate):
+    '''Generate a single function evaluating a simplified predicate.'''
+    if not isinstance(predicate, Predicate):
+        return predicate
+    constants = []
+    expression = predicate._source(constants)
+    namespace = {'_k{i}'.format(i=i): constant
+                 for i, constant in enumerate(constants)}
+    exec('def predicate(lhs):\n    return {0}'.format(expression), namespace)
+    return namespace['predicate']
+
+
+def compile_predicate(predicate):
+    '''Compile a predicate into a single function if it can be inspected.
+
+    Args:
+        predicate: A unary predicate function.
+
+    Returns:
+        The compiled form of predicate if it is a Predicate, otherwise
+        predicate unchanged.
+    '''
+    if isinstance(predicate, Predicate):
+        return predicate.compile()
+    return predicate
+
+
 def eq_(rhs):
     '''Create a predicate which tests its argument for equality with a value.
 
@@ -11,10 +505,10 @@ def eq_(rhs):
             will be compared for equality.
 
     Returns:
-        A unary predicate function which compares its single argument (lhs)
+        A unary Predicate which compares its single argument (lhs)
         for equality with rhs.
     '''
-    return lambda lhs: lhs == rhs
+    return Comparison(operator.eq, rhs)
 
 
 def ne_(rhs):
@@ -25,10 +519,10 @@ def ne_(rhs):
             will be compared for inequality.
 
     Returns:
-        A unary predicate function which compares its single argument (lhs)
+        A unary Predicate which compares its single argument (lhs)
         for inequality with rhs.
     '''
-    return lambda lhs: lhs != rhs
+    return Comparison(operator.ne, rhs)
 
 
 def lt_(rhs):
@@ -40,10 +534,10 @@ def lt_(rhs):
             be performed.
 
     Returns:
-        A unary predicate function which determines whether its single
+        A unary Predicate which determines whether its single
         argument (lhs) is less-than rhs.
     '''
-    return lambda lhs: lhs < rhs
+    return Comparison(operator.lt, rhs)
 
 
 def le_(rhs):
@@ -55,10 +549,10 @@ def le_(rhs):
             test will be performed.
 
     Returns:
-        A unary predicate function which determines whether its single
+        A unary Predicate which determines whether its single
         argument (lhs) is less-than-or-equal to rhs.
     '''
-    return lambda lhs: lhs <= rhs
+    return Comparison(operator.le, rhs)
 
 
 def ge_(rhs):
@@ -70,10 +564,10 @@ def ge_(rhs):
             equal test will be performed.
 
     Returns:
-        A unary predicate function which determines whether its single
+        A unary Predicate which determines whether its single
         argument (lhs) is greater-than rhs.
     '''
-    return lambda lhs: lhs >= rhs
+    return Comparison(operator.ge, rhs)
 
 
 def gt_(rhs):
@@ -85,10 +579,10 @@ def gt_(rhs):
             will be performed.
 
     Returns:
-        A unary predicate function which determines whether its single
+        A unary Predicate which determines whether its single
         argument (lhs) is less-than-or-equal to rhs.
     '''
-    return lambda lhs: lhs > rhs
+    return Comparison(operator.gt, rhs)
 
 
 def is_(rhs):
@@ -100,11 +594,11 @@ def is_(rhs):
             be performed.
 
     Returns:
-        A unary predicate function which determines whether its single
+        A unary Predicate which determines whether its single
         arguments (lhs) has the same identity - that is, is the same object -
         as rhs.
     '''
-    return lambda lhs: lhs is rhs
+    return Comparison(operator.is_, rhs)
 
 
 def contains_(lhs):
@@ -115,10 +609,33 @@ def contains_(lhs):
             predicate argument.
 
     Returns:
-        A unary predicate function which determines whether its single
+        A unary Predicate which determines whether its single
         arguments (lhs) contains lhs.
     '''
-    return lambda rhs: lhs in rhs
+    return Contains(lhs)
+
+
+def attr_(name, predicate):
+    '''Create a predicate which applies a predicate to an attribute of its
+    argument.
+
+    Batched queries evaluate attribute predicates over whole columns of a
+    ColumnBatch, without creating a record for each row.
+
+    Args:
+        name: The name of the attribute.
+        predicate: A unary predicate function to be applied to the value of
+            the attribute.
+
+    Returns:
+        A unary Predicate which determines whether predicate is True for
+        the named attribute of its single argument (lhs).
+
+    Raises:
+        ValueError: If name is not a valid identifier.
+        TypeError: If predicate is not callable.
+    '''
+    return Attribute(name, predicate)
 
 
 def not_(predicate):
@@ -131,9 +648,9 @@ def not_(predicate):
         predicate: A unary predicate function to be inverted.
 
     Returns:
-        A unary predicate function which is the logical inverse of pred.
+        A unary Predicate which is the logical inverse of pred.
     '''
-    return lambda lhs: not predicate(lhs)
+    return Not(predicate)
 
 
 def and_(predicate1, predicate2):
@@ -148,10 +665,10 @@ def and_(predicate1, predicate2):
         predicate2: A unary predicate function.
 
     Returns:
-        A unary predicate function which is the logical conjunction of
+        A unary Predicate which is the logical conjunction of
         predicate1 and predicate2.
     '''
-    return lambda lhs: predicate1(lhs) and predicate2(lhs)
+    return And(predicate1, predicate2)
 
 
 def or_(predicate1, predicate2):
@@ -166,10 +683,10 @@ def or_(predicate1, predicate2):
         predicate2: A unary predicate function.
 
     Returns:
-        A unary predicate function which is the logical disjunction of
+        A unary Predicate which is the logical disjunction of
         predicate1 and predicate2.
     '''
-    return lambda lhs: predicate1(lhs) or predicate2(lhs)
+    return Or(predicate1, predicate2)
 
 
 def xor_(predicate1, predicate2):
@@ -185,7 +702,7 @@ def xor_(predicate1, predicate2):
         predicate2: A unary predicate function.
 
     Returns:
-        A unary predicate function which is the logical exclusive disjunction
+        A unary Predicate which is the logical exclusive disjunction
         of predicate1 and predicate2.
     '''
-    return lambda lhs: predicate1(lhs) != predicate2(lhs)
+    return Xor(predicate1, predicate2)
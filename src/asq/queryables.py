@@ -21,27 +21,178 @@
 # THE SOFTWARE.
 
 import heapq
+import inspect
 import itertools
 import operator
 from collections import OrderedDict
-from functools import reduce, total_ordering
+from functools import lru_cache, reduce, total_ordering
 
 from asq.selectors import make_selector
 
 from .selectors import identity
 from asq.namedelements import IndexedElement, KeyedElement
+from .predicates import compile_predicate
 from ._types import (is_iterable, is_type)
 
 
 # A sentinel singleton used to identify default argument values.
 default = object()
 
+# The maximum number of sorted runs merged at once by an external sort
+MERGE_FAN_IN = 64
+
+# The items of every empty Grouping returned by a Lookup for a missing key
+_NO_ITEMS = ()
+
 
 class OutOfRangeError(ValueError):
     '''A subclass of ValueError for signalling out of range values.'''
     pass
 
 
+class _Plan(object):
+    '''A deferred chain of per-element stages over a single source iterator.
+
+    Consecutive select(), where(), select_with_index(), take_while() and
+    of_type() operators are recorded as stages of a plan rather than each
+    wrapping the previous iterator in a new layer. When iteration commences
+    the stages are fused into a single compiled loop, so each element passes
+    through one Python frame irrespective of the number of stages.
+
+    As for the generators which the stages replace, the loop is created only
+    once, so iterating a plan again resumes it rather than restarting it.
+    '''
+
+    __slots__ = ('_source', '_stages', '_iterator')
+
+    def __init__(self, source, stages):
+        '''Create a plan.
+
+        Args:
+            source: An iterator over the source elements.
+            stages: A tuple of (kind, func) pairs, where kind is one of the
+                keys of _STAGE_TEMPLATES.
+        '''
+        self._source = source
+        self._stages = stages
+        self._iterator = None
+
+    def then(self, kind, func):
+        '''Return a new plan with an additional stage appended.
+
+        If iteration of this plan has already commenced, the new plan applies
+        only the additional stage to the remaining elements of this plan.
+        '''
+        if (self._iterator is not None and
+                inspect.getgeneratorstate(self._iterator) !=
+                inspect.GEN_CREATED):
+            return _Plan(self._iterator, ((kind, func),))
+        return _Plan(self._source, self._stages + ((kind, func),))
+
+    def __iter__(self):
+        if self._iterator is None:
+            kinds = tuple(kind for kind, _ in self._stages)
+            funcs = [func for _, func in self._stages]
+            self._iterator = _compile_plan(kinds)(self._source, *funcs)
+        return self._iterator
+
+
+# Source templates for each kind of fusible stage. {i} is replaced by the
+# position of the stage within the plan.
+_STAGE_TEMPLATES = {
+    'select': ('', 'item = f{i}(item)'),
+    'where': ('', 'if not f{i}(item):\n    continue'),
+    'select_with_index': ('i{i} = 0', 'item = f{i}(i{i}, item)\ni{i} += 1'),
+    'take_while': ('', 'if not f{i}(item):\n    return'),
+    'of_type': ('', 'if not isinstance(item, f{i}):\n    continue'),
+}
+
+
+@lru_cache(maxsize=256)
+def _compile_plan(kinds):
+    '''Generate a generator function implementing a sequence of stages.
+
+    The generated function is independent of the stage functions themselves,
+    which are passed as arguments, so it can be cached by the sequence of
+    stage kinds alone.
+
+    Args:
+        kinds: A tuple of stage kinds.
+
+    Returns:
+        A generator function accepting a source iterator followed by one
+        function (or classinfo for of_type) per stage.
+    '''
+    params = ''.join(', f{i}'.format(i=i) for i in range(len(kinds)))
+    lines = ['def fused(source{params}):'.format(params=params)]
+    body = []
+    for i, kind in enumerate(kinds):
+        prologue, step = _STAGE_TEMPLATES[kind]
+        if prologue:
+            lines.append('    ' + prologue.format(i=i))
+        body.extend(step.format(i=i).split('\n'))
+    lines.append('    for item in source:')
+    lines.extend('        ' + line for line in body)
+    lines.append('        yield item')
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    return namespace['fused']
+
+
+def _sorted_runs(iterable, key_selector, name):
+    '''Group consecutive elements with equal keys, checking that the keys
+    are in ascending order.
+
+    Args:
+        iterable: An iterable sorted by key.
+        key_selector: A unary function extracting the key of each element.
+        name: A name for the sequence to be used in error messages.
+
+    Yields:
+        (key, group) pairs as produced by itertools.groupby.
+
+    Raises:
+        ValueError: If a key is less than the key preceding it.
+    '''
+    previous = default
+    for key, group in itertools.groupby(iterable, key_selector):
+        if previous is not default and key < previous:
+            raise ValueError("merge_join() {name} sequence is not sorted by "
+                             "key: {key} follows {previous}".format(
+                                 name=name, key=repr(key),
+                                 previous=repr(previous)))
+        previous = key
+        yield key, group
+
+
+def _hash_table(iterable, key_selector):
+    '''Index the elements of an iterable by key for hash joins.
+
+    Args:
+        iterable: An iterable series of elements.
+        key_selector: A unary function extracting the key of each element.
+
+    Returns:
+        An OrderedDict mapping each key, in order of first occurrence, to a
+        list of the elements with that key in source order.
+    '''
+    table = OrderedDict()
+    for element in iterable:
+        key = key_selector(element)
+        try:
+            table[key].append(element)
+        except KeyError:
+            table[key] = [element]
+    return table
+
+
+def _join_table(inner_iterable, inner_key_selector):
+    '''The hash table of a JoinIndex, or a new hash table of an iterable.'''
+    if isinstance(inner_iterable, JoinIndex):
+        return inner_iterable._table
+    return _hash_table(inner_iterable, inner_key_selector)
+
+
 class Queryable(object):
     '''Queries over iterables executed serially.
 
@@ -104,6 +255,25 @@ class Queryable(object):
         '''
         return Queryable(iterable)
 
+    def _create_stage(self, kind, func):
+        '''Create a Queryable which applies a fusible stage to this sequence.
+
+        If this Queryable is already backed by a plan of fusible stages the new
+        stage is appended to that plan, otherwise a new plan is started over
+        an iterator of this Queryable.
+
+        Args:
+            kind: The kind of stage, such as 'select' or 'where'.
+            func: The function (or classinfo for 'of_type') for the stage.
+
+        Returns:
+            A Queryable over the result of applying the stage.
+        '''
+        iterable = self._iterable
+        if isinstance(iterable, _Plan) and self._iterates_source():
+            return self._create(iterable.then(kind, func))
+        return self._create(_Plan(iter(self), ((kind, func),)))
+
     def _create_ordered(self, iterable, direction, func):
         '''Create an ordered iterable using the supplied iterable.
 
@@ -187,7 +357,7 @@ class Queryable(object):
         if selector is identity:
             return self
 
-        return self._create(map(selector, self))
+        return self._create_stage('select', selector)
 
     def select_with_index(
             self,
@@ -233,7 +403,8 @@ class Queryable(object):
             raise TypeError("select_with_index() parameter item_selector={0} is "
                             "not callable".format(repr(selector)))
 
-        return self._create(itertools.starmap(selector, enumerate(map(transform, iter(self)))))
+        source = self if transform is identity else self._create_stage('select', transform)
+        return source._create_stage('select_with_index', selector)
 
     def select_with_correspondence(
             self,
@@ -481,9 +652,149 @@ class Queryable(object):
                 value = result_selector(source_element, intermediate_item)
                 yield value
 
+    def select_many_concurrent(self, projector, max_concurrency=8,
+                               ordered=False):
+        '''Projects each element of a sequence to an asynchronous sequence,
+        running several projections concurrently, and flattens the results
+        into one sequence.
+
+        The projections are driven by a private asyncio event loop, but the
+        results are yielded synchronously, so this operator may be used to
+        fan out I/O from ordinary code. It cannot be used from a thread in
+        which an event loop is already running; use AsyncQueryable there.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            projector: A unary function mapping each element of the source
+                sequence to a coroutine or other awaitable returning an
+                iterable, to an asynchronous iterable or to an iterable.
+
+            max_concurrency: The maximum number of projections in progress at
+                any one time. Source elements are consumed only as projections
+                complete.
+
+            ordered: If False (the default) elements are yielded as they
+                arrive from any projection, so the results of different source
+                elements are interleaved. If True the results for each source
+                element are yielded together, in source order. In either case
+                only a bounded number of results are buffered, so a projection
+                which gets ahead of the consumer is suspended.
+
+        Returns:
+            A Queryable over the flattened results of the projections.
+
+        Raises:
+            ValueError: If this Queryable has been closed.
+            ValueError: If max_concurrency is less than one.
+            TypeError: If projector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call select_many_concurrent() on a "
+                             "closed Queryable.")
+
+        if not callable(projector):
+            raise TypeError("select_many_concurrent() parameter projector={0} "
+                            "is not callable".format(repr(projector)))
+
+        if max_concurrency < 1:
+            raise ValueError("select_many_concurrent() parameter "
+                             "max_concurrency={0} must be at least "
+                             "one".format(max_concurrency))
+
+        return self._create(self._generate_select_many_concurrent_result(
+            projector, max_concurrency, ordered))
+
+    def _generate_select_many_concurrent_result(self, projector,
+                                                max_concurrency, ordered):
+        # Avoid loading asyncio for every import of asq
+        import asyncio
+        from ._concurrent import generate_concurrent_projections
+
+        loop = asyncio.new_event_loop()
+        results = generate_concurrent_projections(self, projector,
+                                                  max_concurrency, ordered)
+        try:
+            while True:
+                try:
+                    item = loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.close()
+
+    def group_adjacent(self, key_selector=identity,
+                       element_selector=identity,
+                       result_selector=lambda key, grouping: grouping):
+        '''Groups runs of consecutive elements which have the same key.
+
+        Unlike group_by(), which aggregates all elements with the same key,
+        this method behaves like itertools.groupby in the Python standard
+        library: a new group is started whenever the key changes. If the
+        source sequence is sorted by key the result is the same as that of
+        group_by(), but each group is produced as soon as the run of elements
+        with its key ends, so only one group at a time is held in memory and
+        the source sequence may be infinite.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            key_selector: An optional unary function used to extract a key from
+                each element in the source sequence. The default is the
+                identity function.
+
+            element_selector: A optional unary function to map elements in the
+                source sequence to elements in a resulting Grouping. The
+                default is the identity function.
+
+            result_selector: An optional binary function to create a result
+                from each group. The first positional argument is the key
+                identifying the group. The second argument is a Grouping object
+                containing the members of the group. The default is a function
+                which simply returns the Grouping.
+
+        Returns:
+            A Queryable sequence of elements of the where each element
+            represents a run of elements with the same key.  If the default
+            result_selector is relied upon this is a Grouping object.
+
+        Raises:
+            ValueError: If the Queryable is closed().
+            TypeError: If key_selector is not callable.
+            TypeError: If element_selector is not callable.
+            TypeError: If result_selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call group_adjacent() on a closed "
+                             "Queryable.")
+
+        if not callable(key_selector):
+            raise TypeError("group_adjacent() parameter key_selector={0} is "
+                            "not callable".format(repr(key_selector)))
+
+        if not callable(element_selector):
+            raise TypeError("group_adjacent() parameter element_selector={0} "
+                            "is not callable".format(repr(element_selector)))
+
+        if not callable(result_selector):
+            raise TypeError("group_adjacent() parameter result_selector={0} "
+                            "is not callable".format(repr(result_selector)))
+
+        return self._create(self._generate_group_adjacent_result(
+            key_selector, element_selector, result_selector))
+
+    def _generate_group_adjacent_result(self, key_selector, element_selector,
+                                        result_selector):
+        for key, items in itertools.groupby(self, key_selector):
+            grouping = Grouping(key, map(element_selector, items))
+            yield result_selector(key, grouping)
+
     def group_by(self, key_selector=identity,
                  element_selector=identity,
-                 result_selector=lambda key, grouping: grouping):
+                 result_selector=lambda key, grouping: grouping,
+                 max_items=None, directory=None, ordered=True):
         '''Groups the elements according to the value of a key extracted by a
         selector function.
 
@@ -510,6 +821,24 @@ class Queryable(object):
                 containing the members of the group. The default is a function
                 which simply returns the Grouping.
 
+            max_items: An optional limit on the number of elements grouped in
+                memory at once. If the source sequence contains more elements
+                than this, groups are hash-partitioned by key into temporary
+                files and the partitions are grouped one at a time, so keys
+                and elements must be picklable. A single group is always held
+                in memory. The default, None, groups the whole sequence in
+                memory.
+
+            directory: The directory in which to create temporary files when
+                max_items is exceeded, or None (the default) for the default
+                temporary directory.
+
+            ordered: If True (the default) groups are returned in the order in
+                which their keys first occur in the source sequence. If False
+                and max_items is exceeded, groups are returned in an arbitrary
+                order, which avoids writing the grouped partitions to disk a
+                second time.
+
         Returns:
             A Queryable sequence of elements of the where each element
             represents a group.  If the default result_selector is relied upon
@@ -517,6 +846,7 @@ class Queryable(object):
 
         Raises:
             ValueError: If the Queryable is closed().
+            ValueError: If max_items is less than one.
             TypeError: If key_selector is not callable.
             TypeError: If element_selector is not callable.
             TypeError: If result_selector is not callable.
@@ -537,6 +867,15 @@ class Queryable(object):
             raise TypeError("group_by() parameter result_selector={0} is not "
                             "callable".format(repr(result_selector)))
 
+        if max_items is not None:
+            if max_items < 1:
+                raise ValueError("group_by() parameter max_items={0} is less "
+                                 "than one".format(max_items))
+
+            return self._create(self._generate_spilled_group_by_result(
+                key_selector, element_selector, result_selector, max_items,
+                directory, ordered))
+
         return self._create(self._generate_group_by_result(key_selector,
                             element_selector, result_selector))
 
@@ -546,6 +885,15 @@ class Queryable(object):
         for grouping in lookup:
             yield result_selector(grouping.key, grouping)
 
+    def _generate_spilled_group_by_result(self, key_selector,
+                                          element_selector, result_selector,
+                                          max_items, directory, ordered):
+        from ._spill import group_pairs
+        pairs = self.select(lambda item: (key_selector(item),
+                                          element_selector(item)))
+        for key, values in group_pairs(pairs, max_items, directory, ordered):
+            yield result_selector(key, Grouping._view(key, values))
+
     def where(self, predicate):
         '''Filters elements according to whether they match a predicate.
 
@@ -571,7 +919,7 @@ class Queryable(object):
             raise TypeError("where() parameter predicate={predicate} is not "
                                   "callable".format(predicate=repr(predicate)))
 
-        return self._create(filter(predicate, self))
+        return self._create_stage('where', compile_predicate(predicate))
 
     def of_type(self, classinfo):
         '''Filters elements according to whether they are of a certain type.
@@ -602,7 +950,7 @@ class Queryable(object):
                 "object or a type objector a tuple of class or "
                 "type objects.".format(classinfo))
 
-        return self.where(lambda x: isinstance(x, classinfo))
+        return self._create_stage('of_type', classinfo)
 
     def order_by(self, key_selector=identity):
         '''Sorts by a key in ascending order.
@@ -724,15 +1072,7 @@ class Queryable(object):
             raise TypeError("take_while() parameter predicate={0} is "
                             "not callable".format(repr(predicate)))
 
-        # Cannot use itertools.takewhile here because it is not lazy
-        return self._create(self._generate_take_while_result(predicate))
-
-    def _generate_take_while_result(self, predicate):
-        for x in self:
-            if predicate(x):
-                yield x
-            else:
-                break
+        return self._create_stage('take_while', predicate)
 
     def skip(self, count=1):
         '''Skip the first count contiguous elements of the source sequence.
@@ -1397,7 +1737,9 @@ class Queryable(object):
         Note: This method uses deferred execution.
 
         Args:
-            inner_iterable: The sequence to join with the outer sequence.
+            inner_iterable: The sequence to join with the outer sequence,
+                or a JoinIndex of it built in advance, in which case
+                inner_key_selector is not used.
 
             outer_key_selector: An optional unary function to extract keys from
                 elements of the outer (source) sequence. The first positional
@@ -1450,11 +1792,223 @@ class Queryable(object):
                                                        inner_key_selector, result_selector))
 
     def _generate_join_result(self, inner_iterable, outer_key_selector, inner_key_selector, result_selector):
-        lookup = self._create(inner_iterable).to_lookup(inner_key_selector)
-        result = self.select_many_with_correspondence(lambda outer_element: lookup[outer_key_selector(outer_element)],
-                                                      result_selector)
-        for item in result:
-            yield item
+        return self._generate_hash_join_result(inner_iterable, outer_key_selector, inner_key_selector,
+                                               result_selector, False, False, None)
+
+    def _generate_hash_join_result(self, inner_iterable, outer_key_selector, inner_key_selector,
+                                   result_selector, keep_outer, keep_inner, default):
+        table = _join_table(inner_iterable, inner_key_selector)
+        probe = table.get
+        matched = set()
+        for outer_element in self:
+            outer_key = outer_key_selector(outer_element)
+            inner_elements = probe(outer_key)
+            if inner_elements is None:
+                if keep_outer:
+                    yield result_selector(outer_element, default)
+                continue
+            if keep_inner:
+                matched.add(outer_key)
+            for inner_element in inner_elements:
+                yield result_selector(outer_element, inner_element)
+
+        if keep_inner:
+            for inner_key, inner_elements in table.items():
+                if inner_key not in matched:
+                    for inner_element in inner_elements:
+                        yield result_selector(default, inner_element)
+
+    def left_join(self, inner_iterable, outer_key_selector=identity,
+                  inner_key_selector=identity,
+                  result_selector=lambda outer, inner: (outer, inner),
+                  default=None):
+        '''Perform a left outer join with a second sequence using selected
+        keys.
+
+        As join(), but each element of the outer sequence which matches no
+        inner element also produces a result, in which default takes the
+        place of the inner element. The inner sequence is indexed in a
+        dictionary once and probed with each outer element, so results are
+        produced as the outer sequence is consumed without creating a
+        Grouping for each outer element.
+
+        The order of elements from outer is maintained. For each of these the
+        order of elements from inner is also preserved.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            inner_iterable: The sequence to join with the outer sequence,
+                or a JoinIndex of it built in advance, in which case
+                inner_key_selector is not used.
+
+            outer_key_selector: An optional unary function to extract keys from
+                elements of the outer (source) sequence. If omitted, the
+                identity function is used.
+
+            inner_key_selector: An optional unary function to extract keys
+                from elements of the inner_iterable. If omitted, the identity
+                function is used.
+
+            result_selector: An optional binary function to create a result
+                element from an outer element and a matching inner element or
+                default. If omitted the result elements will be a 2-tuple pair
+                of the outer and inner elements.
+
+            default: The value passed to result_selector in place of the
+                inner element for unmatched outer elements. Defaults to None.
+
+        Returns:
+            A Queryable whose elements are the result of performing a left
+            outer join on two sequences.
+
+        Raises:
+            ValueError: If the Queryable has been closed.
+            TypeError: If the inner_iterable is not in fact iterable.
+            TypeError: If the outer_key_selector is not callable.
+            TypeError: If the inner_key_selector is not callable.
+            TypeError: If the result_selector is not callable.
+        '''
+        return self._outer_join('left_join', inner_iterable, outer_key_selector,
+                                inner_key_selector, result_selector, True,
+                                False, default)
+
+    def right_join(self, inner_iterable, outer_key_selector=identity,
+                   inner_key_selector=identity,
+                   result_selector=lambda outer, inner: (outer, inner),
+                   default=None):
+        '''Perform a right outer join with a second sequence using selected
+        keys.
+
+        As join(), but each element of the inner sequence which matches no
+        outer element also produces a result, in which default takes the
+        place of the outer element. The inner sequence is indexed in a
+        dictionary once and probed with each outer element.
+
+        The results for matching elements are produced first, in the order
+        of the outer elements and then of the inner elements, as by join().
+        They are followed by those for unmatched inner elements, grouped by
+        key in order of the first occurrence of each key in the inner
+        sequence, which are produced once the outer sequence is exhausted.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            inner_iterable: The sequence to join with the outer sequence,
+                or a JoinIndex of it built in advance, in which case
+                inner_key_selector is not used.
+
+            outer_key_selector: An optional unary function to extract keys from
+                elements of the outer (source) sequence. If omitted, the
+                identity function is used.
+
+            inner_key_selector: An optional unary function to extract keys
+                from elements of the inner_iterable. If omitted, the identity
+                function is used.
+
+            result_selector: An optional binary function to create a result
+                element from a matching outer element or default and an inner
+                element. If omitted the result elements will be a 2-tuple pair
+                of the outer and inner elements.
+
+            default: The value passed to result_selector in place of the
+                outer element for unmatched inner elements. Defaults to None.
+
+        Returns:
+            A Queryable whose elements are the result of performing a right
+            outer join on two sequences.
+
+        Raises:
+            ValueError: If the Queryable has been closed.
+            TypeError: If the inner_iterable is not in fact iterable.
+            TypeError: If the outer_key_selector is not callable.
+            TypeError: If the inner_key_selector is not callable.
+            TypeError: If the result_selector is not callable.
+        '''
+        return self._outer_join('right_join', inner_iterable, outer_key_selector,
+                                inner_key_selector, result_selector, False,
+                                True, default)
+
+    def full_join(self, inner_iterable, outer_key_selector=identity,
+                  inner_key_selector=identity,
+                  result_selector=lambda outer, inner: (outer, inner),
+                  default=None):
+        '''Perform a full outer join with a second sequence using selected
+        keys.
+
+        The combination of left_join() and right_join(): each unmatched
+        element of either sequence also produces a result, in which default
+        takes the place of the missing element.
+
+        Results are produced in the order of the outer elements, as by
+        left_join(), followed by those for unmatched inner elements, as by
+        right_join().
+
+        Note: This method uses deferred execution.
+
+        Args:
+            inner_iterable: The sequence to join with the outer sequence,
+                or a JoinIndex of it built in advance, in which case
+                inner_key_selector is not used.
+
+            outer_key_selector: An optional unary function to extract keys from
+                elements of the outer (source) sequence. If omitted, the
+                identity function is used.
+
+            inner_key_selector: An optional unary function to extract keys
+                from elements of the inner_iterable. If omitted, the identity
+                function is used.
+
+            result_selector: An optional binary function to create a result
+                element from an outer element or default and an inner element
+                or default. If omitted the result elements will be a 2-tuple
+                pair of the outer and inner elements.
+
+            default: The value passed to result_selector in place of the
+                missing element of an unmatched outer or inner element.
+                Defaults to None.
+
+        Returns:
+            A Queryable whose elements are the result of performing a full
+            outer join on two sequences.
+
+        Raises:
+            ValueError: If the Queryable has been closed.
+            TypeError: If the inner_iterable is not in fact iterable.
+            TypeError: If the outer_key_selector is not callable.
+            TypeError: If the inner_key_selector is not callable.
+            TypeError: If the result_selector is not callable.
+        '''
+        return self._outer_join('full_join', inner_iterable, outer_key_selector,
+                                inner_key_selector, result_selector, True,
+                                True, default)
+
+    def _outer_join(self, name, inner_iterable, outer_key_selector,
+                    inner_key_selector, result_selector, keep_outer,
+                    keep_inner, default):
+        if self.closed():
+            raise ValueError("Attempt to call {0}() on a closed "
+                             "Queryable.".format(name))
+
+        if not is_iterable(inner_iterable):
+            raise TypeError("Cannot compute {0}() with inner_iterable of "
+                   "non-iterable {1}".format(name, str(type(inner_iterable))[7: -1]))
+
+        if not callable(outer_key_selector):
+            raise TypeError("{0}() parameter outer_key_selector={1} is not "
+                            "callable".format(name, repr(outer_key_selector)))
+
+        if not callable(inner_key_selector):
+            raise TypeError("{0}() parameter inner_key_selector={1} is not "
+                            "callable".format(name, repr(inner_key_selector)))
+
+        if not callable(result_selector):
+            raise TypeError("{0}() parameter result_selector={1} is not "
+                            "callable".format(name, repr(result_selector)))
+
+        return self._create(self._generate_hash_join_result(
+            inner_iterable, outer_key_selector, inner_key_selector,
+            result_selector, keep_outer, keep_inner, default))
 
     def group_join(self, inner_iterable, outer_key_selector=identity, inner_key_selector=identity,
              result_selector=lambda outer, grouping: grouping):
@@ -1470,7 +2024,9 @@ class Queryable(object):
         Note: This method uses deferred execution.
 
         Args:
-            inner_iterable: The sequence to join with the outer sequence.
+            inner_iterable: The sequence to join with the outer sequence,
+                or a JoinIndex of it built in advance, in which case
+                inner_key_selector is not used.
 
             outer_key_selector: An optional unary function to extract keys from
                 elements of the outer (source) sequence. The first positional
@@ -1527,10 +2083,139 @@ class Queryable(object):
                                                        inner_key_selector, result_selector))
 
     def _generate_group_join_result(self, inner_iterable, outer_key_selector, inner_key_selector, result_selector):
-        lookup = self._create(inner_iterable).to_lookup(inner_key_selector)
+        table = _join_table(inner_iterable, inner_key_selector)
         for outer_element in self:
             outer_key = outer_key_selector(outer_element)
-            yield result_selector(outer_element, lookup[outer_key])
+            yield result_selector(outer_element, Grouping._view(outer_key, table.get(outer_key, _NO_ITEMS)))
+
+    def merge_join(self, inner_iterable, outer_key_selector=identity,
+                   inner_key_selector=identity,
+                   result_selector=lambda outer, inner: (outer, inner),
+                   mode='inner', default=None):
+        '''Perform a sort-merge join with a second sequence using selected
+        keys.
+
+        Both the source sequence and inner_iterable must already be sorted
+        in ascending order of their keys. The two sequences are consumed in
+        lockstep, so only the run of inner elements with the current key is
+        held in memory, and the sequences may be arbitrarily long.
+
+        The order of elements from outer is maintained. For each of these the
+        order of elements from inner is also preserved. Unmatched inner
+        elements of a full join appear in key order among the outer elements.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            inner_iterable: The sequence to join with the outer sequence,
+                sorted by key.
+
+            outer_key_selector: An optional unary function to extract keys from
+                elements of the outer (source) sequence. If omitted, the
+                identity function is used.
+
+            inner_key_selector: An optional unary function to extract keys
+                from elements of the inner_iterable. If omitted, the identity
+                function is used.
+
+            result_selector: An optional binary function to create a result
+                element from an outer and an inner element. If omitted the
+                result elements will be a 2-tuple pair of the outer and inner
+                elements.
+
+            mode: 'inner' (the default) for an inner join, which produces
+                results only for matching pairs; 'left' for a left outer join,
+                which also produces a result for each unmatched outer element;
+                or 'full' for a full outer join, which also produces a result
+                for each unmatched inner element.
+
+            default: The value passed to result_selector in place of the
+                missing element of an unmatched outer or inner element.
+                Defaults to None.
+
+        Returns:
+            A Queryable whose elements are the result of performing the join
+            on two sorted sequences.
+
+        Raises:
+            ValueError: If the Queryable has been closed.
+            ValueError: If mode is not 'inner', 'left' or 'full'.
+            ValueError: During iteration, if the keys of either sequence are
+                found not to be in ascending order.
+            TypeError: If the inner_iterable is not in fact iterable.
+            TypeError: If the outer_key_selector is not callable.
+            TypeError: If the inner_key_selector is not callable.
+            TypeError: If the result_selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call merge_join() on a closed "
+                             "Queryable.")
+
+        if not is_iterable(inner_iterable):
+            raise TypeError("Cannot compute merge_join() with inner_iterable "
+                   "of non-iterable {0}".format(str(type(inner_iterable))[7: -1]))
+
+        if not callable(outer_key_selector):
+            raise TypeError("merge_join() parameter outer_key_selector={0} is "
+                            "not callable".format(repr(outer_key_selector)))
+
+        if not callable(inner_key_selector):
+            raise TypeError("merge_join() parameter inner_key_selector={0} is "
+                            "not callable".format(repr(inner_key_selector)))
+
+        if not callable(result_selector):
+            raise TypeError("merge_join() parameter result_selector={0} is "
+                            "not callable".format(repr(result_selector)))
+
+        if mode not in ('inner', 'left', 'full'):
+            raise ValueError("merge_join() parameter mode={0} is not 'inner', "
+                             "'left' or 'full'".format(repr(mode)))
+
+        return self._create(self._generate_merge_join_result(
+            inner_iterable, outer_key_selector, inner_key_selector,
+            result_selector, mode, default))
+
+    def _generate_merge_join_result(self, inner_iterable, outer_key_selector,
+                                    inner_key_selector, result_selector, mode,
+                                    default):
+        keep_outer = mode != 'inner'
+        keep_inner = mode == 'full'
+        outer_runs = _sorted_runs(self, outer_key_selector, 'outer')
+        inner_runs = _sorted_runs(inner_iterable, inner_key_selector, 'inner')
+        outer_run = next(outer_runs, None)
+        inner_run = next(inner_runs, None)
+        while outer_run is not None and inner_run is not None:
+            outer_key, outer_elements = outer_run
+            inner_key, inner_elements = inner_run
+            if outer_key < inner_key:
+                if keep_outer:
+                    for outer_element in outer_elements:
+                        yield result_selector(outer_element, default)
+                outer_run = next(outer_runs, None)
+            elif inner_key < outer_key:
+                if keep_inner:
+                    for inner_element in inner_elements:
+                        yield result_selector(default, inner_element)
+                inner_run = next(inner_runs, None)
+            else:
+                inner_elements = list(inner_elements)
+                for outer_element in outer_elements:
+                    for inner_element in inner_elements:
+                        yield result_selector(outer_element, inner_element)
+                outer_run = next(outer_runs, None)
+                inner_run = next(inner_runs, None)
+
+        if keep_outer:
+            while outer_run is not None:
+                for outer_element in outer_run[1]:
+                    yield result_selector(outer_element, default)
+                outer_run = next(outer_runs, None)
+
+        if keep_inner:
+            while inner_run is not None:
+                for inner_element in inner_run[1]:
+                    yield result_selector(default, inner_element)
+                inner_run = next(inner_runs, None)
 
     def first(self, predicate=None):
         '''The first element in a sequence (optionally satisfying a predicate).
@@ -2063,11 +2748,47 @@ class Queryable(object):
             raise TypeError("to_lookup() parameter value_selector={value_selector} is not callable".format(
                     value_selector=repr(value_selector)))
 
-        key_value_pairs = self.select(lambda item: (key_selector(item), value_selector(item)))
-        lookup = Lookup(key_value_pairs)
+        groups = OrderedDict()
+        for item in self:
+            key = key_selector(item)
+            values = groups.get(key)
+            if values is None:
+                groups[key] = [value_selector(item)]
+            else:
+                values.append(value_selector(item))
         # Ideally we would close here
         #self.close()
-        return lookup
+        return Lookup._from_dict(groups)
+
+    def to_join_index(self, key_selector=identity):
+        '''Returns a JoinIndex of the elements, using the provided selector to
+        generate a key for each element.
+
+        A JoinIndex may be passed as the inner_iterable of join(),
+        group_join(), left_join(), right_join() and full_join() any number of
+        times, without the elements being indexed again for each join.
+
+        Note: This method uses immediate execution.
+
+        Args:
+            key_selector: An optional unary function to extract the join key
+                from each element. If omitted, the identity function is used.
+
+        Returns:
+            A JoinIndex.
+
+        Raises:
+            ValueError: If the Queryable has been closed.
+            TypeError: If key_selector is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call to_join_index() on a closed Queryable.")
+
+        if not callable(key_selector):
+            raise TypeError("to_join_index() parameter key_selector={key_selector} is not callable".format(
+                    key_selector=repr(key_selector)))
+
+        return JoinIndex._from_dict(_hash_table(self, key_selector))
 
     def to_dictionary(self, key_selector=identity, value_selector=identity):
         """Build a dictionary from the source sequence.
@@ -2272,22 +2993,113 @@ class Queryable(object):
 
         logger.debug(label + " : END (DEFERRED)")
 
-    def as_parallel(self, pool=None):
+    def as_parallel(self, pool=None, backend=None):
         '''Return a ParallelQueryable for parallel execution of queries.
 
         Warning: This feature should be considered experimental alpha quality.
 
         Args:
-            pool: An optional multiprocessing pool which will provide execution
-                resources for parellel processing.  If omitted, a pool will be
-                created if necessary and managed internally.
+            pool: An optional multiprocessing pool, concurrent.futures executor
+                or asq.executors.Executor which will provide execution
+                resources for parellel processing.  If omitted, a process-wide
+                shared pool for the backend is created on first use and reused
+                by all subsequent parallel queries. See
+                asq.executors.shared_pool().
+
+            backend: An optional name of the backend to be used if no pool is
+                supplied. One of 'multiprocessing' (the default), 'process',
+                'thread' or 'free-threaded'. The 'thread' and 'free-threaded'
+                backends do not require selectors or elements to be picklable.
 
         Returns:
             A ParallelQueryable on which all the standard query operators may
             be called.
+
+        Raises:
+            ValueError: If the Queryable has been closed.
+            ValueError: If the backend is not recognised or is not available.
         '''
+        if self.closed():
+            raise ValueError("Attempt to call as_parallel() on a closed "
+                             "Queryable.")
+
         from .parallel_queryable import ParallelQueryable
-        return ParallelQueryable(self, pool)
+        return ParallelQueryable(self, pool, backend=backend)
+
+    def as_vectorized(self):
+        '''Return a VectorizedQueryable which evaluates operators as NumPy
+        array operations where possible.
+
+        Vectorization applies when the source is a NumPy array and the
+        selectors and predicates are ones which can be inspected, such as
+        those created with asq.selectors.k_ and the factories in
+        asq.predicates. All other queries are executed element by element, so
+        results are the same as for Queryable. See asq.vectorized.
+
+        NumPy is an optional dependency. If it is not installed, all queries
+        are executed element by element.
+
+        Returns:
+            A VectorizedQueryable on which all the standard query operators
+            may be called.
+
+        Raises:
+            ValueError: If the Queryable has been closed.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call as_vectorized() on a closed "
+                             "Queryable.")
+
+        from .vectorized import VectorizedQueryable
+        return VectorizedQueryable(self._source())
+
+    def as_batched(self, batch_size=4096, fields=None):
+        '''Return a BatchedQueryable which processes the elements of this
+        Queryable in batches.
+
+        Selected operators of the BatchedQueryable, such as select(),
+        where(), sum() and group_by(), process whole batches at once rather
+        than one element at a time. See asq.batched.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            batch_size: The maximum number of elements in each batch.
+                Defaults to 4096.
+            fields: An optional sequence of attribute names. If provided, the
+                named attributes of the elements are transposed into the
+                columns of a ColumnBatch, and the elements of the
+                BatchedQueryable are records with those attributes.
+                Otherwise each batch is a list of elements.
+
+        Returns:
+            A BatchedQueryable on which all the standard query operators
+            may be called.
+
+        Raises:
+            ValueError: If the Queryable has been closed.
+            ValueError: If batch_size is less than one.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call as_batched() on a closed "
+                             "Queryable.")
+
+        from .batched import BatchedQueryable, batch_rows
+        return BatchedQueryable(batch_rows(self, batch_size, fields))
+
+    def _source(self):
+        '''Return the iterable itself if iterating this Queryable simply
+        iterates it, otherwise an iterator over this Queryable.'''
+        if self._iterates_source():
+            return self._iterable
+        return iter(self)
+
+    def _iterates_source(self):
+        '''Determine whether iterating this Queryable simply iterates its
+        iterable, rather than sorting, grouping or otherwise transforming it
+        as subclasses such as OrderedQueryable and Lookup do.'''
+        return (type(self).__iter__ is Queryable.__iter__
+                and type(self)._iter is Queryable._iter)
 
     # More operators
 
@@ -2456,8 +3268,11 @@ class Queryable(object):
 class OrderedQueryable(Queryable):
     '''A Queryable representing an ordered iterable.
 
-    The sorting implemented by this class is an incremental partial sort so
-    you don't pay for sorting results which are never enumerated.'''
+    Full iteration performs a stable multi-pass sort. Consumers which require
+    only a prefix of the sorted sequence avoid sorting the whole sequence:
+    take() and first() use a bounded heap selection and take_while() uses an
+    incremental partial sort so you don't pay for sorting results which are
+    never enumerated.'''
 
     def __init__(self, iterable, order, func):
         '''Create an OrderedIterable.
@@ -2470,6 +3285,44 @@ class OrderedQueryable(Queryable):
         assert abs(order) == 1, 'order argument must be +1 or -1'
         super(OrderedQueryable, self).__init__(iterable)
         self._funcs = [(order, func)]
+        self._max_items = None
+        self._directory = None
+
+    def spill(self, max_items=1000000, directory=None):
+        '''Limit the number of elements held in memory while sorting.
+
+        When fully iterated, the source sequence is divided into runs of at
+        most max_items elements. Each run is sorted in memory and, if the
+        source does not fit in a single run, pickled to a temporary file.
+        The runs are then merged lazily. The sort respects all sort criteria
+        and remains stable. The elements must be picklable.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            max_items: The maximum number of elements to sort in memory.
+                Defaults to one million.
+            directory: The directory in which to create temporary files, or
+                None (the default) for the default temporary directory.
+
+        Returns:
+            This OrderedQueryable.
+
+        Raises:
+            ValueError: If the OrderedQueryable is closed().
+            ValueError: If max_items is less than one.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call spill() on a "
+                             "closed OrderedQueryable.")
+
+        if max_items < 1:
+            raise ValueError("spill() parameter max_items={0} is less than "
+                             "one".format(max_items))
+
+        self._max_items = max_items
+        self._directory = directory
+        return self
 
     def then_by(self, key_selector=identity):
         '''Introduce subsequent ordering to the sequence with an optional key.
@@ -2536,12 +3389,208 @@ class OrderedQueryable(Queryable):
     def __iter__(self):
         '''Support for the iterator protocol.
 
+        The whole source sequence is sorted when iteration commences, using
+        one stable sort pass per key, least significant key first. If spill()
+        has been called, sorted runs of the source are merged from temporary
+        files instead.
+
         Returns:
             An iterator object over the sorted elements.
         '''
+        if self._max_items is not None:
+            items = self._generate_external_sorted_result()
+        else:
+            items = self._sorted(list(self._iterable))
+        for item in items:
+            yield item
+
+    def _sorted(self, lst):
+        '''Sort a list in place according to all of the sort criteria.'''
+        for direction, func in reversed(self._funcs):
+            lst.sort(key=None if func is identity else func,
+                     reverse=direction == +1)
+        return lst
+
+    def _generate_external_sorted_result(self):
+        '''An external merge sort which holds at most _max_items elements, and
+        one block of each run, in memory.'''
+        from ._spill import write_run
+        iterator = iter(self._iterable)
+        runs = []
+        try:
+            while True:
+                lst = list(itertools.islice(iterator, self._max_items))
+                if not runs and len(lst) < self._max_items:
+                    # The whole source fits in memory
+                    for item in self._sorted(lst):
+                        yield item
+                    return
+                if not lst:
+                    break
+                runs.append(write_run(self._sorted(lst), self._directory))
+                del lst
+
+            key = self._multi_key()
+            # Merge runs in consecutive groups, so that elements with equal
+            # keys remain in source order, until few enough remain to be
+            # merged at once without exhausting file handles
+            while len(runs) > MERGE_FAN_IN:
+                merged = []
+                try:
+                    for i in range(0, len(runs), MERGE_FAN_IN):
+                        group = runs[i:i + MERGE_FAN_IN]
+                        merged.append(write_run(heapq.merge(*group, key=key),
+                                                self._directory))
+                        for run in group:
+                            run.close()
+                    runs[:], merged = merged, []
+                finally:
+                    # Only non-empty if the pass failed part way through
+                    for run in merged:
+                        run.close()
+
+            for item in heapq.merge(*runs, key=key):
+                yield item
+        finally:
+            for run in runs:
+                run.close()
+
+    def take(self, count=1):
+        '''Returns a specified number of elements from the start of the sorted
+        sequence.
+
+        Rather than sorting the whole source sequence, a bounded heap is used
+        to select the first count elements in O(n log count) time and O(count)
+        memory. The selection respects all sort criteria and is stable.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            count: An optional number of elements to take. The default is one.
+
+        Returns:
+            A Queryable over the first count elements of the sorted sequence,
+            or the all elements of elements in the source, whichever is fewer.
+
+        Raises:
+            ValueError: If the OrderedQueryable is closed()
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call take() on a closed "
+                             "OrderedQueryable.")
+
+        count = max(0, count)
+
+        return self._create(self._generate_top_result(count))
+
+    def _generate_top_result(self, count):
+        for item in self._top(count, self._iterable):
+            yield item
+
+    def take_while(self, predicate):
+        '''Returns elements from the start of the sorted sequence while the
+        predicate is True.
+
+        Only as much of the sort as is required to find the first element for
+        which the predicate is False is performed.
+
+        Note: This method uses deferred execution.
+
+        Args:
+            predicate: A function returning True or False with which elements
+                will be tested.
+
+        Returns:
+            A Queryable over the elements from the beginning of the sorted
+            sequence for which predicate is True.
+
+        Raises:
+            ValueError: If the OrderedQueryable is closed()
+            TypeError: If the predicate is not callable.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call take_while() on a closed "
+                             "OrderedQueryable.")
+
+        if not callable(predicate):
+            raise TypeError("take_while() parameter predicate={0} is "
+                            "not callable".format(repr(predicate)))
+
+        if self._max_items is not None:
+            return self._create(_Plan(iter(self),
+                                      (('take_while', predicate),)))
+
+        return self._create(_Plan(self._generate_lazy_sorted_result(),
+                                  (('take_while', predicate),)))
+
+    def _first(self):
+        top = self._top(1, self._iterable)
+        if not top:
+            raise ValueError("Cannot return first() from an empty sequence.")
+        return top[0]
+
+    def _first_predicate(self, predicate):
+        top = self._top(1, filter(predicate, self._iterable))
+        if not top:
+            raise ValueError("No elements matching predicate in call to first()")
+        return top[0]
+
+    def _first_or_default(self, default):
+        top = self._top(1, self._iterable)
+        return top[0] if top else default
+
+    def _first_or_default_predicate(self, default, predicate):
+        top = self._top(1, filter(predicate, self._iterable))
+        return top[0] if top else default
+
+    def _top(self, count, iterable):
+        '''Select the first count elements of iterable in sorted order.
+
+        Args:
+            count: The maximum number of elements to select.
+            iterable: The elements from which to select.
+
+        Returns:
+            A list of at most count elements in sorted order.
+        '''
+        directions = set(direction for direction, _ in self._funcs)
+        funcs = [func for _, func in self._funcs]
+        if len(funcs) == 1:
+            key = None if funcs[0] is identity else funcs[0]
+        else:
+            key = lambda item: tuple(func(item) for func in funcs)
+
+        if directions == {-1}:
+            return heapq.nsmallest(count, iterable, key)
+        if directions == {+1}:
+            return heapq.nlargest(count, iterable, key)
+        return heapq.nsmallest(count, iterable, self._multi_key())
+
+    def _generate_lazy_sorted_result(self):
+        '''An incremental partial sort for consumers which require only a
+        prefix of the sorted sequence.
+
+        The source is heapified in linear time and elements are popped one at
+        a time, so you don't pay for sorting results which are never
+        enumerated.
+        '''
+        key = self._multi_key()
+        lst = [(key(item), index, item) for index, item in enumerate(self._iterable)]
+        heapq.heapify(lst)
+        while lst:
+            key, index, item = heapq.heappop(lst)
+            yield item
 
+    def _multi_key(self):
+        '''Create a function which maps each element to a single key object
+        which orders according to all of the sort criteria.
+
+        Returns:
+            A unary function returning a key object for an element.
+        '''
         # Determine which sorting algorithms to use
         directions = [direction for direction, _ in self._funcs]
+        funcs = [func for _, func in self._funcs]
         direction_total = sum(directions)
         if direction_total == -len(self._funcs):
             # Uniform ascending sort - do nothing
@@ -2580,15 +3629,10 @@ class OrderedQueryable(Queryable):
                 def __eq__(lhs, rhs):
                     return lhs.t == rhs.t
 
-        # Uniform ascending sort - decorate, sort, undecorate using tuple element
-        def create_key(index, item):
-            return MultiKey(func(item) for _, func in self._funcs)
+        def key(item):
+            return MultiKey(func(item) for func in funcs)
 
-        lst = [(create_key(index, item), index, item) for index, item in enumerate(self._iterable)]
-        heapq.heapify(lst)
-        while lst:
-            key, index, item = heapq.heappop(lst)
-            yield item
+        return key
 
 
 class Lookup(Queryable):
@@ -2599,11 +3643,14 @@ class Lookup(Queryable):
     which they were added. The values for each key are also maintained in
     order.
 
-    Note: Lookup objects are immutable.
+    Note: Lookup objects are immutable. Use a LookupBuilder to construct a
+        Lookup incrementally.
 
     All standard query operators may be used on a Lookup. When iterated or
     used as a Queryable the elements are returned as a sequence of Grouping
-    objects.
+    objects. The values of each key are stored in a list, and each Grouping
+    is created as a view of that list, without copying it, when it is
+    retrieved.
     '''
 
     def __init__(self, key_value_pairs):
@@ -2613,22 +3660,56 @@ class Lookup(Queryable):
             key_value_pairs:
                 An iterable over 2-tuples each containing a key, value pair.
         '''
-        # Maintain an ordered dictionary of groups represented as lists
+        # Maintain an ordered dictionary of groups represented as lists,
+        # which are wrapped in Groupings only when they are retrieved
         self._dict = OrderedDict()
         for key, value in key_value_pairs:
-            if key not in self._dict:
-                self._dict[key] = []
-            self._dict[key].append(value)
-
-        # Replace each list with a Grouping
-        for key, value in iter(self._dict.items()):
-            grouping = Grouping(key, value)
-            self._dict[key] = grouping
+            values = self._dict.get(key)
+            if values is None:
+                self._dict[key] = [value]
+            else:
+                values.append(value)
 
         super(Lookup, self).__init__(self._dict)
 
+    @classmethod
+    def _from_groups(cls, key_values_pairs):
+        '''Construct a Lookup from a sequence of (key, values) tuples.
+
+        Values for keys which occur more than once are concatenated in the
+        order in which they are encountered, so merging partial groups built
+        over consecutive runs of a source preserves the order of first
+        occurrence of each key.
+
+        Args:
+            key_values_pairs:
+                An iterable over 2-tuples each containing a key and a list of
+                values. The lists may be extended in place.
+        '''
+        groups = OrderedDict()
+        for key, values in key_values_pairs:
+            if key in groups:
+                groups[key].extend(values)
+            else:
+                groups[key] = values
+        return cls._from_dict(groups)
+
+    @classmethod
+    def _from_dict(cls, groups):
+        '''Construct a Lookup which takes ownership of a dictionary of lists.
+
+        Args:
+            groups: An OrderedDict mapping each key to a non-empty list of
+                values. Neither the dictionary nor the lists are copied, so
+                they must not be modified after the Lookup is constructed.
+        '''
+        lookup = cls.__new__(cls)
+        lookup._dict = groups
+        super(Lookup, lookup).__init__(groups)
+        return lookup
+
     def _iter(self):
-        return iter(self._dict.values())
+        return itertools.starmap(Grouping._view, self._dict.items())
 
     def __getitem__(self, key):
         '''The sequence corresponding to a given key, or an empty sequence if
@@ -2640,10 +3721,7 @@ class Lookup(Queryable):
         Returns:
             The Grouping corresponding to the supplied key.
         '''
-        if key in self._dict:
-            return self._dict[key]
-
-        return Grouping(key, [])
+        return Grouping._view(key, self._dict.get(key, _NO_ITEMS))
 
     def __len__(self):
         '''Support for the len() built-in function.
@@ -2706,6 +3784,244 @@ class Lookup(Queryable):
         """
         return super(Lookup, self).to_dictionary(key_selector, value_selector)
 
+    def to_builder(self):
+        '''Create a LookupBuilder initialised with the contents of this
+        Lookup.
+
+        The builder shares the storage of this Lookup until it is first
+        modified, so this method takes constant time. This Lookup is not
+        affected by modifications to the builder.
+
+        Returns:
+            A LookupBuilder.
+
+        Raises:
+            ValueError: If the Lookup has been closed.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call to_builder() on a closed "
+                             "Lookup.")
+
+        return LookupBuilder._sharing(self._dict)
+
+    def to_join_index(self):
+        '''Create a JoinIndex of the values of this Lookup by their keys.
+
+        The JoinIndex shares the storage of this Lookup, so this method takes
+        constant time.
+
+        Returns:
+            A JoinIndex.
+
+        Raises:
+            ValueError: If the Lookup has been closed.
+        '''
+        if self.closed():
+            raise ValueError("Attempt to call to_join_index() on a closed "
+                             "Lookup.")
+
+        return JoinIndex._from_dict(self._dict)
+
+
+class LookupBuilder(object):
+    '''A mutable builder for incrementally constructing Lookups.
+
+    Values are appended to the groups of a LookupBuilder with add(),
+    extend() and merge() in time proportional to the number of values
+    added, and the current contents are captured in an immutable Lookup with
+    freeze().
+
+    freeze() takes constant time: the Lookup shares the storage of the
+    builder, which is copied on write. The first modification following a
+    freeze() copies the dictionary of keys, but not the values, and the
+    list of values of each key is copied the first time a value is appended
+    to it, so Lookups which have been frozen are never affected by later
+    modifications.
+    '''
+
+    def __init__(self, key_value_pairs=()):
+        '''Construct a LookupBuilder, optionally with a sequence of
+        (key, value) tuples.
+
+        Args:
+            key_value_pairs:
+                An optional iterable over 2-tuples each containing a key,
+                value pair.
+        '''
+        self._dict = OrderedDict()
+        # The dictionary shared with the most recently frozen Lookup, or None
+        self._frozen = None
+        self.extend(key_value_pairs)
+
+    @classmethod
+    def _sharing(cls, groups):
+        builder = cls()
+        builder._dict = groups
+        builder._frozen = groups
+        return builder
+
+    def _groups(self):
+        '''The dictionary of groups, copied first if it is shared.'''
+        if self._dict is self._frozen:
+            self._dict = OrderedDict(self._frozen)
+        return self._dict
+
+    def add(self, key, value):
+        '''Append a value to the group for a key.
+
+        Args:
+            key: The key of the group.
+            value: The value to append.
+
+        Returns:
+            This LookupBuilder.
+        '''
+        return self.extend(((key, value),))
+
+    def extend(self, key_value_pairs):
+        '''Append values to the groups for their keys.
+
+        Args:
+            key_value_pairs:
+                An iterable over 2-tuples each containing a key, value pair.
+
+        Returns:
+            This LookupBuilder.
+        '''
+        groups = self._groups()
+        frozen = self._frozen if self._frozen is not None else {}
+        for key, value in key_value_pairs:
+            values = groups.get(key)
+            if values is None:
+                groups[key] = [value]
+            elif values is frozen.get(key):
+                groups[key] = values + [value]
+            else:
+                values.append(value)
+        return self
+
+    def merge(self, other):
+        '''Append all of the groups of a Lookup or another LookupBuilder.
+
+        The values of keys which are already present are appended to the
+        existing groups. New keys are added in the order in which they occur
+        in other.
+
+        Args:
+            other: A Lookup or LookupBuilder.
+
+        Returns:
+            This LookupBuilder.
+
+        Raises:
+            TypeError: If other is not a Lookup or a LookupBuilder.
+            ValueError: If other is a Lookup which has been closed.
+        '''
+        if not isinstance(other, (Lookup, LookupBuilder)):
+            raise TypeError("Cannot merge() non-Lookup {0} into a "
+                            "LookupBuilder".format(str(type(other))[7: -1]))
+
+        if isinstance(other, Lookup) and other.closed():
+            raise ValueError("Attempt to merge() a closed Lookup.")
+
+        items = list(other._dict.items()) if other is self else other._dict.items()
+        groups = self._groups()
+        frozen = self._frozen if self._frozen is not None else {}
+        for key, other_values in items:
+            values = groups.get(key)
+            if values is None:
+                groups[key] = list(other_values)
+            elif values is frozen.get(key):
+                groups[key] = values + other_values
+            else:
+                values.extend(other_values)
+        return self
+
+    def freeze(self):
+        '''Capture the current contents in an immutable Lookup.
+
+        Note: This method takes constant time.
+
+        Returns:
+            A Lookup containing the groups added so far, which is not
+            affected by subsequent modifications of this LookupBuilder.
+        '''
+        self._frozen = self._dict
+        return Lookup._from_dict(self._dict)
+
+    def __len__(self):
+        '''The number of keys in the LookupBuilder.'''
+        return len(self._dict)
+
+    def __contains__(self, key):
+        '''Determine whether the LookupBuilder contains a key.'''
+        return key in self._dict
+
+    def __repr__(self):
+        return 'LookupBuilder({d})'.format(
+            d=[(key, value) for key, values in self._dict.items()
+               for value in values])
+
+
+class JoinIndex(object):
+    '''An immutable index of the inner elements of a join by key.
+
+    Passing a JoinIndex as the inner_iterable of join(), group_join(),
+    left_join(), right_join() or full_join() probes the index directly, so
+    the inner elements are not indexed again for each join and the time
+    taken by the join depends only on the outer sequence. The
+    inner_key_selector argument of these joins is not used, since the keys
+    were selected when the index was built.
+
+    A JoinIndex is created by Queryable.to_join_index(), Lookup.to_join_index()
+    or by passing an iterable to the constructor. Iterating over a JoinIndex
+    produces the indexed elements, grouped by key in order of the first
+    occurrence of each key.
+    '''
+
+    def __init__(self, iterable, key_selector=identity):
+        '''Construct a JoinIndex of elements by key.
+
+        Args:
+            iterable: An iterable series of elements.
+
+            key_selector: An optional unary function to extract the join key
+                from each element. If omitted, the identity function is used.
+
+        Raises:
+            TypeError: If iterable is not in fact iterable.
+            TypeError: If key_selector is not callable.
+        '''
+        if not is_iterable(iterable):
+            raise TypeError("Cannot construct JoinIndex from non-iterable {0}"
+                            .format(str(type(iterable))[7: -2]))
+
+        if not callable(key_selector):
+            raise TypeError("JoinIndex parameter key_selector={0} is not "
+                            "callable".format(repr(key_selector)))
+
+        self._table = _hash_table(iterable, key_selector)
+
+    @classmethod
+    def _from_dict(cls, table):
+        index = cls.__new__(cls)
+        index._table = table
+        return index
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._table.values())
+
+    def __len__(self):
+        '''The number of distinct keys in the JoinIndex.'''
+        return len(self._table)
+
+    def __contains__(self, key):
+        '''Determine whether any element has the given key.'''
+        return key in self._table
+
+    def __repr__(self):
+        return 'JoinIndex({d})'.format(d=list(self._table.items()))
+
 
 class Grouping(Queryable):
     '''A collection of objects which share a common key.
@@ -2728,6 +4044,21 @@ class Grouping(Queryable):
         sequence = list(items)
         super(Grouping, self).__init__(sequence)
 
+    @classmethod
+    def _view(cls, key, items):
+        '''Create a Grouping over a sequence without copying it.
+
+        Args:
+            key: The key corresponding to this Grouping
+
+            items: A list or tuple of the members of the group, which must
+                not be modified while the Grouping is in use.
+        '''
+        grouping = cls.__new__(cls)
+        grouping._key = key
+        grouping._iterable = items
+        return grouping
+
     key = property(lambda self: self._key,
                    doc="The key common to all elements.")
 
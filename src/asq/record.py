@@ -1,3 +1,6 @@
+import keyword
+from functools import lru_cache
+
 __author__ = 'Sixty North'
 
 
@@ -19,10 +22,10 @@ class Record(object):
         self.__dict__.update(kwargs)
 
     def __eq__(self, rhs):
-        return self.__dict__ == rhs.__dict__
+        return self.__dict__ == _attributes(rhs)
 
     def __ne__(self, rhs):
-        return self.__dict__ != rhs.__dict__
+        return self.__dict__ != _attributes(rhs)
 
     def __str__(self):
         '''A string representation of the Record.'''
@@ -33,6 +36,115 @@ class Record(object):
         return "Record(" + ', '.join(str(key) + '=' + repr(value) for key, value in self.__dict__.items()) + ')'
 
 
+class SlottedRecord(object):
+    '''The base class of the record types created by record_type().
+
+    Instances store their fields in slots rather than in a per-instance
+    dictionary. They compare equal to, and have the same string
+    representations as, a Record with the same attributes, but SlottedRecord
+    is not a subclass of Record.
+    '''
+
+    __slots__ = ()
+
+    # The field names, set on each class created by record_type()
+    _record_fields = ()
+
+    def __eq__(self, rhs):
+        if type(rhs) is type(self):
+            return self._record_values() == rhs._record_values()
+        return _attributes(self) == _attributes(rhs)
+
+    def __ne__(self, rhs):
+        return not self == rhs
+
+    def __str__(self):
+        '''A string representation of the Record.'''
+        return "Record(" + ', '.join(str(key) + '=' + str(value) for key, value in _attributes(self).items()) + ')'
+
+    def __repr__(self):
+        '''A valid Python expression string representation of the Record.'''
+        return "Record(" + ', '.join(str(key) + '=' + repr(value) for key, value in _attributes(self).items()) + ')'
+
+    def __reduce__(self):
+        return (_create_record, (self._record_fields, self._record_values()))
+
+    def _record_values(self):
+        return tuple(getattr(self, name) for name in self._record_fields)
+
+
+def _attributes(record):
+    '''The attributes of a Record or SlottedRecord as a dictionary.'''
+    if isinstance(record, SlottedRecord):
+        return dict(zip(record._record_fields, record._record_values()))
+    return record.__dict__
+
+
+# The maximum number of record types retained by record_type()
+RECORD_TYPE_CACHE_SIZE = 1024
+
+
+def record_type(field_names):
+    '''Create, or retrieve from a cache, a slotted record type.
+
+    The instances of a record type store their fields in __slots__, so they
+    are considerably smaller and faster to create than Records, which store
+    their attributes in a per-instance dictionary. Record types are cached
+    by their field names, so creating many records with the same fields
+    creates only one class. At most RECORD_TYPE_CACHE_SIZE of the most
+    recently used record types are retained.
+
+    Args:
+        field_names: An iterable of the attribute names of the record type,
+            in order.
+
+    Returns:
+        A subclass of SlottedRecord, the constructor of which accepts one
+        keyword argument for each field name.
+
+    Raises:
+        ValueError: If a field name is not a valid identifier, is 'self',
+            begins with two underscores or with '_record', or is repeated.
+    '''
+    return _record_type(tuple(field_names))
+
+
+@lru_cache(maxsize=RECORD_TYPE_CACHE_SIZE)
+def _record_type(field_names):
+    for name in field_names:
+        if (not isinstance(name, str) or not name.isidentifier()
+                or keyword.iskeyword(name) or name == 'self'
+                or name.startswith('__') or name.startswith('_record')):
+            raise ValueError("Record field name {name} is not a valid "
+                             "identifier".format(name=repr(name)))
+    if len(set(field_names)) != len(field_names):
+        raise ValueError("Record field names {names} contain "
+                         "duplicates".format(names=repr(field_names)))
+
+    lines = ['def __init__(self{params}):'.format(
+        params=', *, ' + ', '.join(field_names) if field_names else '')]
+    lines.extend('    self.{0} = {0}'.format(name) for name in field_names)
+    if not field_names:
+        lines.append('    pass')
+    lines.append('def _record_values(self):')
+    lines.append('    return ({0})'.format(
+        ''.join('self.{0}, '.format(name) for name in field_names)))
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+
+    return type('SlottedRecord_' + '_'.join(field_names), (SlottedRecord,),
+                {'__slots__': field_names,
+                 '__module__': __name__,
+                 '__init__': namespace['__init__'],
+                 '_record_fields': field_names,
+                 '_record_values': namespace['_record_values']})
+
+
+def _create_record(field_names, values):
+    '''Recreate a slotted record when unpickling.'''
+    return record_type(field_names)(**dict(zip(field_names, values)))
+
+
 def new(**kwargs):
     '''A convenience factory for creating Records.
 
@@ -46,3 +158,29 @@ def new(**kwargs):
     '''
     return Record(**kwargs)
 
+
+def new_slotted(**kwargs):
+    '''A convenience factory for creating slotted records.
+
+    The record returned is an instance of a slotted record type, created by
+    record_type() for the keyword argument names, which is much smaller than
+    a Record. It compares equal to, and has the same string representations
+    as, a Record with the same attributes. Its attributes may be read and
+    written, but unlike those of a Record no attributes may be added after
+    construction. If any of the names cannot be used as a field name by
+    record_type() a Record is returned.
+
+    Args:
+        **kwargs: Each keyword argument will be used to initialise an
+            attribute with the same name as the argument and the given
+            value.
+
+    Returns:
+        A record which has a named attribute for each of the keyword
+        arguments.
+    '''
+    try:
+        cls = _record_type(tuple(kwargs))
+    except ValueError:
+        return Record(**kwargs)
+    return cls(**kwargs)
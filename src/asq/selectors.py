@@ -1,5 +1,7 @@
 '''Selector functions and selector function factories.'''
 
+import functools
+import keyword
 import operator
 from asq._types import is_string
 from asq.initiators import query
@@ -91,7 +93,9 @@ def make_selector(value):
     Args:
         value: If is a callable, then returned unchanged.  If a string is used
             then create an attribute selector. If in an list containing a single item
-            is used then create a key/index selector.
+            is used then create a key/index selector. If a tuple is used then
+            create a projection, as by project(), from the selectors described
+            by its items.
 
     Returns:
         A callable selector based on the supplied value.
@@ -105,9 +109,152 @@ def make_selector(value):
         return a_(value)
     if isinstance(value, list) and len(value) == 1:
         return k_(value[0])
+    if isinstance(value, tuple):
+        return project(*value)
     raise ValueError("Unable to create callable selector from '{0}'".format(value))
 
 
+def project(*selectors):
+    '''Create a selector which projects each element into a tuple.
+
+    The selectors are compiled into a single function which evaluates each
+    of them in turn and returns a tuple of the results. Selectors created by
+    a_(), k_() and m_(), and strings and single item lists as accepted by
+    make_selector(), are evaluated inline by the generated function rather
+    than by calling them, so the projection costs one function call per
+    element irrespective of the number of selectors. Nested tuples of
+    selectors produce nested tuples.
+
+    Args:
+        *selectors: Selectors, or values from which make_selector() can create
+            selectors.
+
+    Returns:
+        A unary selector function returning a tuple with one value for each
+        selector. The function has a fields attribute, a tuple containing
+        for each selector the attribute name, key or method name which it
+        selects, or None if that cannot be determined, and a selectors
+        attribute, a tuple of the selectors themselves.
+
+    Raises:
+        ValueError: If no selectors are supplied, or a nested tuple is empty.
+        ValueError: If a selector cannot be created from one of the values.
+    '''
+    constants = []
+    selectors = _make_selectors(selectors)
+    expression = _projection_source(selectors, constants)
+    namespace = {'_k{i}'.format(i=i): constant
+                 for i, constant in enumerate(constants)}
+    exec('def projection(item):\n    return {0}'.format(expression), namespace)
+    projection = namespace['projection']
+    projection.fields = tuple(map(selector_field, selectors))
+    projection.selectors = selectors
+    return projection
+
+
+def _make_selectors(values):
+    '''Make a selector from each value, retaining nested tuples.'''
+    if not values:
+        raise ValueError("project() requires at least one selector")
+    return tuple(_make_selectors(value) if isinstance(value, tuple)
+                 else make_selector(value) for value in values)
+
+
+def selector_field(selector):
+    '''Determine which field of an element a selector selects.
+
+    Args:
+        selector: A selector function.
+
+    Returns:
+        The attribute name selected by a selector created with a_(), the key
+        selected by one created with k_(), or the method name called by one
+        created with m_(). For selectors which select several fields, and
+        projections, a tuple of fields. None if the field cannot be
+        determined.
+    '''
+    if isinstance(selector, tuple):
+        return tuple(map(selector_field, selector))
+    fields = getattr(selector, 'fields', None)
+    if isinstance(fields, tuple):
+        return fields
+    description = _describe_selector(selector)
+    if description is None:
+        return None
+    kind, names = description[:2]
+    if kind == 'method':
+        return names
+    return names[0] if len(names) == 1 else names
+
+
+def _describe_selector(selector):
+    '''Describe a selector created by a_(), k_() or m_().
+
+    Returns:
+        A tuple of ('attribute', names), ('key', keys) or ('method', name,
+        args, kwargs), or None for any other selector.
+    '''
+    kind = type(selector)
+    if kind is operator.attrgetter:
+        return ('attribute', selector.__reduce__()[1])
+    if kind is operator.itemgetter:
+        return ('key', selector.__reduce__()[1])
+    if kind is operator.methodcaller:
+        constructor, args = selector.__reduce__()
+        if isinstance(constructor, functools.partial):
+            return ('method', constructor.args[0], args, constructor.keywords)
+        return ('method', args[0], args[1:], {})
+    return None
+
+
+def _is_identifier(name):
+    return name.isidentifier() and not keyword.iskeyword(name)
+
+
+def _constant(value, constants):
+    constants.append(value)
+    return '_k{i}'.format(i=len(constants) - 1)
+
+
+def _selector_source(selector, constants):
+    '''Return a Python expression in item which evaluates a selector.
+
+    Values referred to by the expression are appended to constants, and are
+    referred to by the expression as _ki for index i.
+    '''
+    if isinstance(selector, tuple):
+        return _projection_source(selector, constants)
+    description = _describe_selector(selector)
+    if description is not None:
+        kind = description[0]
+        if kind == 'attribute':
+            parts = [name.split('.') for name in description[1]]
+            if all(_is_identifier(part) for names in parts for part in names):
+                sources = ['item.' + '.'.join(names) for names in parts]
+                return sources[0] if len(sources) == 1 else _tuple_source(sources)
+        elif kind == 'key':
+            sources = ['item[{0}]'.format(_constant(key, constants))
+                       for key in description[1]]
+            return sources[0] if len(sources) == 1 else _tuple_source(sources)
+        else:
+            name, args, kwargs = description[1:]
+            if _is_identifier(name) and all(map(_is_identifier, kwargs)):
+                arguments = [_constant(arg, constants) for arg in args]
+                arguments.extend('{0}={1}'.format(key, _constant(value, constants))
+                                 for key, value in kwargs.items())
+                return 'item.{0}({1})'.format(name, ', '.join(arguments))
+    return '{0}(item)'.format(_constant(selector, constants))
+
+
+def _projection_source(selectors, constants):
+    return _tuple_source([_selector_source(selector, constants)
+                          for selector in selectors])
+
+
+def _tuple_source(sources):
+    return '({0},)'.format(', '.join(sources))
+
+
 def identity(x):
     '''The identity function.
 
@@ -0,0 +1,325 @@
+'''Vectorized execution of numeric queries using NumPy.
+
+A VectorizedQueryable evaluates query stages as whole-array operations when
+its source is a NumPy array and the selectors and predicates are ones which
+can be inspected:
+
+  Selectors: identity, and key selectors created with asq.selectors.k_ with
+      a single key, which select a field of a structured array or a column of
+      a two-dimensional array.
+
+  Predicates: those created by the comparison factories and combinators of
+      asq.predicates, such as lt_(), eq_(), and_() and not_().
+
+Any other operator, selector or predicate is executed element by element
+exactly as by Queryable, so vectorization never changes which queries can be
+expressed. Elements are produced as the equivalent Python objects, such as
+int rather than numpy.int64. Reductions with sum() and average() use NumPy's
+pairwise summation, so floating point results may differ from those of
+Queryable in the least significant digits. Integer sums which could overflow
+are computed exactly with Python integers.
+
+NumPy is an optional dependency. If it is not installed, VectorizedQueryable
+behaves exactly as Queryable.
+'''
+
+import operator
+
+from .queryables import Queryable
+from .selectors import identity, make_selector
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__author__ = 'Sixty North'
+
+
+class VectorizedQueryable(Queryable):
+    '''A Queryable which evaluates stages over NumPy arrays as array
+    operations where possible.
+    '''
+
+    def __init__(self, iterable):
+        '''Construct a VectorizedQueryable from any iterable.
+
+        Args:
+            iterable: Any object supporting the iterator protocol.
+
+        Raises:
+            TypeError: If iterable does not support the iterator protocol.
+        '''
+        super(VectorizedQueryable, self).__init__(iterable)
+
+    def _iter(self):
+        if self.is_vectorized():
+            return _generate_elements(self._iterable)
+        return iter(self._iterable)
+
+    def _create(self, iterable):
+        return VectorizedQueryable(iterable)
+
+    def is_vectorized(self):
+        '''Determine whether operators on this VectorizedQueryable will be
+        evaluated as array operations.
+
+        Returns:
+            True if NumPy is available and the source is a NumPy array,
+            otherwise False.
+        '''
+        return is_array(self._iterable)
+
+    def as_vectorized(self):
+        '''Return this VectorizedQueryable.'''
+        return self
+
+    def select(self, selector):
+        if self.closed():
+            raise ValueError("Attempt to call select() on a closed Queryable.")
+
+        if self.is_vectorized():
+            try:
+                column = select_column(self._iterable, make_selector(selector))
+            except ValueError:
+                column = None
+            if column is not None:
+                return self._create(column)
+
+        return super(VectorizedQueryable, self).select(selector)
+
+    select.__doc__ = Queryable.select.__doc__
+
+    def where(self, predicate):
+        if self.closed():
+            raise ValueError("Attempt to call where() on a closed Queryable.")
+
+        if self.is_vectorized():
+            mask = evaluate_mask(self._iterable, predicate)
+            if mask is not None:
+                return self._create(self._iterable[mask])
+
+        return super(VectorizedQueryable, self).where(predicate)
+
+    where.__doc__ = Queryable.where.__doc__
+
+    def count(self, predicate=None):
+        if self.closed():
+            raise ValueError("Attempt to call count() on a closed Queryable.")
+
+        if self.is_vectorized() and predicate is not None:
+            mask = evaluate_mask(self._iterable, predicate)
+            if mask is not None:
+                return int(numpy.count_nonzero(mask))
+
+        return super(VectorizedQueryable, self).count(predicate)
+
+    count.__doc__ = Queryable.count.__doc__
+
+    def sum(self, selector=identity):
+        if self.closed():
+            raise ValueError("Attempt to call sum() on a closed Queryable.")
+
+        column = self._numeric_column(selector)
+        if column is not None:
+            return sum_array(column)
+
+        return super(VectorizedQueryable, self).sum(selector)
+
+    sum.__doc__ = Queryable.sum.__doc__
+
+    def average(self, selector=identity):
+        if self.closed():
+            raise ValueError("Attempt to call average() on a "
+                             "closed Queryable.")
+
+        column = self._numeric_column(selector)
+        if column is not None:
+            if len(column) == 0:
+                raise ValueError("Cannot compute average() of an empty "
+                                 "sequence.")
+            return column.mean().item()
+
+        return super(VectorizedQueryable, self).average(selector)
+
+    average.__doc__ = Queryable.average.__doc__
+
+    def min(self, selector=identity):
+        if self.closed():
+            raise ValueError("Attempt to call min() on a closed Queryable.")
+
+        column = self._numeric_column(selector)
+        if column is not None:
+            if len(column) == 0:
+                raise ValueError("min() arg is an empty sequence")
+            return column.min().item()
+
+        return super(VectorizedQueryable, self).min(selector)
+
+    min.__doc__ = Queryable.min.__doc__
+
+    def max(self, selector=identity):
+        if self.closed():
+            raise ValueError("Attempt to call max() on a closed Queryable.")
+
+        column = self._numeric_column(selector)
+        if column is not None:
+            if len(column) == 0:
+                raise ValueError("max() arg is an empty sequence")
+            return column.max().item()
+
+        return super(VectorizedQueryable, self).max(selector)
+
+    max.__doc__ = Queryable.max.__doc__
+
+    def _numeric_column(self, selector):
+        '''The one-dimensional numeric array selected by selector, or None if
+        the selection cannot be vectorized.'''
+        if not self.is_vectorized():
+            return None
+        column = select_column(self._iterable, selector)
+        if column is None or column.ndim != 1:
+            return None
+        if column.dtype.kind not in 'biuf':
+            return None
+        return column
+
+
+def is_array(obj):
+    '''Determine whether obj is a NumPy array.'''
+    return numpy is not None and isinstance(obj, numpy.ndarray)
+
+
+def to_python(sequence):
+    '''Convert the elements of a one-dimensional NumPy array to the
+    equivalent Python objects, so that, for example, an element is an int
+    rather than a numpy.int64.
+
+    Args:
+        sequence: Any sequence.
+
+    Returns:
+        A list of the elements if sequence is a one-dimensional NumPy array
+        without named fields, otherwise sequence unchanged.
+    '''
+    if is_array(sequence) and sequence.ndim == 1 \
+            and sequence.dtype.names is None:
+        return sequence.tolist()
+    return sequence
+
+
+# The number of elements of an array converted to Python objects at once
+# during iteration
+ELEMENT_CHUNK_SIZE = 4096
+
+
+def _generate_elements(array):
+    if array.ndim != 1 or array.dtype.names is not None:
+        for item in array:
+            yield item
+        return
+    for start in range(0, len(array), ELEMENT_CHUNK_SIZE):
+        for item in array[start:start + ELEMENT_CHUNK_SIZE].tolist():
+            yield item
+
+
+_INT64_MAX = 2 ** 63 - 1
+
+
+def sum_array(column):
+    '''Sum a one-dimensional numeric array.
+
+    Integer arrays whose sum could exceed the range of a 64-bit integer are
+    summed exactly with Python integers rather than by NumPy, which would
+    silently wrap around.
+
+    Args:
+        column: A one-dimensional numeric NumPy array.
+
+    Returns:
+        The sum as a Python number.
+    '''
+    if column.dtype.kind in 'iu' and len(column):
+        bound = max(-int(column.min()), int(column.max()))
+        if len(column) * bound > _INT64_MAX:
+            return sum(column.tolist())
+    return column.sum().item()
+
+
+def select_column(array, selector):
+    '''Evaluate a selector over a whole array.
+
+    Args:
+        array: A NumPy array.
+        selector: A selector function.
+
+    Returns:
+        An array of the selected values, or None if the selector cannot be
+        evaluated as an array operation.
+    '''
+    if selector is identity:
+        return array
+    if type(selector) is not operator.itemgetter:
+        return None
+    keys = selector.__reduce__()[1]
+    if len(keys) != 1:
+        return None
+    key = keys[0]
+    if array.dtype.names is not None:
+        if key in array.dtype.names:
+            return array[key]
+        return None
+    if array.ndim == 2 and isinstance(key, int):
+        return array[:, key]
+    return None
+
+
+# Comparison operators which NumPy applies elementwise
+_COMPARISONS = frozenset((operator.eq, operator.ne, operator.lt,
+                          operator.le, operator.gt, operator.ge))
+
+
+def evaluate_mask(array, predicate):
+    '''Evaluate a predicate over a whole array.
+
+    Args:
+        array: A NumPy array.
+        predicate: A predicate, which can be evaluated as an array operation
+            only if it was created by asq.predicates.
+
+    Returns:
+        A boolean array with one element per element of array, or None if
+        the predicate cannot be evaluated as an array operation.
+    '''
+    op = getattr(predicate, 'operator', None)
+    operands = getattr(predicate, 'operands', None)
+    if op is None or operands is None:
+        return None
+
+    if op in _COMPARISONS:
+        if array.dtype.names is not None or array.ndim != 1:
+            return None
+        rhs = operands[0]
+        if isinstance(rhs, (list, tuple, set, dict)):
+            return None
+        mask = op(array, rhs)
+        if not isinstance(mask, numpy.ndarray) or mask.shape != array.shape:
+            return None
+        return mask
+
+    masks = []
+    for operand in operands:
+        mask = evaluate_mask(array, operand)
+        if mask is None:
+            return None
+        masks.append(mask)
+
+    if op is operator.not_:
+        return numpy.logical_not(masks[0])
+    if op is operator.and_:
+        return numpy.logical_and(masks[0], masks[1])
+    if op is operator.or_:
+        return numpy.logical_or(masks[0], masks[1])
+    if op is operator.xor:
+        return numpy.logical_xor(masks[0], masks[1])
+    return None
@@ -1,3 +1,4 @@
+import concurrent.futures
 import sys
 import unittest
 from asq.queryables import Queryable
@@ -6,9 +7,65 @@ __author__ = "Sixty North"
 
 if not sys.platform == 'cli':
 
+    from asq.executors import (shared_pool, shutdown_shared_pool,
+                               set_shared_pool_size, gil_enabled)
+
     class TestAsParallel(unittest.TestCase):
 
         def test_as_parallel_closed(self):
             b = Queryable([1])
             b.close()
-            self.assertRaises(ValueError, lambda: b.as_parallel())
\ No newline at end of file
+            self.assertRaises(ValueError, lambda: b.as_parallel())
+
+        def test_as_parallel_reuses_shared_pool(self):
+            with Queryable([1, 2, 3]).as_parallel() as b:
+                with Queryable([4, 5, 6]).as_parallel() as c:
+                    self.assertTrue(b._executor is c._executor)
+                    self.assertTrue(b._executor is shared_pool())
+
+        def test_as_parallel_close_keeps_shared_pool(self):
+            with Queryable([1, 2, 3]).as_parallel() as b:
+                pool = b._executor
+            self.assertTrue(shared_pool() is pool)
+
+        def test_shutdown_shared_pool(self):
+            pool = shared_pool()
+            shutdown_shared_pool()
+            self.assertTrue(shared_pool() is not pool)
+
+        def test_set_shared_pool_size(self):
+            set_shared_pool_size(2)
+            try:
+                self.assertEqual(shared_pool().pool._processes, 2)
+                with Queryable([1, 2, 3]).as_parallel() as b:
+                    self.assertEqual(sorted(b.select(abs).to_list()), [1, 2, 3])
+            finally:
+                set_shared_pool_size(None)
+
+        def test_set_shared_pool_size_invalid(self):
+            self.assertRaises(ValueError, lambda: set_shared_pool_size(0))
+
+        def test_as_parallel_thread_backend(self):
+            with Queryable([1, 2, 3]).as_parallel(backend='thread') as b:
+                c = sorted(b.select(lambda x: x * 10).to_list())
+            self.assertEqual(c, [10, 20, 30])
+
+        def test_as_parallel_futures_executor(self):
+            with concurrent.futures.ThreadPoolExecutor(2) as executor:
+                with Queryable([1, 2, 3]).as_parallel(executor) as b:
+                    c = sorted(b.where(lambda x: x != 2).to_list())
+            self.assertEqual(c, [1, 3])
+
+        def test_as_parallel_unknown_backend(self):
+            self.assertRaises(ValueError, lambda: Queryable([1]).as_parallel(backend='quantum'))
+
+        def test_as_parallel_free_threaded_backend(self):
+            if gil_enabled():
+                self.assertRaises(ValueError,
+                                  lambda: Queryable([1]).as_parallel(backend='free-threaded'))
+            else:
+                with Queryable([1, 2]).as_parallel(backend='free-threaded') as b:
+                    self.assertEqual(sorted(b.select(lambda x: -x).to_list()), [-2, -1])
+
+        def test_as_parallel_invalid_pool(self):
+            self.assertRaises(TypeError, lambda: Queryable([1]).as_parallel(pool=42))
@@ -0,0 +1,298 @@
+import asyncio
+import unittest
+
+from asq.initiators import query_async
+from asq.async_queryable import AsyncQueryable, OrderedAsyncQueryable
+from asq.queryables import OutOfRangeError
+
+__author__ = "Sixty North"
+
+
+async def agen(items):
+    for item in items:
+        await asyncio.sleep(0)
+        yield item
+
+
+async def async_double(x):
+    await asyncio.sleep(0)
+    return x * 2
+
+
+async def async_is_even(x):
+    await asyncio.sleep(0)
+    return x % 2 == 0
+
+
+class TestAsyncQueryable(unittest.IsolatedAsyncioTestCase):
+
+    async def test_query_async(self):
+        b = query_async(agen([1, 2, 3]))
+        self.assertTrue(isinstance(b, AsyncQueryable))
+        self.assertEqual(await b.to_list(), [1, 2, 3])
+
+    async def test_sync_iterable(self):
+        b = await query_async([1, 2, 3]).to_list()
+        self.assertEqual(b, [1, 2, 3])
+
+    async def test_non_iterable(self):
+        self.assertRaises(TypeError, lambda: query_async(5))
+
+    async def test_async_for(self):
+        b = []
+        async for item in query_async(agen([1, 2, 3])).select(async_double):
+            b.append(item)
+        self.assertEqual(b, [2, 4, 6])
+
+    async def test_closed(self):
+        a = query_async([1, 2, 3])
+        a.close()
+        self.assertTrue(a.closed())
+        self.assertRaises(ValueError, lambda: a.select(str))
+        with self.assertRaises(ValueError):
+            await a.to_list()
+
+    async def test_async_context_manager(self):
+        async with query_async([1, 2, 3]) as a:
+            b = await a.sum()
+        self.assertEqual(b, 6)
+        self.assertTrue(a.closed())
+
+    async def test_select_sync_and_async(self):
+        b = await query_async(agen([1, 2, 3])).select(str).select(async_double).to_list()
+        self.assertEqual(b, ['11', '22', '33'])
+
+    async def test_select_non_callable(self):
+        self.assertRaises(TypeError, lambda: query_async([1]).select(5))
+
+    async def test_select_concurrency(self):
+        in_flight = 0
+        peak = 0
+
+        async def fetch(x):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001 * (10 - x))
+            in_flight -= 1
+            return -x
+
+        b = await query_async(agen(range(10))).select(fetch, concurrency=4).to_list()
+        self.assertEqual(b, [-x for x in range(10)])
+        self.assertEqual(peak, 4)
+
+    async def test_select_concurrency_unordered(self):
+        async def fetch(x):
+            await asyncio.sleep(0.01 * (5 - x))
+            return x
+
+        b = await query_async(range(5)).select(fetch, concurrency=5, ordered=False).to_list()
+        self.assertEqual(b, [4, 3, 2, 1, 0])
+
+    async def test_select_concurrency_invalid(self):
+        self.assertRaises(ValueError, lambda: query_async([1]).select(str, concurrency=0))
+
+    async def test_select_concurrency_take_cancels(self):
+        started = []
+
+        async def fetch(x):
+            started.append(x)
+            await asyncio.sleep(0.01)
+            return x
+
+        b = await query_async(agen(range(100))).select(fetch, concurrency=3).take(2).to_list()
+        self.assertEqual(b, [0, 1])
+        self.assertTrue(len(started) <= 5)
+
+    async def test_select_concurrency_early_exit_awaits_cancelled(self):
+        tasks = []
+
+        async def fetch(x):
+            tasks.append(asyncio.current_task())
+            await asyncio.sleep(0.01 * x)
+            return x
+
+        results = query_async(range(10)).select(fetch, concurrency=4, ordered=False).__aiter__()
+        self.assertEqual(await results.__anext__(), 0)
+        await results.aclose()
+        self.assertEqual(len(tasks), 4)
+        self.assertTrue(all(task.done() for task in tasks))
+        self.assertTrue(all(task.cancelled() for task in tasks[1:]))
+
+    async def test_select_with_index(self):
+        b = await query_async(agen('abc')).select_with_index(lambda i, x: x * (i + 1)).to_list()
+        self.assertEqual(b, ['a', 'bb', 'ccc'])
+
+    async def test_select_with_correspondence(self):
+        b = await query_async([1, 2]).select_with_correspondence(async_double).to_list()
+        self.assertEqual(b, [(1, 2), (2, 4)])
+
+    async def test_select_many(self):
+        async def children(x):
+            return [x, x * 10]
+
+        b = await query_async(agen([1, 2])).select_many(children).to_list()
+        self.assertEqual(b, [1, 10, 2, 20])
+
+    async def test_select_many_async_iterable(self):
+        b = await query_async(['ab', 'c']).select_many(agen, str.upper).to_list()
+        self.assertEqual(b, ['A', 'B', 'C'])
+
+    async def test_select_many_with_index(self):
+        b = await query_async(['ab', 'c']).select_many_with_index(
+            lambda i, x: [i] * len(x), lambda x, y: (x, y)).to_list()
+        self.assertEqual(b, [('ab', 0), ('ab', 0), ('c', 1)])
+
+    async def test_select_many_with_correspondence(self):
+        b = await query_async(['ab', 'c']).select_many_with_correspondence(
+            list, lambda x, y: x + y).to_list()
+        self.assertEqual(b, ['aba', 'abb', 'cc'])
+
+    async def test_where(self):
+        b = await query_async(agen(range(10))).where(async_is_even).to_list()
+        self.assertEqual(b, [0, 2, 4, 6, 8])
+
+    async def test_where_concurrency(self):
+        b = await query_async(agen(range(10))).where(async_is_even, concurrency=3).to_list()
+        self.assertEqual(b, [0, 2, 4, 6, 8])
+
+    async def test_of_type(self):
+        b = await query_async([1, 'a', 2.0, 'b']).of_type(str).to_list()
+        self.assertEqual(b, ['a', 'b'])
+
+    async def test_take_skip(self):
+        a = query_async(agen(range(10)))
+        b = await a.skip(2).take(3).to_list()
+        self.assertEqual(b, [2, 3, 4])
+
+    async def test_take_while_skip_while(self):
+        b = await query_async(range(10)).take_while(lambda x: x < 6) \
+                                         .skip_while(async_is_even).to_list()
+        self.assertEqual(b, [1, 2, 3, 4, 5])
+
+    async def test_concat(self):
+        b = await query_async(agen([1, 2])).concat(agen([3])).concat([4]).to_list()
+        self.assertEqual(b, [1, 2, 3, 4])
+
+    async def test_reverse(self):
+        b = await query_async(agen([1, 2, 3])).reverse().to_list()
+        self.assertEqual(b, [3, 2, 1])
+
+    async def test_default_if_empty(self):
+        self.assertEqual(await query_async([]).default_if_empty(5).to_list(), [5])
+        self.assertEqual(await query_async([1]).default_if_empty(5).to_list(), [1])
+
+    async def test_set_operators(self):
+        a = [1, 2, 2, 3, 4]
+        self.assertEqual(await query_async(a).distinct().to_list(), [1, 2, 3, 4])
+        self.assertEqual(await query_async(a).difference(agen([2, 4])).to_list(), [1, 3])
+        self.assertEqual(await query_async(a).intersect([4, 2]).to_list(), [2, 4])
+        self.assertEqual(await query_async(a).union(agen([5, 1])).to_list(), [1, 2, 3, 4, 5])
+
+    async def test_zip(self):
+        b = await query_async(agen([1, 2, 3])).zip('ab').to_list()
+        self.assertEqual(b, [(1, 'a'), (2, 'b')])
+
+    async def test_scan(self):
+        self.assertEqual(await query_async([1, 2, 3]).scan().to_list(), [1, 3, 6])
+        self.assertEqual(await query_async([1, 2, 3]).pre_scan().to_list(), [0, 1, 3])
+
+    async def test_order_by(self):
+        a = [(2, 'a'), (1, 'b'), (2, 'c'), (1, 'd')]
+
+        async def first(x):
+            return x[0]
+
+        b = query_async(agen(a)).order_by(first)
+        self.assertTrue(isinstance(b, OrderedAsyncQueryable))
+        self.assertEqual(await b.to_list(), [(1, 'b'), (1, 'd'), (2, 'a'), (2, 'c')])
+
+    async def test_order_by_then_by_descending(self):
+        a = [(2, 'a'), (1, 'b'), (2, 'c'), (1, 'd')]
+        b = await query_async(a).order_by_descending(lambda x: x[0]) \
+                                .then_by_descending(lambda x: x[1]).to_list()
+        self.assertEqual(b, [(2, 'c'), (2, 'a'), (1, 'd'), (1, 'b')])
+
+    async def test_group_by(self):
+        a = ['apple', 'kiwi', 'banana', 'fig', 'pear']
+        b = await query_async(agen(a)).group_by(len, result_selector=lambda k, g: (k, g.to_list())).to_list()
+        self.assertEqual(b, [(5, ['apple']), (4, ['kiwi', 'pear']), (6, ['banana']), (3, ['fig'])])
+
+    async def test_join(self):
+        b = await query_async(agen([1, 2, 3])).join(agen(['a', 'bb', 'cc']), inner_key_selector=len).to_list()
+        self.assertEqual(b, [(1, 'a'), (2, 'bb'), (2, 'cc')])
+
+    async def test_group_join(self):
+        b = await query_async([1, 2, 3]).group_join(['a', 'bb', 'cc'], inner_key_selector=len,
+                                                    result_selector=lambda o, g: (o, g.count())).to_list()
+        self.assertEqual(b, [(1, 1), (2, 2), (3, 0)])
+
+    async def test_join_non_iterable(self):
+        self.assertRaises(TypeError, lambda: query_async([1]).join(5))
+
+    async def test_conversions(self):
+        a = [1, 2, 3]
+        self.assertEqual(await query_async(agen(a)).to_tuple(), (1, 2, 3))
+        self.assertEqual(await query_async(agen(a)).to_set(), {1, 2, 3})
+        self.assertEqual(await query_async(agen(a)).to_dictionary(str), {'1': 1, '2': 2, '3': 3})
+        self.assertEqual(await query_async(agen(a)).to_str(','), '1,2,3')
+        lookup = await query_async(agen(a)).to_lookup(lambda x: x % 2)
+        self.assertEqual(lookup[1].to_list(), [1, 3])
+
+    async def test_to_set_duplicates(self):
+        with self.assertRaises(ValueError):
+            await query_async([1, 1]).to_set()
+
+    async def test_aggregates(self):
+        a = [3, 1, 4, 1, 5]
+        self.assertEqual(await query_async(agen(a)).count(), 5)
+        self.assertEqual(await query_async(agen(a)).count(lambda x: x == 1), 2)
+        self.assertEqual(await query_async(agen(a)).sum(async_double), 28)
+        self.assertEqual(await query_async(agen(a)).min(), 1)
+        self.assertEqual(await query_async(agen(a)).max(async_double), 10)
+        self.assertEqual(await query_async(agen(a)).average(), 2.8)
+        self.assertEqual(await query_async(agen(a)).aggregate(lambda x, y: x * y), 60)
+        self.assertEqual(await query_async([]).aggregate(lambda x, y: x * y, 1), 1)
+
+    async def test_aggregate_empty(self):
+        with self.assertRaises(ValueError):
+            await query_async([]).aggregate(lambda x, y: x * y)
+        with self.assertRaises(ValueError):
+            await query_async([]).average()
+
+    async def test_predicates(self):
+        a = [1, 2, 3]
+        self.assertTrue(await query_async(agen(a)).any(async_is_even))
+        self.assertFalse(await query_async(agen(a)).all(async_is_even))
+        self.assertTrue(await query_async(agen(a)).contains(3))
+        self.assertFalse(await query_async([]).any())
+
+    async def test_element_operators(self):
+        a = [1, 2, 3, 4]
+        self.assertEqual(await query_async(agen(a)).first(), 1)
+        self.assertEqual(await query_async(agen(a)).first(async_is_even), 2)
+        self.assertEqual(await query_async([]).first_or_default(9), 9)
+        self.assertEqual(await query_async(agen(a)).last(), 4)
+        self.assertEqual(await query_async(agen(a)).last(lambda x: x < 3), 2)
+        self.assertEqual(await query_async([]).last_or_default(9), 9)
+        self.assertEqual(await query_async([5]).single(), 5)
+        self.assertEqual(await query_async(a).single(lambda x: x == 3), 3)
+        self.assertEqual(await query_async([]).single_or_default(9), 9)
+        self.assertEqual(await query_async(agen(a)).element_at(2), 3)
+
+    async def test_element_operators_errors(self):
+        with self.assertRaises(ValueError):
+            await query_async([]).first()
+        with self.assertRaises(ValueError):
+            await query_async([1, 2]).single()
+        with self.assertRaises(ValueError):
+            await query_async([1, 2]).single_or_default(0)
+        with self.assertRaises(ValueError):
+            await query_async([]).last()
+        with self.assertRaises(OutOfRangeError):
+            await query_async([1]).element_at(1)
+
+    async def test_sequence_equal(self):
+        self.assertTrue(await query_async(agen([1, 2])).sequence_equal([1, 2]))
+        self.assertFalse(await query_async(agen([1, 2])).sequence_equal(agen([1, 2, 3])))
+        self.assertFalse(await query_async([1, 3]).sequence_equal([1, 2]))
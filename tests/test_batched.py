@@ -0,0 +1,219 @@
+import unittest
+
+from asq.batched import BatchedQueryable, ColumnBatch, batch_rows
+from asq.initiators import query, query_columns
+from asq.predicates import attr_, eq_, ne_, gt_, lt_, and_, or_, not_
+from asq.queryables import Queryable
+from asq.record import new
+from asq.selectors import a_, project
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__author__ = "Sixty North"
+
+
+def people():
+    return {'name': ['Ann', 'Bob', 'Cat', 'Dan', 'Eve'],
+            'age': [31, 25, 47, 25, 38],
+            'city': ['Oslo', 'Rome', 'Oslo', 'Lima', 'Rome']}
+
+
+class TestColumnBatch(unittest.TestCase):
+
+    def test_len(self):
+        self.assertEqual(len(ColumnBatch(people())), 5)
+
+    def test_unequal_lengths(self):
+        self.assertRaises(ValueError, lambda: ColumnBatch({'a': [1, 2], 'b': [1]}))
+
+    def test_rows(self):
+        rows = list(ColumnBatch({'a': [1, 2], 'b': 'xy'}))
+        self.assertEqual(rows, [new(a=1, b='x'), new(a=2, b='y')])
+
+    def test_rows_reserved_names(self):
+        rows = list(ColumnBatch({'self': [1, 2], 'class': 'xy', 'a b': [3, 4]}))
+        self.assertEqual([getattr(row, 'self') for row in rows], [1, 2])
+        self.assertEqual([getattr(row, 'class') for row in rows], ['x', 'y'])
+        self.assertEqual([getattr(row, 'a b') for row in rows], [3, 4])
+
+    def test_compress(self):
+        b = ColumnBatch({'a': [1, 2, 3], 'b': 'xyz'}).compress([True, False, True])
+        self.assertEqual(b.columns, {'a': [1, 3], 'b': ['x', 'z']})
+
+    def test_take(self):
+        b = ColumnBatch({'a': [1, 2, 3], 'b': 'xyz'}).take([0, 2])
+        self.assertEqual(b.columns, {'a': [1, 3], 'b': ['x', 'z']})
+
+
+class TestBatchedQueryable(unittest.TestCase):
+
+    def test_query_columns(self):
+        a = query_columns(people(), batch_size=2)
+        self.assertTrue(isinstance(a, BatchedQueryable))
+        self.assertEqual([len(batch) for batch in a.batches()], [2, 2, 1])
+        self.assertEqual(a.to_list()[1], new(name='Bob', age=25, city='Rome'))
+
+    def test_invalid_batch_size(self):
+        self.assertRaises(ValueError, lambda: query_columns(people(), batch_size=0))
+        self.assertRaises(ValueError, lambda: query([1]).as_batched(0))
+
+    def test_as_batched(self):
+        a = query(range(10)).as_batched(4)
+        self.assertTrue(isinstance(a, BatchedQueryable))
+        self.assertEqual(a.batches().to_list(), [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+        self.assertEqual(a.to_list(), list(range(10)))
+
+    def test_as_batched_fields(self):
+        rows = [new(x=i, y=i * i) for i in range(5)]
+        a = query(rows).as_batched(3, fields=['y'])
+        self.assertEqual(a.batches().first().columns, {'y': [0, 1, 4]})
+        self.assertEqual(a.sum(a_('y')), 30)
+
+    def test_as_batched_closed(self):
+        a = query([1])
+        a.close()
+        self.assertRaises(ValueError, lambda: a.as_batched())
+
+    def test_select_column(self):
+        a = query_columns(people(), batch_size=2).select('age')
+        self.assertTrue(isinstance(a, BatchedQueryable))
+        self.assertEqual(a.batches().to_list(), [[31, 25], [47, 25], [38]])
+
+    def test_select_projection(self):
+        a = query_columns(people(), batch_size=3).select(project('name', 'city'))
+        self.assertEqual(a.to_list()[:2], [('Ann', 'Oslo'), ('Bob', 'Rome')])
+
+    def test_select_opaque(self):
+        a = query_columns(people(), batch_size=2).select(lambda p: p.name.lower())
+        self.assertTrue(isinstance(a, BatchedQueryable))
+        self.assertEqual(a.to_list(), ['ann', 'bob', 'cat', 'dan', 'eve'])
+
+    def test_where(self):
+        a = query_columns(people(), batch_size=2).select(a_('age')).where(and_(gt_(25), lt_(40)))
+        self.assertEqual(a.batches().to_list(), [[31], [38]])
+
+    def test_where_records(self):
+        a = query_columns(people(), batch_size=2).where(lambda p: p.city == 'Rome')
+        batches = a.batches().to_list()
+        self.assertTrue(all(isinstance(batch, ColumnBatch) for batch in batches))
+        self.assertEqual(BatchedQueryable(batches).select('name').to_list(), ['Bob', 'Eve'])
+
+    def test_where_columnar(self):
+        a = query_columns(people(), batch_size=3).where(
+            or_(attr_('age', gt_(40)), and_(attr_('city', eq_('Rome')), not_(attr_('age', lt_(30))))))
+        self.assertEqual(a.select('name').to_list(), ['Cat', 'Eve'])
+
+    def test_where_columnar_creates_no_records(self):
+        def fail(batch):
+            raise AssertionError("records created")
+        iterate = ColumnBatch.__iter__
+        ColumnBatch.__iter__ = fail
+        try:
+            a = query_columns(people(), batch_size=2).where(attr_('city', eq_('Oslo')))
+            batches = a.batches().to_list()
+        finally:
+            ColumnBatch.__iter__ = iterate
+        self.assertEqual([batch.columns['name'] for batch in batches], [['Ann'], ['Cat']])
+
+    def test_where_columnar_preserves_short_circuit(self):
+        columns = {'x': [None, 3, 1, None, 5]}
+        a = query_columns(columns, batch_size=5).where(
+            and_(attr_('x', ne_(None)), attr_('x', gt_(2))))
+        self.assertEqual(a.select('x').to_list(), [3, 5])
+        b = query_columns(columns, batch_size=5).where(
+            or_(attr_('x', eq_(None)), attr_('x', gt_(2))))
+        self.assertEqual(b.select('x').to_list(), [None, 3, None, 5])
+
+    def test_where_columnar_all_rows(self):
+        batch = ColumnBatch(people())
+        a = BatchedQueryable([batch]).where(attr_('age', gt_(0)))
+        self.assertIs(a.batches().single(), batch)
+
+    def test_where_columnar_matches_rows(self):
+        predicate = or_(attr_('age', eq_(25)), attr_('name', str.isupper))
+        a = query_columns(people(), batch_size=2).where(predicate).to_list()
+        b = query(query_columns(people()).to_list()).where(predicate).to_list()
+        self.assertEqual(a, b)
+
+    def test_where_unknown_column(self):
+        a = query_columns(people(), batch_size=2).where(attr_('name', eq_('Dan')))
+        self.assertEqual(a.select('age').to_list(), [25])
+        b = query_columns(people(), batch_size=2).where(attr_('salary', eq_(1)))
+        self.assertRaises(AttributeError, lambda: b.to_list())
+
+    def test_count(self):
+        a = query_columns(people(), batch_size=2)
+        self.assertEqual(a.count(), 5)
+        self.assertEqual(query_columns(people(), batch_size=2).count(lambda p: p.age == 25), 2)
+
+    def test_reductions(self):
+        def a():
+            return query_columns(people(), batch_size=2)
+        self.assertEqual(a().sum(a_('age')), 166)
+        self.assertEqual(a().average(a_('age')), 33.2)
+        self.assertEqual(a().min(a_('age')), 25)
+        self.assertEqual(a().max(a_('name')), 'Eve')
+        self.assertEqual(a().max(lambda p: p.age * 2), 94)
+
+    def test_reductions_empty(self):
+        a = query([]).as_batched()
+        self.assertEqual(a.sum(), 0)
+        self.assertRaises(ValueError, lambda: query([]).as_batched().average())
+        self.assertRaises(ValueError, lambda: query([]).as_batched().min())
+
+    def test_group_by(self):
+        a = query_columns(people(), batch_size=2)
+        b = a.group_by(a_('city'), a_('name'), lambda key, group: (key, group.to_list())).to_list()
+        self.assertEqual(b, [('Oslo', ['Ann', 'Cat']), ('Rome', ['Bob', 'Eve']), ('Lima', ['Dan'])])
+
+    def test_to_lookup(self):
+        lookup = query(range(10)).as_batched(3).to_lookup(lambda x: x % 3)
+        self.assertEqual(lookup[1].to_list(), [1, 4, 7])
+
+    def test_row_operators_leave_batch_mode(self):
+        a = query_columns(people(), batch_size=2).select('age').skip(1).take(2)
+        self.assertTrue(type(a) is Queryable)
+        self.assertEqual(a.to_list(), [25, 47])
+
+    def test_select_closed(self):
+        a = query([1]).as_batched()
+        a.close()
+        self.assertRaises(ValueError, lambda: a.select(str))
+        self.assertRaises(ValueError, lambda: a.batches())
+
+    def test_reserved_column_names(self):
+        a = query_columns({'self': [1, 2], '__x': [3, 4]}).to_list()
+        self.assertEqual([getattr(row, 'self') for row in a], [1, 2])
+        self.assertEqual([getattr(row, '__x') for row in a], [3, 4])
+
+    def test_batch_rows(self):
+        self.assertEqual(list(batch_rows('abcde', 2)), [['a', 'b'], ['c', 'd'], ['e']])
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestBatchedQueryableNumPy(unittest.TestCase):
+
+    def test_array_columns(self):
+        columns = {'x': numpy.arange(10), 'y': numpy.arange(10) * 0.5}
+        a = query_columns(columns, batch_size=4)
+        self.assertEqual(a.sum(a_('x')), 45)
+        b = lambda: query_columns(columns, batch_size=4).select(a_('y')).where(gt_(3.0))
+        self.assertTrue(isinstance(b().batches().first(), numpy.ndarray))
+        c = b().to_list()
+        self.assertEqual(c, [3.5, 4.0, 4.5])
+        self.assertEqual([type(x) for x in c], [float] * 3)
+
+    def test_integer_sum_does_not_overflow(self):
+        columns = {'x': numpy.array([2 ** 62] * 4, dtype=numpy.int64)}
+        self.assertEqual(query_columns(columns, batch_size=2).sum(a_('x')), 2 ** 64)
+
+    def test_array_rows_are_python_objects(self):
+        columns = {'x': numpy.arange(3), 'y': numpy.arange(3) * 0.5}
+        a = query_columns(columns, batch_size=2).to_list()
+        self.assertEqual(a, [new(x=0, y=0.0), new(x=1, y=0.5), new(x=2, y=1.0)])
+        self.assertEqual([type(row.x) for row in a], [int] * 3)
+        b = query_columns(columns, batch_size=2).to_lookup(a_('x'), a_('y'))
+        self.assertEqual([type(group.key) for group in b], [int] * 3)
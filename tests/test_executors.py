@@ -0,0 +1,200 @@
+import concurrent.futures
+import os
+import time
+import unittest
+
+import asq.executors
+
+from asq.executors import (FuturesExecutor, create_executor, completed,
+                           FixedPartitioner, AdaptivePartitioner, shared_value,
+                           SharedValue)
+from helpers import TracingGenerator, infinite
+
+__author__ = "Sixty North"
+
+
+def loaded_tokens(item):
+    return [token for token in asq.executors._shared_values
+            if token[1] is not None]
+
+
+class TestExecutors(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = create_executor('thread', 4)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_imap_preserves_order(self):
+        a = list(range(100))
+        b = list(self.executor.imap(lambda x: x * 2, a, 7))
+        self.assertEqual(b, [x * 2 for x in a])
+
+    def test_imap_unordered_all_results(self):
+        a = list(range(100))
+        b = list(self.executor.imap_unordered(lambda x: x * 2, a, 7))
+        self.assertEqual(sorted(b), [x * 2 for x in a])
+
+    def test_map(self):
+        b = self.executor.map(str, [1, 2, 3])
+        self.assertEqual(b, ['1', '2', '3'])
+
+    def test_imap_infinite(self):
+        results = self.executor.imap(lambda x: x + 1, infinite(), 3)
+        b = [next(results) for _ in range(5)]
+        self.assertEqual(b, [1, 2, 3, 4, 5])
+
+    def test_imap_is_lazy(self):
+        a = TracingGenerator()
+        results = self.executor.imap(lambda x: x, a, 2)
+        self.assertEqual(a.trace, [])
+        next(results)
+        self.assertTrue(len(a.trace) <= 2 * (self.executor.max_in_flight + 1))
+
+    def test_imap_propagates_exception(self):
+        results = self.executor.imap(lambda x: 1 / x, [1, 0, 2])
+        self.assertRaises(ZeroDivisionError, lambda: list(results))
+
+    def test_max_in_flight_invalid(self):
+        pool = concurrent.futures.ThreadPoolExecutor(1)
+        try:
+            self.assertRaises(ValueError, lambda: FuturesExecutor(pool, max_in_flight=0))
+        finally:
+            pool.shutdown()
+
+    def test_sharing_thread(self):
+        self.assertTrue(self.executor.shares_memory())
+        with self.executor.sharing({'a': 1}) as (executor, token):
+            self.assertTrue(executor is self.executor)
+            b = executor.map(shared_value, [token])
+        self.assertEqual(b, [{'a': 1}])
+
+    def test_sharing_process(self):
+        for backend in ('multiprocessing', 'process'):
+            executor = create_executor(backend, 2)
+            try:
+                self.assertFalse(executor.shares_memory())
+                with executor.sharing([1, 2, 3]) as (reused, token):
+                    self.assertTrue(reused is executor)
+                    b = reused.map(shared_value, [token, token], 1)
+                self.assertEqual(b, [[1, 2, 3], [1, 2, 3]])
+                self.assertRaises(KeyError, lambda: shared_value(token))
+            finally:
+                executor.shutdown()
+
+    def test_sharing_process_released_in_workers(self):
+        interval = asq.executors.SHARED_VALUE_POLL_INTERVAL
+        asq.executors.SHARED_VALUE_POLL_INTERVAL = 0.01
+        executor = create_executor('multiprocessing', 1)
+        try:
+            with executor.sharing([1, 2, 3]) as (reused, token):
+                self.assertEqual(reused.map(shared_value, [token]), [[1, 2, 3]])
+                self.assertTrue(token in reused.map(loaded_tokens, [None])[0])
+            deadline = time.monotonic() + 10
+            while token in executor.map(loaded_tokens, [None])[0]:
+                self.assertTrue(time.monotonic() < deadline)
+                time.sleep(0.01)
+        finally:
+            executor.shutdown()
+            asq.executors.SHARED_VALUE_POLL_INTERVAL = interval
+
+    def test_shared_value(self):
+        a = SharedValue({'a': 1})
+        path = a.token[1]
+        self.assertEqual(shared_value(a.token), {'a': 1})
+        a.release()
+        a.release()
+        self.assertFalse(os.path.exists(path))
+        self.assertRaises(KeyError, lambda: shared_value(SharedValue(1).token))
+
+    def test_sharing_released(self):
+        with self.executor.sharing('value') as (executor, token):
+            pass
+        self.assertRaises(KeyError, lambda: shared_value(token))
+
+    def test_multiprocessing_backend(self):
+        executor = create_executor('multiprocessing', 2)
+        try:
+            b = executor.map(abs, [-1, -2, 3], 2)
+        finally:
+            executor.shutdown()
+        self.assertEqual(b, [1, 2, 3])
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, lambda: create_executor('quantum'))
+
+
+class TestFixedPartitioner(unittest.TestCase):
+
+    def test_fixed_partitioner(self):
+        b = list(FixedPartitioner(range(7), 3))
+        self.assertEqual(b, [[0, 1, 2], [3, 4, 5], [6]])
+
+    def test_fixed_partitioner_empty(self):
+        self.assertEqual(list(FixedPartitioner([], 3)), [])
+
+    def test_fixed_partitioner_invalid(self):
+        self.assertRaises(ValueError, lambda: FixedPartitioner([], 0))
+
+
+class TestAdaptivePartitioner(unittest.TestCase):
+
+    def test_doubles_until_measured(self):
+        b = [len(chunk) for chunk in AdaptivePartitioner(range(31))]
+        self.assertEqual(b, [1, 2, 4, 8, 16])
+
+    def test_sizes_to_target(self):
+        partitioner = AdaptivePartitioner(range(1000), target_seconds=0.1)
+        chunks = iter(partitioner)
+        first = next(chunks)
+        partitioner.record(len(first), 0.01)
+        self.assertEqual(len(next(chunks)), 10)
+        partitioner.record(10, 0.001)
+        self.assertAlmostEqual(partitioner.cost, 0.00505)
+        self.assertEqual(len(next(chunks)), 19)
+
+    def test_respects_ceiling_and_floor(self):
+        partitioner = AdaptivePartitioner(range(1000), floor=2, ceiling=50)
+        chunks = iter(partitioner)
+        partitioner.record(len(next(chunks)), 0.0)
+        self.assertEqual(len(next(chunks)), 50)
+        partitioner.record(50, 1000.0)
+        self.assertEqual(len(next(chunks)), 2)
+
+    def test_single_pass(self):
+        a = TracingGenerator()
+        chunks = iter(AdaptivePartitioner(a))
+        next(chunks)
+        next(chunks)
+        self.assertEqual(a.trace, [0, 1, 2])
+
+    def test_invalid_arguments(self):
+        self.assertRaises(ValueError, lambda: AdaptivePartitioner([], target_seconds=0))
+        self.assertRaises(ValueError, lambda: AdaptivePartitioner([], floor=5, ceiling=4))
+
+    def test_imap_adaptive(self):
+        executor = create_executor('thread', 2)
+        try:
+            b = list(executor.imap(lambda x: x * x, range(1000)))
+        finally:
+            executor.shutdown()
+        self.assertEqual(b, [x * x for x in range(1000)])
+
+
+class TestCompleted(unittest.TestCase):
+
+    def test_completed_bounds_submission(self):
+        submitted = []
+
+        def futures():
+            for i in range(10):
+                submitted.append(i)
+                future = concurrent.futures.Future()
+                future.set_result(i)
+                yield future
+
+        results = completed(futures(), 3, True)
+        self.assertEqual(next(results), 0)
+        self.assertEqual(len(submitted), 4)
+        self.assertEqual(list(results), list(range(1, 10)))
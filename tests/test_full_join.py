@@ -0,0 +1,61 @@
+import unittest
+from asq.queryables import Queryable
+from helpers import TracingGenerator
+
+__author__ = "Sixty North"
+
+class TestFullJoin(unittest.TestCase):
+
+    def test_full_join(self):
+        a = [1, 2, 3, 5]
+        b = [6, 4, 3, 2, 6, 3]
+        c = Queryable(a).full_join(b).to_list()
+        d = [(1, None), (2, 2), (3, 3), (3, 3), (5, None), (None, 6), (None, 6), (None, 4)]
+        self.assertEqual(c, d)
+
+    def test_full_join_selectors(self):
+        a = [1, 4]
+        b = ['a', 'to', 'I']
+        c = Queryable(a).full_join(b, lambda outer: outer, lambda inner: len(inner),
+                                   lambda outer, inner: str(outer) + ':' + str(inner)).to_list()
+        d = ['1:a', '1:I', '4:None', 'None:to']
+        self.assertEqual(c, d)
+
+    def test_full_join_default(self):
+        a = [1, 2]
+        b = [2, 3]
+        c = Queryable(a).full_join(b, default=0).to_list()
+        d = [(1, 0), (2, 2), (0, 3)]
+        self.assertEqual(c, d)
+
+    def test_full_join_empty(self):
+        self.assertEqual(Queryable([]).full_join([1]).to_list(), [(None, 1)])
+        self.assertEqual(Queryable([1]).full_join([]).to_list(), [(1, None)])
+        self.assertEqual(Queryable([]).full_join([]).to_list(), [])
+
+    def test_full_join_non_iterable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).full_join(None))
+
+    def test_full_join_outer_selector_not_callable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).full_join([1], "not callable"))
+
+    def test_full_join_inner_selector_not_callable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).full_join([1], lambda outer: outer, "not callable"))
+
+    def test_full_join_result_selector_not_callable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).full_join([1], lambda outer: outer,
+                                                                      lambda inner: inner, "not callable"))
+
+    def test_full_join_is_deferred(self):
+        a = TracingGenerator()
+        self.assertEqual(a.trace, [])
+        b = [2, 3]
+        c = Queryable(a).full_join(b)
+        self.assertEqual(a.trace, [])
+        d = c.take(2).to_list()
+        self.assertEqual(d, [(0, None), (1, None)])
+
+    def test_full_join_closed(self):
+        c = Queryable([1, 2, 3])
+        c.close()
+        self.assertRaises(ValueError, lambda: c.full_join([1]))
@@ -0,0 +1,78 @@
+import unittest
+from asq.queryables import Queryable, _Plan
+from helpers import TracingGenerator, infinite
+
+__author__ = "Sixty North"
+
+
+class TestFusion(unittest.TestCase):
+
+    def test_fusion_single_plan(self):
+        a = [1, 2, 3, 4, 5, 6]
+        b = Queryable(a).select(lambda x: x * 2).where(lambda x: x > 4).of_type(int)
+        self.assertTrue(isinstance(b._iterable, _Plan))
+        self.assertEqual(len(b._iterable._stages), 3)
+
+    def test_fusion_select_where(self):
+        a = [1, 2, 3, 4, 5, 6]
+        b = Queryable(a).select(lambda x: x * 3).where(lambda x: x % 2 == 0).select(str).to_list()
+        c = ['6', '12', '18']
+        self.assertEqual(b, c)
+
+    def test_fusion_select_with_index_counts_filtered(self):
+        a = ['a', 'b', 'c', 'd', 'e']
+        b = Queryable(a).where(lambda x: x != 'b').select_with_index().to_list()
+        c = [(0, 'a'), (1, 'c'), (2, 'd'), (3, 'e')]
+        self.assertEqual(b, c)
+
+    def test_fusion_select_with_index_transform(self):
+        a = ['a', 'b', 'c']
+        b = Queryable(a).select(str.upper).select_with_index(lambda i, x: x * (i + 1), ord).to_list()
+        c = [65, 132, 201]
+        self.assertEqual(b, c)
+
+    def test_fusion_take_while_infinite(self):
+        b = Queryable(infinite()).select(lambda x: x * 2).take_while(lambda x: x < 10) \
+                                 .where(lambda x: x % 4 == 0).to_list()
+        c = [0, 4, 8]
+        self.assertEqual(b, c)
+
+    def test_fusion_of_type(self):
+        a = [1, 'two', 3.0, 'four', 5]
+        b = Queryable(a).of_type(str).select(len).to_list()
+        c = [3, 4]
+        self.assertEqual(b, c)
+
+    def test_fusion_is_deferred(self):
+        a = TracingGenerator()
+        b = Queryable(a).select(lambda x: x + 1).where(lambda x: x % 2 == 1).take_while(lambda x: x < 6)
+        self.assertEqual(a.trace, [])
+        c = b.to_list()
+        self.assertEqual(c, [1, 3, 5])
+        self.assertEqual(a.trace, [0, 1, 2, 3, 4, 5, 6])
+
+    def test_fusion_branches_are_independent(self):
+        a = [1, 2, 3, 4]
+        b = Queryable(a).select(lambda x: x * 10)
+        c = b.where(lambda x: x > 20)
+        d = b.where(lambda x: x < 20)
+        self.assertEqual(len(c._iterable._stages), 2)
+        self.assertEqual(len(d._iterable._stages), 2)
+        self.assertEqual(len(b._iterable._stages), 1)
+
+    def test_fusion_take_while_reiteration(self):
+        b = Queryable(iter([1, 2, 5, 1, 2])).take_while(lambda x: x < 3)
+        self.assertEqual(list(b), [1, 2])
+        self.assertEqual(list(b), [])
+
+    def test_fusion_select_with_index_reiteration(self):
+        b = Queryable(iter('abc')).select_with_index()
+        c = iter(b)
+        self.assertEqual(next(c), (0, 'a'))
+        self.assertEqual(list(b), [(1, 'b'), (2, 'c')])
+
+    def test_fusion_after_iteration_commenced(self):
+        b = Queryable(iter('abcd')).select_with_index()
+        self.assertEqual(next(iter(b)), (0, 'a'))
+        c = b.where(lambda x: x[0] != 2)
+        self.assertEqual(c.to_list(), [(1, 'b'), (3, 'd')])
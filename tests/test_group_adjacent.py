@@ -0,0 +1,62 @@
+import itertools
+import unittest
+from asq.queryables import Grouping, Queryable
+
+__author__ = "Sixty North"
+
+
+class TestGroupAdjacent(unittest.TestCase):
+
+    def test_group_adjacent(self):
+        a = ['Agapanthus', 'Allium', 'Bouvardia', 'Carnations', 'Cattleya', 'Allium']
+        b = Queryable(a).group_adjacent(lambda x: x[0]).to_list()
+        self.assertEqual(len(b), 4)
+        self.assertTrue(all(isinstance(g, Grouping) for g in b))
+        self.assertEqual([g.key for g in b], ['A', 'B', 'C', 'A'])
+        self.assertEqual(b[0].to_list(), ['Agapanthus', 'Allium'])
+        self.assertEqual(b[3].to_list(), ['Allium'])
+
+    def test_group_adjacent_sorted_matches_group_by(self):
+        a = sorted([27, 74, 18, 48, 57, 97, 76, 20, 91, 8, 80, 59, 20], key=lambda x: x % 3)
+        b = Queryable(a).group_adjacent(lambda x: x % 3).select(lambda g: (g.key, g.to_list())).to_list()
+        c = Queryable(a).group_by(lambda x: x % 3).select(lambda g: (g.key, g.to_list())).to_list()
+        self.assertEqual(b, c)
+
+    def test_group_adjacent_empty(self):
+        self.assertEqual(Queryable([]).group_adjacent().to_list(), [])
+
+    def test_group_adjacent_infinite(self):
+        b = Queryable(itertools.count()).group_adjacent(lambda x: x // 3).take(2) \
+                                        .select(lambda g: g.to_list()).to_list()
+        self.assertEqual(b, [[0, 1, 2], [3, 4, 5]])
+
+    def test_group_adjacent_streams(self):
+        consumed = []
+
+        def source():
+            for x in [1, 1, 2, 2, 3]:
+                consumed.append(x)
+                yield x
+
+        b = iter(Queryable(source()).group_adjacent())
+        next(b)
+        self.assertEqual(consumed, [1, 1, 2])
+
+    def test_element_selector(self):
+        a = ['aa', 'ab', 'ba']
+        b = Queryable(a).group_adjacent(lambda x: x[0], lambda x: x[1]).select(lambda g: g.to_list()).to_list()
+        self.assertEqual(b, [['a', 'b'], ['a']])
+
+    def test_result_selector(self):
+        b = Queryable('aaabcc').group_adjacent(result_selector=lambda key, group: (key, len(group))).to_list()
+        self.assertEqual(b, [('a', 3), ('b', 1), ('c', 2)])
+
+    def test_not_callable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).group_adjacent("not callable"))
+        self.assertRaises(TypeError, lambda: Queryable([1]).group_adjacent(element_selector="not callable"))
+        self.assertRaises(TypeError, lambda: Queryable([1]).group_adjacent(result_selector="not callable"))
+
+    def test_closed(self):
+        b = Queryable([1])
+        b.close()
+        self.assertRaises(ValueError, lambda: b.group_adjacent())
@@ -73,3 +73,49 @@ class TestGroupBy(unittest.TestCase):
         b = Queryable(a)
         b.close()
         self.assertRaises(ValueError, lambda: b.group_by(lambda x: x[0]))
+
+
+class TestGroupBySpill(unittest.TestCase):
+
+    def setUp(self):
+        self.a = [(i * 7919 % 53, i) for i in range(1000)]
+
+    def expected(self):
+        return Queryable(self.a).group_by(lambda x: x[0], lambda x: x[1],
+                                          lambda key, group: (key, group.to_list())).to_list()
+
+    def test_spill(self):
+        b = Queryable(self.a).group_by(lambda x: x[0], lambda x: x[1],
+                                       lambda key, group: (key, group.to_list()),
+                                       max_items=40).to_list()
+        self.assertEqual(b, self.expected())
+
+    def test_spill_repartitions(self):
+        b = Queryable(self.a).group_by(lambda x: x[0], lambda x: x[1],
+                                       lambda key, group: (key, group.to_list()),
+                                       max_items=5).to_list()
+        self.assertEqual(b, self.expected())
+
+    def test_spill_unordered(self):
+        b = Queryable(self.a).group_by(lambda x: x[0], lambda x: x[1],
+                                       lambda key, group: (key, group.to_list()),
+                                       max_items=40, ordered=False).to_list()
+        self.assertEqual(sorted(b), sorted(self.expected()))
+
+    def test_spill_groupings(self):
+        b = Queryable('abracadabra').group_by(max_items=3).to_list()
+        self.assertTrue(all(isinstance(g, Grouping) for g in b))
+        self.assertEqual([(g.key, g.count()) for g in b], [('a', 5), ('b', 2), ('r', 2), ('c', 1), ('d', 1)])
+
+    def test_spill_fits_in_memory(self):
+        b = Queryable([1, 2, 1]).group_by(max_items=10).select(lambda g: g.to_list()).to_list()
+        self.assertEqual(b, [[1, 1], [2]])
+
+    def test_spill_directory(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            b = Queryable(self.a).group_by(lambda x: x[0], max_items=100, directory=directory).count()
+        self.assertEqual(b, 53)
+
+    def test_spill_invalid(self):
+        self.assertRaises(ValueError, lambda: Queryable([1]).group_by(max_items=0))
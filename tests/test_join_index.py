@@ -0,0 +1,104 @@
+import unittest
+from asq.queryables import JoinIndex, Lookup, Queryable
+
+__author__ = "Sixty North"
+
+class TestJoinIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = 0
+
+    def counting_len(self, item):
+        self.calls += 1
+        return len(item)
+
+    def test_to_join_index(self):
+        a = ['a', 'to', 'I', 'of', 'cat']
+        b = Queryable(a).to_join_index(len)
+        self.assertIsInstance(b, JoinIndex)
+        self.assertEqual(len(b), 3)
+        self.assertIn(2, b)
+        self.assertNotIn(4, b)
+        self.assertEqual(list(b), ['a', 'I', 'to', 'of', 'cat'])
+        self.assertEqual(repr(b), "JoinIndex([(1, ['a', 'I']), (2, ['to', 'of']), (3, ['cat'])])")
+
+    def test_to_join_index_not_callable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).to_join_index("not callable"))
+
+    def test_to_join_index_closed(self):
+        a = Queryable([1])
+        a.close()
+        self.assertRaises(ValueError, lambda: a.to_join_index())
+
+    def test_join_index_create(self):
+        b = JoinIndex(['a', 'to', 'I'], len)
+        self.assertEqual(list(b), ['a', 'I', 'to'])
+
+    def test_join_index_create_default_key(self):
+        b = JoinIndex([3, 1, 3])
+        self.assertEqual(list(b), [3, 3, 1])
+
+    def test_join_index_create_non_iterable(self):
+        self.assertRaises(TypeError, lambda: JoinIndex(None))
+
+    def test_join_index_create_not_callable(self):
+        self.assertRaises(TypeError, lambda: JoinIndex([1], "not callable"))
+
+    def test_lookup_to_join_index(self):
+        lookup = Lookup([(1, 'one'), (2, 'two'), (1, 'uno')])
+        index = lookup.to_join_index()
+        self.assertIs(index._table, lookup._dict)
+        b = Queryable([1, 2, 3]).join(index).to_list()
+        self.assertEqual(b, [(1, 'one'), (1, 'uno'), (2, 'two')])
+
+    def test_lookup_to_join_index_closed(self):
+        lookup = Lookup([(1, 'one')])
+        lookup.close()
+        self.assertRaises(ValueError, lambda: lookup.to_join_index())
+
+    def test_join_index_is_not_rebuilt(self):
+        a = ['a', 'to', 'I', 'of', 'cat']
+        index = Queryable(a).to_join_index(self.counting_len)
+        self.assertEqual(self.calls, 5)
+        for outer in ([1, 2], [3], [2, 4]):
+            Queryable(outer).join(index).to_list()
+            Queryable(outer).group_join(index).to_list()
+            Queryable(outer).left_join(index).to_list()
+            Queryable(outer).full_join(index).to_list()
+        self.assertEqual(self.calls, 5)
+
+    def test_join_with_join_index(self):
+        a = [1, 2, 3]
+        b = ['a', 'I', 'to', 'of', 'be', 'are', 'one', 'cat', 'dog']
+        index = Queryable(b).to_join_index(len)
+        c = Queryable(a).join(index, result_selector=lambda outer, inner: str(outer) + ':' + inner).to_list()
+        d = Queryable(a).join(b, inner_key_selector=len,
+                              result_selector=lambda outer, inner: str(outer) + ':' + inner).to_list()
+        self.assertEqual(c, d)
+
+    def test_join_with_join_index_ignores_inner_key_selector(self):
+        index = JoinIndex(['a', 'to'], len)
+        c = Queryable([2]).join(index, inner_key_selector=lambda inner: 'unused').to_list()
+        self.assertEqual(c, [(2, 'to')])
+
+    def test_group_join_with_join_index(self):
+        a = [1, 2, 4]
+        b = ['a', 'I', 'to', 'of', 'cat']
+        index = JoinIndex(b, len)
+        c = Queryable(a).group_join(index, result_selector=lambda outer, g: (g.key, g.to_list())).to_list()
+        d = Queryable(a).group_join(b, inner_key_selector=len,
+                                    result_selector=lambda outer, g: (g.key, g.to_list())).to_list()
+        self.assertEqual(c, d)
+        self.assertEqual(c, [(1, ['a', 'I']), (2, ['to', 'of']), (4, [])])
+
+    def test_outer_joins_with_join_index(self):
+        a = [1, 2, 3, 5]
+        b = [6, 4, 3, 2, 6, 3]
+        index = JoinIndex(b)
+        self.assertEqual(Queryable(a).left_join(index).to_list(), Queryable(a).left_join(b).to_list())
+        self.assertEqual(Queryable(a).right_join(index).to_list(), Queryable(a).right_join(b).to_list())
+        self.assertEqual(Queryable(a).full_join(index).to_list(), Queryable(a).full_join(b).to_list())
+
+    def test_join_index_as_iterable(self):
+        index = JoinIndex([3, 1, 3])
+        self.assertEqual(Queryable(index).to_list(), [3, 3, 1])
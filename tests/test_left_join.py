@@ -0,0 +1,76 @@
+import unittest
+from asq.queryables import Queryable
+from helpers import infinite, TracingGenerator
+
+__author__ = "Sixty North"
+
+class TestLeftJoin(unittest.TestCase):
+
+    def test_left_join(self):
+        a = [1, 2, 3, 5]
+        b = [6, 4, 3, 2, 6, 3]
+        c = Queryable(a).left_join(b).to_list()
+        d = [(1, None), (2, 2), (3, 3), (3, 3), (5, None)]
+        self.assertEqual(c, d)
+
+    def test_left_join_selectors(self):
+        a = [1, 2, 4]
+        b = ['a', 'to', 'I', 'of', 'cat']
+        c = Queryable(a).left_join(b, lambda outer: outer, lambda inner: len(inner),
+                                   lambda outer, inner: str(outer) + ':' + str(inner)).to_list()
+        d = ['1:a', '1:I', '2:to', '2:of', '4:None']
+        self.assertEqual(c, d)
+
+    def test_left_join_default(self):
+        a = [1, 2, 5]
+        b = [2, 3]
+        c = Queryable(a).left_join(b, default=0).to_list()
+        d = [(1, 0), (2, 2), (5, 0)]
+        self.assertEqual(c, d)
+
+    def test_left_join_empty_inner(self):
+        a = [1, 2]
+        c = Queryable(a).left_join([]).to_list()
+        d = [(1, None), (2, None)]
+        self.assertEqual(c, d)
+
+    def test_left_join_empty_outer(self):
+        c = Queryable([]).left_join([1, 2]).to_list()
+        self.assertEqual(c, [])
+
+    def test_left_join_non_iterable(self):
+        a = [1, 2, 3]
+        b = None
+        self.assertRaises(TypeError, lambda: Queryable(a).left_join(b))
+
+    def test_left_join_outer_selector_not_callable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).left_join([1], "not callable"))
+
+    def test_left_join_inner_selector_not_callable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).left_join([1], lambda outer: outer, "not callable"))
+
+    def test_left_join_result_selector_not_callable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).left_join([1], lambda outer: outer,
+                                                                      lambda inner: inner, "not callable"))
+
+    def test_left_join_infinite(self):
+        a = infinite()
+        b = [2, 3]
+        c = Queryable(a).left_join(b).take(4).to_list()
+        d = [(0, None), (1, None), (2, 2), (3, 3)]
+        self.assertEqual(c, d)
+
+    def test_left_join_is_deferred(self):
+        a = TracingGenerator()
+        self.assertEqual(a.trace, [])
+        b = [2, 3, 4, 5, 6]
+        c = Queryable(a).left_join(b)
+        self.assertEqual(a.trace, [])
+        d = c.take(3).to_list()
+        e = [(0, None), (1, None), (2, 2)]
+        self.assertEqual(d, e)
+
+    def test_left_join_closed(self):
+        c = Queryable([1, 2, 3])
+        c.close()
+        self.assertRaises(ValueError, lambda: c.left_join([1]))
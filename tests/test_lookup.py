@@ -314,3 +314,35 @@ class TestLookup(unittest.TestCase):
 
         self.assertEqual(actual, expected)
 
+
+    def test_lookup_groupings_are_views(self):
+        k_v = [('a', 1), ('b', 2), ('a', 3)]
+        lookup = Lookup(k_v)
+        g1 = lookup['a']
+        g2 = lookup['a']
+        self.assertEqual(g1, g2)
+        self.assertIs(g1._iterable, g2._iterable)
+        self.assertIs(g1._iterable, lookup._dict['a'])
+
+    def test_lookup_iterated_groupings_are_views(self):
+        k_v = [('a', 1), ('b', 2), ('a', 3)]
+        lookup = Lookup(k_v)
+        groupings = lookup.to_list()
+        self.assertEqual([g.key for g in groupings], ['a', 'b'])
+        self.assertIs(groupings[0]._iterable, lookup._dict['a'])
+        self.assertIs(groupings[1]._iterable, lookup._dict['b'])
+
+    def test_lookup_missing_key_groupings_share_items(self):
+        lookup = Lookup([('a', 1)])
+        g1 = lookup['x']
+        g2 = lookup['y']
+        self.assertEqual(g1.key, 'x')
+        self.assertEqual(g2.key, 'y')
+        self.assertEqual(len(g1), 0)
+        self.assertIs(g1._iterable, g2._iterable)
+        self.assertNotIn('x', lookup)
+
+    def test_lookup_closing_grouping_does_not_close_lookup(self):
+        lookup = Lookup([('a', 1), ('a', 2)])
+        lookup['a'].close()
+        self.assertEqual(lookup['a'].to_list(), [1, 2])
@@ -0,0 +1,124 @@
+import unittest
+from asq.queryables import Lookup, LookupBuilder, Queryable
+
+__author__ = "Sixty North"
+
+class TestLookupBuilder(unittest.TestCase):
+
+    def test_lookup_builder_create_empty(self):
+        builder = LookupBuilder()
+        self.assertEqual(len(builder), 0)
+        self.assertEqual(builder.freeze().to_list(), [])
+
+    def test_lookup_builder_create(self):
+        builder = LookupBuilder([('a', 1), ('b', 2), ('a', 3)])
+        self.assertEqual(len(builder), 2)
+        self.assertIn('a', builder)
+        self.assertNotIn('c', builder)
+        self.assertEqual(repr(builder), "LookupBuilder([('a', 1), ('a', 3), ('b', 2)])")
+
+    def test_lookup_builder_add(self):
+        builder = LookupBuilder()
+        result = builder.add('a', 1)
+        self.assertIs(result, builder)
+        builder.add('b', 2).add('a', 3)
+        lookup = builder.freeze()
+        self.assertIsInstance(lookup, Lookup)
+        self.assertEqual(lookup['a'].to_list(), [1, 3])
+        self.assertEqual(lookup['b'].to_list(), [2])
+        self.assertEqual(lookup.select(lambda g: g.key).to_list(), ['a', 'b'])
+
+    def test_lookup_builder_extend(self):
+        builder = LookupBuilder([('a', 1)])
+        builder.extend([('b', 2), ('a', 3)]).extend(iter([('c', 4)]))
+        lookup = builder.freeze()
+        self.assertEqual(repr(lookup), "Lookup([('a', 1), ('a', 3), ('b', 2), ('c', 4)])")
+
+    def test_lookup_builder_extend_invalid(self):
+        builder = LookupBuilder()
+        self.assertRaises(ValueError, lambda: builder.extend([('a',)]))
+
+    def test_lookup_builder_frozen_lookup_unaffected(self):
+        builder = LookupBuilder([('a', 1), ('b', 2)])
+        lookup1 = builder.freeze()
+        builder.add('a', 3)
+        builder.add('c', 4)
+        lookup2 = builder.freeze()
+        builder.extend([('b', 5), ('a', 6)])
+        lookup3 = builder.freeze()
+        self.assertEqual(repr(lookup1), "Lookup([('a', 1), ('b', 2)])")
+        self.assertEqual(repr(lookup2), "Lookup([('a', 1), ('a', 3), ('b', 2), ('c', 4)])")
+        self.assertEqual(repr(lookup3),
+                         "Lookup([('a', 1), ('a', 3), ('a', 6), ('b', 2), ('b', 5), ('c', 4)])")
+
+    def test_lookup_builder_freeze_shares_storage(self):
+        builder = LookupBuilder([('a', 1), ('b', 2)])
+        lookup1 = builder.freeze()
+        lookup2 = builder.freeze()
+        self.assertIs(lookup1._dict, lookup2._dict)
+        builder.add('a', 3)
+        self.assertIsNot(builder._dict, lookup1._dict)
+        self.assertIs(builder._dict['b'], lookup1._dict['b'])
+        self.assertIsNot(builder._dict['a'], lookup1._dict['a'])
+
+    def test_lookup_builder_copies_each_group_once(self):
+        builder = LookupBuilder([('a', 1)])
+        builder.freeze()
+        builder.add('a', 2)
+        values = builder._dict['a']
+        builder.add('a', 3)
+        self.assertIs(builder._dict['a'], values)
+        self.assertEqual(values, [1, 2, 3])
+
+    def test_lookup_builder_merge_lookup(self):
+        builder = LookupBuilder([('a', 1), ('b', 2)])
+        lookup = Lookup([('c', 3), ('a', 4)])
+        builder.merge(lookup)
+        self.assertEqual(repr(builder.freeze()), "Lookup([('a', 1), ('a', 4), ('b', 2), ('c', 3)])")
+        builder.add('c', 5)
+        self.assertEqual(lookup['c'].to_list(), [3])
+
+    def test_lookup_builder_merge_builder(self):
+        builder1 = LookupBuilder([('a', 1)])
+        builder2 = LookupBuilder([('b', 2), ('a', 3)])
+        builder1.merge(builder2)
+        builder2.add('b', 4)
+        self.assertEqual(repr(builder1), "LookupBuilder([('a', 1), ('a', 3), ('b', 2)])")
+
+    def test_lookup_builder_merge_frozen(self):
+        builder = LookupBuilder([('a', 1)])
+        lookup = builder.freeze()
+        builder.merge(Lookup([('a', 2)]))
+        self.assertEqual(lookup['a'].to_list(), [1])
+        self.assertEqual(builder.freeze()['a'].to_list(), [1, 2])
+
+    def test_lookup_builder_merge_self(self):
+        builder = LookupBuilder([('a', 1)])
+        builder.merge(builder)
+        self.assertEqual(repr(builder), "LookupBuilder([('a', 1), ('a', 1)])")
+
+    def test_lookup_builder_merge_invalid(self):
+        builder = LookupBuilder()
+        self.assertRaises(TypeError, lambda: builder.merge([('a', 1)]))
+
+    def test_lookup_builder_merge_closed(self):
+        builder = LookupBuilder()
+        lookup = Lookup([('a', 1)])
+        lookup.close()
+        self.assertRaises(ValueError, lambda: builder.merge(lookup))
+
+    def test_lookup_to_builder(self):
+        lookup = Queryable(['apple', 'avocado', 'banana']).to_lookup(lambda s: s[0])
+        builder = lookup.to_builder()
+        self.assertIs(builder._dict, lookup._dict)
+        builder.add('a', 'apricot').add('c', 'cherry')
+        self.assertEqual(lookup['a'].to_list(), ['apple', 'avocado'])
+        self.assertNotIn('c', lookup)
+        updated = builder.freeze()
+        self.assertEqual(updated['a'].to_list(), ['apple', 'avocado', 'apricot'])
+        self.assertEqual(updated['c'].to_list(), ['cherry'])
+
+    def test_lookup_to_builder_closed(self):
+        lookup = Lookup([('a', 1)])
+        lookup.close()
+        self.assertRaises(ValueError, lambda: lookup.to_builder())
@@ -0,0 +1,77 @@
+import itertools
+import unittest
+from asq.queryables import Queryable
+
+__author__ = "Sixty North"
+
+
+class TestMergeJoin(unittest.TestCase):
+
+    def setUp(self):
+        self.outer = [(1, 'a'), (2, 'b'), (2, 'c'), (4, 'd'), (6, 'e')]
+        self.inner = [(0, 'V'), (2, 'W'), (2, 'X'), (3, 'Y'), (6, 'Z')]
+
+    def join(self, mode):
+        return Queryable(self.outer).merge_join(self.inner, lambda x: x[0], lambda y: y[0],
+                                                lambda x, y: (x and x[1], y and y[1]),
+                                                mode=mode).to_list()
+
+    def test_inner(self):
+        self.assertEqual(self.join('inner'),
+                         [('b', 'W'), ('b', 'X'), ('c', 'W'), ('c', 'X'), ('e', 'Z')])
+
+    def test_inner_matches_join(self):
+        a = [3, 5, 5, 8, 9, 12]
+        b = [2, 5, 5, 9, 9, 14]
+        self.assertEqual(Queryable(a).merge_join(b).to_list(), Queryable(a).join(b).to_list())
+
+    def test_left(self):
+        self.assertEqual(self.join('left'),
+                         [('a', None), ('b', 'W'), ('b', 'X'), ('c', 'W'), ('c', 'X'),
+                          ('d', None), ('e', 'Z')])
+
+    def test_full(self):
+        self.assertEqual(self.join('full'),
+                         [(None, 'V'), ('a', None), ('b', 'W'), ('b', 'X'), ('c', 'W'),
+                          ('c', 'X'), (None, 'Y'), ('d', None), ('e', 'Z')])
+
+    def test_full_trailing_inner(self):
+        b = Queryable([1]).merge_join([1, 2, 3], mode='full').to_list()
+        self.assertEqual(b, [(1, 1), (None, 2), (None, 3)])
+
+    def test_default(self):
+        b = Queryable([1, 2]).merge_join([2], mode='left', default=0).to_list()
+        self.assertEqual(b, [(1, 0), (2, 2)])
+
+    def test_empty(self):
+        self.assertEqual(Queryable([]).merge_join([1, 2], mode='full').to_list(), [(None, 1), (None, 2)])
+        self.assertEqual(Queryable([1]).merge_join([], mode='left').to_list(), [(1, None)])
+        self.assertEqual(Queryable([1]).merge_join([]).to_list(), [])
+
+    def test_infinite(self):
+        b = Queryable(itertools.count()).merge_join(itertools.count(0, 3)).take(3).to_list()
+        self.assertEqual(b, [(0, 0), (3, 3), (6, 6)])
+
+    def test_unsorted_outer(self):
+        b = Queryable([1, 3, 2]).merge_join([1, 2, 3])
+        self.assertRaises(ValueError, lambda: b.to_list())
+
+    def test_unsorted_inner(self):
+        b = Queryable([1, 2, 3]).merge_join([3, 1])
+        self.assertRaises(ValueError, lambda: b.to_list())
+
+    def test_invalid_mode(self):
+        self.assertRaises(ValueError, lambda: Queryable([1]).merge_join([1], mode='right'))
+
+    def test_non_iterable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).merge_join(5))
+
+    def test_not_callable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).merge_join([1], "not callable"))
+        self.assertRaises(TypeError, lambda: Queryable([1]).merge_join([1], inner_key_selector="not callable"))
+        self.assertRaises(TypeError, lambda: Queryable([1]).merge_join([1], result_selector="not callable"))
+
+    def test_closed(self):
+        b = Queryable([1])
+        b.close()
+        self.assertRaises(ValueError, lambda: b.merge_join([1]))
@@ -158,3 +158,152 @@ class TestOrderBy(unittest.TestCase):
         b.close()
         self.assertRaises(ValueError, lambda: b.then_by_descending(lambda x: x[1]))
 
+
+    def test_mixed_directions_stability(self):
+        a = [(1, 'b', 0), (2, 'a', 1), (1, 'a', 2), (2, 'b', 3), (1, 'b', 4), (2, 'a', 5)]
+        b = Queryable(a).order_by_descending(lambda x: x[0]).then_by(lambda x: x[1]).to_list()
+        c = [(2, 'a', 1), (2, 'a', 5), (2, 'b', 3), (1, 'a', 2), (1, 'b', 0), (1, 'b', 4)]
+        self.assertEqual(b, c)
+
+    def test_order_by_take_prefix(self):
+        a = ['sort', 'using', 'third', 'letter', 'then', 'second']
+        b = Queryable(a).order_by(lambda x: x[2]).then_by_descending(lambda y: y[1]).take(3).to_list()
+        c = ['second', 'then', 'using']
+        self.assertEqual(b, c)
+
+    def test_order_by_first(self):
+        a = [27, 74, 18, 48, 57, 97, 76, 20, 91, 8, 80, 59, 20, 32, 58, 12, 74, 78, 4]
+        b = Queryable(a).order_by_descending().first()
+        self.assertEqual(b, 97)
+
+    def test_order_by_first_empty(self):
+        self.assertRaises(ValueError, lambda: Queryable([]).order_by().first())
+
+    def test_order_by_first_or_default_empty(self):
+        b = Queryable([]).order_by().first_or_default(42)
+        self.assertEqual(b, 42)
+
+    def test_order_by_take_stability(self):
+        a = [(3, 'a'), (1, 'b'), (3, 'c'), (1, 'd'), (2, 'e'), (1, 'f')]
+        b = Queryable(a).order_by(lambda x: x[0]).take(4).to_list()
+        c = [(1, 'b'), (1, 'd'), (1, 'f'), (2, 'e')]
+        self.assertEqual(b, c)
+
+    def test_order_by_descending_take_stability(self):
+        a = [(3, 'a'), (1, 'b'), (3, 'c'), (1, 'd'), (2, 'e'), (1, 'f')]
+        b = Queryable(a).order_by_descending(lambda x: x[0]).take(3).to_list()
+        c = [(3, 'a'), (3, 'c'), (2, 'e')]
+        self.assertEqual(b, c)
+
+    def test_order_by_take_matches_full_sort(self):
+        a = [(i * 7919 % 13, i * 104729 % 7, i) for i in range(200)]
+        q = lambda: Queryable(a).order_by(lambda x: x[0]).then_by_descending(lambda x: x[1])
+        for count in (0, 1, 5, 50, 300):
+            self.assertEqual(q().take(count).to_list(), q().to_list()[:count])
+
+    def test_order_by_first_predicate(self):
+        a = [27, 74, 18, 48, 57, 97, 76, 20, 91, 8, 80, 59, 20, 32, 58, 12, 74, 78, 4]
+        b = Queryable(a).order_by().first(lambda x: x > 50)
+        self.assertEqual(b, 57)
+
+    def test_order_by_first_or_default_predicate(self):
+        a = [27, 74, 18, 48, 57, 97, 76, 20, 91, 8, 80, 59, 20, 32, 58, 12, 74, 78, 4]
+        b = Queryable(a).order_by().first_or_default(-1, lambda x: x > 100)
+        self.assertEqual(b, -1)
+
+    def test_order_by_take_while(self):
+        a = [27, 74, 18, 48, 57, 97, 76, 20, 91, 8, 80, 59, 20, 32, 58, 12, 74, 78, 4]
+        b = Queryable(a).order_by().take_while(lambda x: x < 20).to_list()
+        c = [4, 8, 12, 18]
+        self.assertEqual(b, c)
+
+
+class TestOrderBySpill(unittest.TestCase):
+
+    def setUp(self):
+        self.a = [(i * 7919 % 13, i * 104729 % 7, i) for i in range(500)]
+
+    def test_spill(self):
+        b = Queryable(self.a).order_by(lambda x: x[0]).spill(64).to_list()
+        c = Queryable(self.a).order_by(lambda x: x[0]).to_list()
+        self.assertEqual(b, c)
+
+    def test_spill_mixed_directions_stability(self):
+        q = lambda: Queryable(self.a).order_by_descending(lambda x: x[0]).then_by(lambda x: x[1])
+        self.assertEqual(q().spill(37).to_list(), q().to_list())
+
+    def test_spill_descending_stability(self):
+        q = lambda: Queryable(self.a).order_by_descending(lambda x: x[1]).then_by_descending(lambda x: x[0])
+        self.assertEqual(q().spill(10).to_list(), q().to_list())
+
+    def test_spill_multiple_merge_levels(self):
+        import asq.queryables
+        fan_in = asq.queryables.MERGE_FAN_IN
+        asq.queryables.MERGE_FAN_IN = 3
+        try:
+            b = Queryable(self.a).order_by(lambda x: x[1]).spill(7).to_list()
+        finally:
+            asq.queryables.MERGE_FAN_IN = fan_in
+        c = Queryable(self.a).order_by(lambda x: x[1]).to_list()
+        self.assertEqual(b, c)
+
+    def test_spill_merge_failure_closes_runs(self):
+        import asq._spill
+        import asq.queryables
+        runs = []
+
+        class TracingRun(asq._spill.Run):
+            def __init__(self, directory=None):
+                super(TracingRun, self).__init__(directory)
+                runs.append(self)
+
+        calls = itertools.count()
+
+        def key(x):
+            # Fail during the first merge pass, after some runs are merged
+            if next(calls) == len(self.a) + 200:
+                raise RuntimeError
+            return x[1]
+
+        fan_in = asq.queryables.MERGE_FAN_IN
+        run_class = asq._spill.Run
+        asq.queryables.MERGE_FAN_IN = 3
+        asq._spill.Run = TracingRun
+        try:
+            b = Queryable(self.a).order_by(key).spill(7)
+            self.assertRaises(RuntimeError, lambda: b.to_list())
+        finally:
+            asq.queryables.MERGE_FAN_IN = fan_in
+            asq._spill.Run = run_class
+        self.assertTrue(len(runs) > len(self.a) // 7 + 1)
+        self.assertTrue(all(run._file is None or run._file.closed
+                            for run in runs))
+
+    def test_spill_fits_in_memory(self):
+        b = Queryable([3, 1, 2]).order_by().spill(10).to_list()
+        self.assertEqual(b, [1, 2, 3])
+
+    def test_spill_exact_multiple(self):
+        b = Queryable(range(20, 0, -1)).order_by().spill(5).to_list()
+        self.assertEqual(b, list(range(1, 21)))
+
+    def test_spill_empty(self):
+        self.assertEqual(Queryable([]).order_by().spill(5).to_list(), [])
+
+    def test_spill_take_while(self):
+        b = Queryable(range(100, 0, -1)).order_by().spill(8).take_while(lambda x: x < 5).to_list()
+        self.assertEqual(b, [1, 2, 3, 4])
+
+    def test_spill_directory(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            b = Queryable(range(30, 0, -1)).order_by().spill(4, directory).to_list()
+        self.assertEqual(b, list(range(1, 31)))
+
+    def test_spill_invalid(self):
+        self.assertRaises(ValueError, lambda: Queryable([1]).order_by().spill(0))
+
+    def test_spill_closed(self):
+        b = Queryable([1]).order_by()
+        b.close()
+        self.assertRaises(ValueError, lambda: b.spill(10))
@@ -1,56 +1,353 @@
-# import sys
-# import unittest
-# from asq.queryables import Queryable, identity
-# from asq.test.test_queryable import times, inc_chr, times_two
-#
-# if not sys.platform == 'cli':
-#
-#
-#     class TestParallelQueryable(unittest.TestCase):
-#
-#         def test_parallel_select(self):
-#             a = [27, 74, 18, 48, 57, 97, 76, 20, 91, 8, 80, 59, 20, 32, 58, 12, 74, 78, 4]
-#             with Queryable(a) as q:
-#                 b = q.as_parallel().select(times_two).to_list()
-#             c = [54, 148, 36, 96, 114, 194, 152, 40, 182, 16, 160, 118, 40, 64, 116, 24, 148, 156, 8]
-#             self.assertEqual(len(b), len(c))
-#             self.assertEqual(set(b), set(c))
-#
-#         def test_parallel_select_with_index_finite(self):
-#             a = [27, 74, 18, 48, 57, 97, 76, 20, 91, 8, 80, 59, 20, 32, 58, 12, 74, 78, 4]
-#             with Queryable(a) as q:
-#                 b = q.as_parallel().select_with_index(times).to_list()
-#             c = [0, 74, 36, 144, 228, 485, 456, 140, 728, 72, 800, 649, 240, 416, 812, 180, 1184, 1326, 72]
-#             self.assertEqual(len(b), len(c))
-#             self.assertEqual(set(b), set(c))
-#
-#         def test_parallel_select_many_projector_finite(self):
-#             a = ['fox', 'kangaroo', 'bison', 'bear']
-#             with Queryable(a) as q:
-#                 b = q.as_parallel().select_many(identity).to_list()
-#             c = ['f', 'o', 'x', 'k', 'a', 'n', 'g', 'a', 'r', 'o', 'o', 'b', 'i', 's', 'o', 'n', 'b', 'e', 'a', 'r']
-#             self.assertEqual(sorted(b), sorted(c))
-#
-#         def test_parallel_select_many_projector_selector_finite(self):
-#             a = ['fox', 'kangaroo', 'bison', 'bear']
-#             with Queryable(a) as q:
-#                 b = q.as_parallel().select_many(identity, inc_chr).to_list()
-#             c = ['g', 'p', 'y', 'l', 'b', 'o', 'h', 'b', 's', 'p', 'p', 'c', 'j', 't', 'p', 'o', 'c', 'f', 'b', 's']
-#             self.assertEqual(len(b), len(c))
-#             self.assertEqual(set(b), set(c))
-#
-#         def test_parallel_order_by(self):
-#             a = [27, 74, 18, 48, 57, 97, 76, 20, 91, 8, 80, 59, 20, 32, 58, 12, 74, 78, 4]
-#             with Queryable(a) as q:
-#                 b = q.as_parallel().order_by().to_list()
-#             c = [4, 8, 12, 18, 20, 20, 27, 32, 48, 57, 58, 59, 74, 74, 76, 78, 80, 91, 97]
-#             self.assertEqual(b, c)
-#
-#         #def test_parallel_order_by(self):
-#         #    with Queryable(randgen()) as q:
-#         #        a = q.as_parallel().take(1000000).order_by().to_list
-#
-#
-# if __name__ == '__main__':
-#     suite = unittest.TestLoader().loadTestsFromTestCase(TestParallelQueryable)
-#     unittest.TextTestRunner(verbosity=2).run(suite)
+import gc
+import operator
+import os
+import sys
+import time
+import unittest
+from asq.queryables import Queryable, identity
+from asq.parallel_queryable import ParallelQueryable
+from helpers import times, inc_chr, times_two, infinite, TracingGenerator
+
+__author__ = "Sixty North"
+
+if not sys.platform == 'cli':
+
+    def sleepy_negate(x):
+        # Later elements complete sooner, so completion order differs from
+        # source order
+        time.sleep(0.001 * (10 - x % 10))
+        return -x
+
+    class TestParallelQueryable(unittest.TestCase):
+
+        def test_parallel_select(self):
+            a = [27, 74, 18, 48, 57, 97, 76, 20, 91, 8, 80, 59, 20, 32, 58, 12, 74, 78, 4]
+            with Queryable(a) as q:
+                b = q.as_parallel().select(times_two).to_list()
+            c = [54, 148, 36, 96, 114, 194, 152, 40, 182, 16, 160, 118, 40, 64, 116, 24, 148, 156, 8]
+            self.assertEqual(len(b), len(c))
+            self.assertEqual(set(b), set(c))
+
+        def test_parallel_select_with_index_finite(self):
+            a = [27, 74, 18, 48, 57, 97, 76, 20, 91, 8, 80, 59, 20, 32, 58, 12, 74, 78, 4]
+            with Queryable(a) as q:
+                b = q.as_parallel().select_with_index(times).to_list()
+            c = [0, 74, 36, 144, 228, 485, 456, 140, 728, 72, 800, 649, 240, 416, 812, 180, 1184, 1326, 72]
+            self.assertEqual(len(b), len(c))
+            self.assertEqual(set(b), set(c))
+
+        def test_parallel_select_many_projector_finite(self):
+            a = ['fox', 'kangaroo', 'bison', 'bear']
+            with Queryable(a) as q:
+                b = q.as_parallel().select_many(identity).to_list()
+            c = ['f', 'o', 'x', 'k', 'a', 'n', 'g', 'a', 'r', 'o', 'o', 'b', 'i', 's', 'o', 'n', 'b', 'e', 'a', 'r']
+            self.assertEqual(sorted(b), sorted(c))
+
+        def test_parallel_select_many_projector_selector_finite(self):
+            a = ['fox', 'kangaroo', 'bison', 'bear']
+            with Queryable(a) as q:
+                b = q.as_parallel().select_many(identity, inc_chr).to_list()
+            c = ['g', 'p', 'y', 'l', 'b', 'o', 'h', 'b', 's', 'p', 'p', 'c', 'j', 't', 'p', 'o', 'c', 'f', 'b', 's']
+            self.assertEqual(len(b), len(c))
+            self.assertEqual(set(b), set(c))
+
+        def test_parallel_order_by(self):
+            a = [27, 74, 18, 48, 57, 97, 76, 20, 91, 8, 80, 59, 20, 32, 58, 12, 74, 78, 4]
+            with Queryable(a) as q:
+                b = q.as_parallel().order_by().to_list()
+            c = [4, 8, 12, 18, 20, 20, 27, 32, 48, 57, 58, 59, 74, 74, 76, 78, 80, 91, 97]
+            self.assertEqual(b, c)
+
+        def test_parallel_order_by_stability(self):
+            a = [(3, 'a'), (1, 'b'), (3, 'c'), (1, 'd'), (2, 'e'), (1, 'f')] * 5
+            with Queryable(a) as q:
+                b = q.as_parallel(backend='thread').order_by(lambda x: x[0]).to_list()
+            c = sorted(a, key=lambda x: x[0])
+            self.assertEqual(b, c)
+
+        def test_parallel_as_sequential(self):
+            with Queryable([1, 2, 3]) as q:
+                b = q.as_parallel().as_sequential()
+                self.assertEqual(type(b), Queryable)
+                self.assertEqual(sorted(b), [1, 2, 3])
+
+    class TestOrderedParallelQueryable(unittest.TestCase):
+
+        def test_ordered_select(self):
+            a = list(range(40))
+            with Queryable(a) as q:
+                b = q.as_parallel(backend='thread').as_ordered().select(sleepy_negate).to_list()
+            self.assertEqual(b, [-x for x in a])
+
+        def test_ordered_is_ordered(self):
+            with Queryable([1]) as q:
+                p = q.as_parallel(backend='thread')
+                self.assertFalse(p.is_ordered())
+                self.assertTrue(p.as_ordered().is_ordered())
+                self.assertFalse(p.as_ordered().as_unordered().is_ordered())
+
+        def test_ordered_mode_propagates(self):
+            with Queryable(range(40)) as q:
+                b = q.as_parallel(backend='thread').as_ordered() \
+                     .select(sleepy_negate).where(lambda x: x % 3 == 0).to_list()
+            self.assertEqual(b, [-x for x in range(40) if x % 3 == 0])
+
+        def test_ordered_select_with_index(self):
+            a = ['a', 'b', 'c', 'd', 'e']
+            with Queryable(a) as q:
+                b = q.as_parallel(backend='thread').as_ordered() \
+                     .select_with_index(lambda i, x: x * (i + 1)).to_list()
+            self.assertEqual(b, ['a', 'bb', 'ccc', 'dddd', 'eeeee'])
+
+        def test_ordered_select_many(self):
+            a = ['fox', 'kangaroo', 'bison', 'bear']
+            with Queryable(a) as q:
+                b = q.as_parallel(backend='thread').as_ordered().select_many(identity, inc_chr).to_str()
+            self.assertEqual(b, 'gpylbohbsppcjtpocfbs')
+
+        def test_ordered_select_many_with_index(self):
+            a = ['fox', 'bear']
+            with Queryable(a) as q:
+                b = q.as_parallel(backend='thread').as_ordered() \
+                     .select_many_with_index(lambda i, x: [i] * len(x)).to_list()
+            self.assertEqual(b, [0, 0, 0, 1, 1, 1, 1])
+
+        def test_ordered_select_many_with_correspondence(self):
+            a = ['ab', 'c']
+            with Queryable(a) as q:
+                b = q.as_parallel(backend='thread').as_ordered() \
+                     .select_many_with_correspondence(list, lambda x, y: x + y).to_list()
+            self.assertEqual(b, ['aba', 'abb', 'cc'])
+
+        def test_ordered_infinite(self):
+            with Queryable(infinite()) as q:
+                b = q.as_parallel(backend='thread').as_ordered().select(times_two).take(10).to_list()
+            self.assertEqual(b, [0, 2, 4, 6, 8, 10, 12, 14, 16, 18])
+
+        def test_ordered_bounded_buffer(self):
+            a = TracingGenerator()
+            with ParallelQueryable(a, chunksize=5, backend='thread') as q:
+                b = iter(q.as_ordered(max_in_flight=2).select(times_two))
+                self.assertEqual(next(b), 0)
+            self.assertTrue(len(a.trace) <= 15)
+
+        def test_ordered_invalid_max_in_flight(self):
+            with Queryable([1, 2, 3]) as q:
+                p = q.as_parallel(backend='thread').as_ordered(max_in_flight=0)
+                self.assertRaises(ValueError, lambda: p.select(times_two))
+
+        def test_unordered_all_results(self):
+            a = list(range(40))
+            with Queryable(a) as q:
+                b = q.as_parallel(backend='thread').as_unordered().select(sleepy_negate).to_list()
+            self.assertEqual(sorted(b), sorted(-x for x in a))
+
+    class TestParallelGrouping(unittest.TestCase):
+
+        def test_parallel_to_lookup(self):
+            a = ['apple', 'kiwi', 'banana', 'fig', 'cherry', 'plum', 'pear', 'date']
+            with Queryable(a) as q:
+                b = q.as_parallel().to_lookup(len)
+            c = Queryable(a).to_lookup(len)
+            self.assertEqual(list(b), list(c))
+            self.assertEqual([g.key for g in b], [5, 4, 6, 3])
+
+        def test_parallel_to_lookup_first_occurrence_order(self):
+            a = [(i * 7919) % 23 for i in range(500)]
+            with ParallelQueryable(a, chunksize=7, backend='thread') as q:
+                b = q.to_lookup(lambda x: x % 5, lambda x: -x)
+            c = Queryable(a).to_lookup(lambda x: x % 5, lambda x: -x)
+            self.assertEqual([g.key for g in b], [g.key for g in c])
+            self.assertEqual(list(b), list(c))
+
+        def test_parallel_to_lookup_unordered_mode(self):
+            a = list(range(200))
+            with ParallelQueryable(a, chunksize=3, backend='thread') as q:
+                b = q.as_unordered().to_lookup(lambda x: x % 3)
+            self.assertEqual([g.key for g in b], [0, 1, 2])
+            self.assertEqual(b[1].to_list(), list(range(1, 200, 3)))
+
+        def test_parallel_to_lookup_closed(self):
+            q = Queryable([1, 2, 3]).as_parallel(backend='thread')
+            q.close()
+            self.assertRaises(ValueError, lambda: q.to_lookup())
+
+        def test_parallel_to_lookup_non_callable(self):
+            with Queryable([1, 2, 3]) as q:
+                p = q.as_parallel(backend='thread')
+                self.assertRaises(TypeError, lambda: p.to_lookup("not callable"))
+                self.assertRaises(TypeError, lambda: p.to_lookup(identity, "not callable"))
+
+        def test_parallel_group_by(self):
+            a = ['a', 'b', 'c', 'a', 'c', 'c', 'd']
+            with ParallelQueryable(a, chunksize=2, backend='thread') as q:
+                b = q.group_by(result_selector=lambda key, group: (key, group.count())).to_list()
+            self.assertEqual(b, [('a', 2), ('b', 1), ('c', 3), ('d', 1)])
+
+    class TestParallelReduction(unittest.TestCase):
+
+        def test_parallel_aggregate(self):
+            a = list(range(1, 101))
+            with Queryable(a) as q:
+                b = q.as_parallel().aggregate(operator.add)
+            self.assertEqual(b, 5050)
+
+        def test_parallel_aggregate_non_commutative(self):
+            a = [chr(ord('a') + i % 26) for i in range(1000)]
+            with ParallelQueryable(a, chunksize=3, backend='thread') as q:
+                b = q.as_unordered().aggregate(operator.add)
+            self.assertEqual(b, ''.join(a))
+
+        def test_parallel_aggregate_seed(self):
+            a = [1, 2, 3, 4]
+            with ParallelQueryable(a, chunksize=1, backend='thread') as q:
+                b = q.aggregate(operator.add, 100, str)
+            self.assertEqual(b, '110')
+
+        def test_parallel_aggregate_seed_empty(self):
+            with ParallelQueryable([], backend='thread') as q:
+                b = q.aggregate(operator.add, 42)
+            self.assertEqual(b, 42)
+
+        def test_parallel_aggregate_empty(self):
+            with ParallelQueryable([], backend='thread') as q:
+                self.assertRaises(ValueError, lambda: q.aggregate(operator.add))
+
+        def test_parallel_aggregate_single(self):
+            with ParallelQueryable([7], backend='thread') as q:
+                b = q.aggregate(operator.add)
+            self.assertEqual(b, 7)
+
+        def test_parallel_aggregate_combiner(self):
+            a = ['fox', 'kangaroo', 'bison', 'bear'] * 50
+            with ParallelQueryable(a, chunksize=3, backend='thread') as q:
+                b = q.aggregate(lambda acc, x: acc + len(x), 0, combiner=operator.add)
+            self.assertEqual(b, 20 * 50)
+
+        def test_parallel_aggregate_non_callable(self):
+            with ParallelQueryable([1, 2], backend='thread') as q:
+                self.assertRaises(TypeError, lambda: q.aggregate("not callable"))
+                self.assertRaises(TypeError, lambda: q.aggregate(operator.add, combiner="not callable"))
+                self.assertRaises(TypeError, lambda: q.aggregate(operator.add, result_selector="not callable"))
+
+        def test_parallel_aggregate_closed(self):
+            q = ParallelQueryable([1, 2], backend='thread')
+            q.close()
+            self.assertRaises(ValueError, lambda: q.aggregate(operator.add))
+
+        def test_parallel_aggregate_many_levels(self):
+            a = list(range(10000))
+            with ParallelQueryable(a, chunksize=2, backend='thread') as q:
+                b = q.aggregate(operator.add)
+            self.assertEqual(b, sum(a))
+
+        def test_parallel_sum(self):
+            a = list(range(1000))
+            with Queryable(a) as q:
+                b = q.as_parallel().sum(times_two)
+            self.assertEqual(b, 999000)
+
+        def test_parallel_sum_empty(self):
+            with ParallelQueryable([], backend='thread') as q:
+                self.assertEqual(q.sum(), 0)
+
+        def test_parallel_min_max(self):
+            a = [27, 74, 18, 48, 57, 97, 76, 20, 91, 8, 80, 59, 20, 32, 58, 12, 74, 78, 4]
+            with ParallelQueryable(a, chunksize=4, backend='thread') as q:
+                self.assertEqual(q.min(), 4)
+            with ParallelQueryable(a, chunksize=4, backend='thread') as q:
+                self.assertEqual(q.max(lambda x: -x), -4)
+
+        def test_parallel_min_max_empty(self):
+            with ParallelQueryable([], backend='thread') as q:
+                self.assertRaises(ValueError, lambda: q.min())
+                self.assertRaises(ValueError, lambda: q.max())
+
+        def test_parallel_count(self):
+            with ParallelQueryable(range(100), chunksize=7, backend='thread') as q:
+                self.assertEqual(q.count(lambda x: x % 3 == 0), 34)
+
+        def test_parallel_count_no_predicate(self):
+            with ParallelQueryable(x for x in range(100)) as q:
+                self.assertEqual(q.count(), 100)
+
+        def test_parallel_count_non_callable(self):
+            with ParallelQueryable(range(100), backend='thread') as q:
+                self.assertRaises(TypeError, lambda: q.count("not callable"))
+
+        def test_parallel_average(self):
+            with ParallelQueryable(range(1, 101), chunksize=9, backend='thread') as q:
+                self.assertEqual(q.average(), 50.5)
+
+        def test_parallel_average_empty(self):
+            with ParallelQueryable([], backend='thread') as q:
+                self.assertRaises(ValueError, lambda: q.average())
+
+    class TestParallelJoin(unittest.TestCase):
+
+        outer = [27, 74, 18, 48, 57, 97, 76, 20, 91, 8, 80, 59, 20, 32, 58, 12, 74, 78, 4]
+        inner = ['zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten']
+
+        def test_parallel_join(self):
+            with ParallelQueryable(self.outer, chunksize=4, ordered=True) as q:
+                b = q.join(self.inner, mod_eleven, len).to_list()
+            c = Queryable(self.outer).join(self.inner, mod_eleven, len).to_list()
+            self.assertEqual(b, c)
+
+        def test_parallel_join_thread(self):
+            with ParallelQueryable(self.outer, chunksize=4, backend='thread') as q:
+                b = q.as_ordered().join(self.inner, lambda x: x % 11, len,
+                                        lambda x, y: '{0}:{1}'.format(x, y)).to_list()
+            c = Queryable(self.outer).join(self.inner, lambda x: x % 11, len,
+                                           lambda x, y: '{0}:{1}'.format(x, y)).to_list()
+            self.assertEqual(b, c)
+
+        def test_parallel_join_unordered(self):
+            with ParallelQueryable(self.outer, chunksize=2, backend='thread') as q:
+                b = q.join(self.inner, lambda x: x % 11, len).to_list()
+            c = Queryable(self.outer).join(self.inner, lambda x: x % 11, len).to_list()
+            self.assertEqual(sorted(b), sorted(c))
+
+        def test_parallel_join_non_callable(self):
+            with ParallelQueryable(self.outer, backend='thread') as q:
+                self.assertRaises(TypeError, lambda: q.join(self.inner, "not callable"))
+                self.assertRaises(TypeError, lambda: q.join(5))
+
+        def test_parallel_group_join(self):
+            with ParallelQueryable(self.outer, chunksize=4, ordered=True) as q:
+                b = q.group_join(self.inner, mod_eleven, len).to_list()
+            c = Queryable(self.outer).group_join(self.inner, mod_eleven, len).to_list()
+            self.assertEqual(b, c)
+            self.assertEqual(b[0].key, 5)
+
+        def test_parallel_group_join_result_selector(self):
+            with ParallelQueryable(self.outer, chunksize=4, backend='thread', ordered=True) as q:
+                b = q.group_join(self.inner, lambda x: x % 11, len,
+                                 lambda x, g: (x, g.count())).to_list()
+            self.assertEqual(b[:4], [(27, 3), (74, 0), (18, 0), (48, 4)])
+
+        def test_parallel_join_join_index(self):
+            index = Queryable(self.inner).to_join_index(len)
+            with ParallelQueryable(self.outer, chunksize=4, backend='thread', ordered=True) as q:
+                b = q.join(index, lambda x: x % 11).to_list()
+            c = Queryable(self.outer).join(self.inner, lambda x: x % 11, len).to_list()
+            self.assertEqual(b, c)
+
+        def test_parallel_join_join_index_shared_once(self):
+            import asq.parallel_queryable
+            shared_indexes = asq.parallel_queryable._shared_indexes
+            index = Queryable(self.inner).to_join_index(len)
+            c = Queryable(self.outer).join(self.inner, mod_eleven, len).to_list()
+            with ParallelQueryable(self.outer, chunksize=4, ordered=True) as q:
+                self.assertEqual(q.join(index, mod_eleven).to_list(), c)
+            token = shared_indexes[index].token
+            with ParallelQueryable(self.outer, chunksize=4, ordered=True) as q:
+                self.assertEqual(q.join(index, mod_eleven).to_list(), c)
+            self.assertTrue(shared_indexes[index].token is token)
+            self.assertTrue(os.path.exists(token[1]))
+            del index
+            gc.collect()
+            self.assertFalse(os.path.exists(token[1]))
+
+    def mod_eleven(x):
+        return x % 11
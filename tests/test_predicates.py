@@ -1,6 +1,11 @@
+import operator
+import pickle
 import unittest
 from asq.predicates import (eq_, ne_, lt_, le_, ge_, gt_, is_, contains_, not_,
-                                and_, or_, xor_)
+                                and_, or_, xor_, attr_, Predicate, Constant,
+                                compile_predicate)
+from asq.record import new
+from asq.queryables import Queryable
 from asq.selectors import identity
 
 __author__ = "Sixty North"
@@ -165,3 +170,186 @@ class TestXor(unittest.TestCase):
 
 
 
+
+class TestAttr(unittest.TestCase):
+
+    def test_attr_positive(self):
+        self.assertTrue(attr_('x', gt_(3))(new(x=5)))
+
+    def test_attr_negative(self):
+        self.assertFalse(attr_('x', gt_(3))(new(x=2)))
+
+    def test_attr_opaque(self):
+        self.assertTrue(attr_('name', str.isupper)(new(name='ABC')))
+
+    def test_attr_introspection(self):
+        p = gt_(3)
+        a = attr_('x', p)
+        self.assertIs(a.operator, getattr)
+        self.assertEqual(a.operands, ('x', p))
+        self.assertEqual(repr(a), "attr_('x', gt_(3))")
+
+    def test_attr_compile(self):
+        a = and_(attr_('x', and_(ne_(None), gt_(1))), attr_('y', str.isupper))
+        f = a.compile()
+        self.assertTrue(f(new(x=2, y='A')))
+        self.assertFalse(f(new(x=None, y='A')))
+        self.assertFalse(f(new(x=2, y='a')))
+
+    def test_attr_nested(self):
+        a = attr_('inner', attr_('x', eq_(1)))
+        self.assertTrue(a.compile()(new(inner=new(x=1))))
+
+    def test_attr_simplify(self):
+        a = attr_('x', and_(gt_(1), not_(gt_(1))))
+        self.assertEqual(a.simplify().operands, (False,))
+
+    def test_attr_pickle(self):
+        a = pickle.loads(pickle.dumps(attr_('x', lt_(5))))
+        self.assertTrue(a(new(x=4)))
+
+    def test_attr_invalid_name(self):
+        self.assertRaises(ValueError, lambda: attr_('not valid', gt_(1)))
+        self.assertRaises(ValueError, lambda: attr_('class', gt_(1)))
+
+    def test_attr_not_callable(self):
+        self.assertRaises(TypeError, lambda: attr_('x', 5))
+
+
+class TestIntrospection(unittest.TestCase):
+
+    def test_comparison(self):
+        a = lt_(5)
+        self.assertIs(a.operator, operator.lt)
+        self.assertEqual(a.operands, (5,))
+
+    def test_contains(self):
+        a = contains_('x')
+        self.assertIs(a.operator, operator.contains)
+        self.assertEqual(a.operands, ('x',))
+        self.assertTrue(a('xyz'))
+
+    def test_combinator(self):
+        p = gt_(1)
+        q = lt_(3)
+        a = and_(p, not_(q))
+        self.assertIs(a.operator, operator.and_)
+        self.assertIs(a.operands[0], p)
+        self.assertIs(a.operands[1].operator, operator.not_)
+        self.assertIs(a.operands[1].operands[0], q)
+
+
+class TestPredicateExpressions(unittest.TestCase):
+
+    def test_callable(self):
+        self.assertTrue(isinstance(lt_(5), Predicate))
+        self.assertTrue(callable(and_(lt_(5), gt_(1))))
+
+    def test_repr(self):
+        a = or_(and_(lt_(5), not_(eq_('a'))), contains_(3))
+        self.assertEqual(repr(a), "or_(and_(lt_(5), not_(eq_('a'))), contains_(3))")
+
+    def test_pickle(self):
+        a = or_(and_(ge_(2), not_(is_(None))), xor_(contains_(1), ne_(4)))
+        a.compile()
+        b = pickle.loads(pickle.dumps(a))
+        self.assertEqual(repr(b), repr(a))
+
+    def test_simplify_double_negation(self):
+        p = lt_(5)
+        self.assertIs(not_(not_(p)).simplify(), p)
+
+    def test_simplify_duplicate(self):
+        self.assertEqual(repr(and_(lt_(5), lt_(5)).simplify()), 'lt_(5)')
+        self.assertEqual(repr(or_(eq_('a'), eq_('a')).simplify()), "eq_('a')")
+        self.assertEqual(repr(xor_(gt_(1), gt_(1)).simplify()), 'Constant(False)')
+
+    def test_simplify_complement(self):
+        self.assertEqual(repr(and_(lt_(5), not_(lt_(5))).simplify()), 'Constant(False)')
+        self.assertEqual(repr(or_(not_(lt_(5)), lt_(5)).simplify()), 'Constant(True)')
+
+    def test_simplify_constants(self):
+        p = gt_(1)
+        self.assertIs(and_(p, Constant(True)).simplify(), p)
+        self.assertIs(or_(Constant(False), p).simplify(), p)
+        self.assertEqual(repr(not_(and_(Constant(False), p)).simplify()), 'Constant(True)')
+
+    def test_simplify_keeps_opaque_duplicates(self):
+        f = lambda x: x > 2
+        for a in (and_(f, f), or_(f, f), and_(f, not_(f)), or_(not_(f), f),
+                  xor_(f, f), and_(not_(f), not_(f))):
+            self.assertIs(a.simplify(), a)
+
+    def test_simplify_keeps_evaluated_opaque_operands(self):
+        f = lambda x: x > 2
+        a = and_(f, Constant(False))
+        self.assertIs(a.simplify(), a)
+        b = or_(attr_('real', f), Constant(True))
+        self.assertIs(b.simplify(), b)
+        self.assertEqual(repr(and_(Constant(False), f).simplify()), 'Constant(False)')
+        self.assertEqual(repr(and_(gt_(1), Constant(False)).simplify()), 'Constant(False)')
+
+    def test_where_calls_opaque_operands(self):
+        calls = []
+
+        def f(x):
+            calls.append(x)
+            return x > 2
+
+        a = Queryable(range(5)).where(and_(f, not_(f))).to_list()
+        self.assertEqual(a, [])
+        self.assertEqual(calls, [0, 1, 2, 3, 3, 4, 4])
+
+        def g(x):
+            raise ZeroDivisionError
+
+        b = Queryable(range(5)).where(and_(g, not_(g)))
+        self.assertRaises(ZeroDivisionError, lambda: b.to_list())
+
+    def test_simplify_distinguishes_types(self):
+        a = and_(eq_(1), eq_(1.0)).simplify()
+        self.assertEqual(repr(a), 'and_(eq_(1), eq_(1.0))')
+
+    def test_simplify_unchanged(self):
+        a = and_(lt_(5), gt_(1))
+        self.assertIs(a.simplify(), a)
+
+    def test_cost(self):
+        self.assertEqual(lt_(5).cost(), 1)
+        self.assertTrue(and_(lt_(5), lambda x: True).cost() > and_(lt_(5), gt_(1)).cost())
+
+    def test_reorder(self):
+        f = lambda x: x % 2 == 0
+        a = and_(f, lt_(5)).reorder()
+        self.assertEqual(a.operands[0].operator, operator.lt)
+        self.assertIs(a.operands[1], f)
+
+    def test_compile(self):
+        f = lambda x: x % 3 == 0
+        a = or_(and_(ge_(2), not_(eq_(4))), xor_(f, gt_(8)))
+        b = a.compile()
+        self.assertFalse(isinstance(b, Predicate))
+        for x in range(12):
+            self.assertEqual(bool(b(x)), bool(a(x)))
+        self.assertIs(a.compile(), b)
+
+    def test_compile_reorder(self):
+        f = lambda x: x % 3 == 0
+        a = and_(f, lt_(7))
+        b = a.compile(reorder=True)
+        self.assertEqual([x for x in range(12) if b(x)], [0, 3, 6])
+
+    def test_compile_contains_and_is(self):
+        marker = object()
+        a = or_(is_(marker), contains_('e')).compile()
+        self.assertTrue(a('bee'))
+        self.assertTrue(a(marker))
+        self.assertFalse(a('ant'))
+
+    def test_compile_predicate_opaque(self):
+        f = lambda x: x
+        self.assertIs(compile_predicate(f), f)
+
+    def test_where(self):
+        a = Queryable(range(20)).where(and_(gt_(3), lt_(9))).to_list()
+        self.assertEqual(a, [4, 5, 6, 7, 8])
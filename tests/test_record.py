@@ -1,7 +1,8 @@
 import unittest
 import pickle
 
-from asq.record import Record, new
+from asq.record import (Record, SlottedRecord, new, new_slotted, record_type,
+                        RECORD_TYPE_CACHE_SIZE, _record_type)
 
 __author__ = "Sixty North"
 
@@ -73,10 +74,105 @@ class TestRecord(unittest.TestCase):
     def test_new_create_empty(self):
         r = new()
 
+    def test_new_is_record(self):
+        r = new(x=10)
+        self.assertTrue(type(r) is Record)
+        r.y = 20
+        self.assertEqual(r, Record(x=10, y=20))
+
+    def test_new_slotted(self):
+        r = new_slotted(x=10, y=20)
+        self.assertTrue(isinstance(r, SlottedRecord))
+        self.assertFalse(hasattr(r, '__dict__'))
+
+    def test_new_slotted_set_attribute(self):
+        r = new_slotted(x=10, y=20)
+        r.x = 15
+        self.assertEqual(r.x, 15)
+
+    def test_new_slotted_add_attribute_error(self):
+        r = new_slotted(x=10)
+        def add():
+            r.y = 20
+        self.assertRaises(AttributeError, add)
+
+    def test_new_slotted_invalid_identifier(self):
+        r = new_slotted(**{'not valid': 10})
+        self.assertTrue(type(r) is Record)
+
+    def test_new_slotted_reserved_names(self):
+        for name in ('__eq__', '__dict__', '__private', '_record_fields'):
+            r = new_slotted(**{name: 10})
+            self.assertTrue(type(r) is Record)
+            self.assertEqual(r.__dict__[name], 10)
+
+    def test_new_slotted_is_not_record(self):
+        self.assertFalse(isinstance(new_slotted(x=10), Record))
+
+    def test_new_slotted_type_name(self):
+        self.assertEqual(type(new_slotted(x=1, y=2)).__name__, 'SlottedRecord_x_y')
+
+    def test_new_slotted_type_cached(self):
+        self.assertTrue(type(new_slotted(x=1, y=2)) is type(new_slotted(x=3, y=4)))
+        self.assertFalse(type(new_slotted(x=1, y=2)) is type(new_slotted(y=2, x=1)))
+
+    def test_new_slotted_equality(self):
+        self.assertTrue(new_slotted(x=10, y=20) == new_slotted(x=10, y=20))
+        self.assertTrue(new_slotted(x=10, y=20) == new_slotted(y=20, x=10))
+        self.assertFalse(new_slotted(x=10, y=20) == new_slotted(x=10, y=30))
+        self.assertFalse(new_slotted(x=10) == new_slotted(x=10, y=20))
+        self.assertTrue(new_slotted(x=10, y=20) != new_slotted(x=10, y=30))
+
+    def test_new_slotted_equality_with_record(self):
+        self.assertTrue(new_slotted(x=10, y=20) == Record(x=10, y=20))
+        self.assertTrue(Record(x=10, y=20) == new_slotted(x=10, y=20))
+        self.assertTrue(Record(x=10, y=20) != new_slotted(x=10, y=30))
+
+    def test_new_slotted_str_repr(self):
+        r = new_slotted(x=20, y='a')
+        self.assertEqual(str(r), "Record(x=20, y=a)")
+        self.assertEqual(repr(r), "Record(x=20, y='a')")
+        self.assertEqual(repr(r), repr(Record(x=20, y='a')))
+
+    def test_new_slotted_pickle_roundtrip(self):
+        a = new_slotted(x=20, y=80, z=50)
+        b = pickle.loads(pickle.dumps(a))
+        self.assertEqual(a, b)
+        self.assertTrue(type(a) is type(b))
+
+
+class TestRecordType(unittest.TestCase):
+
+    def test_record_type(self):
+        cls = record_type(['a', 'b'])
+        r = cls(a=1, b=2)
+        self.assertEqual((r.a, r.b), (1, 2))
 
+    def test_record_type_positional_error(self):
+        cls = record_type(['a', 'b'])
+        self.assertRaises(TypeError, lambda: cls(1, 2))
 
+    def test_record_type_missing_field(self):
+        cls = record_type(['a', 'b'])
+        self.assertRaises(TypeError, lambda: cls(a=1))
 
+    def test_record_type_invalid_name(self):
+        self.assertRaises(ValueError, lambda: record_type(['a', 'class']))
+        self.assertRaises(ValueError, lambda: record_type(['a b']))
 
+    def test_record_type_duplicate_name(self):
+        self.assertRaises(ValueError, lambda: record_type(['a', 'a']))
 
+    def test_record_type_reserved_name(self):
+        for name in ('self', '__eq__', '__dict__', '__private', '_record_values'):
+            self.assertRaises(ValueError, lambda: record_type(['a', name]))
 
+    def test_record_type_cache_is_bounded(self):
+        for i in range(RECORD_TYPE_CACHE_SIZE + 10):
+            record_type(['f{0}'.format(i)])
+        self.assertEqual(_record_type.cache_info().currsize, RECORD_TYPE_CACHE_SIZE)
 
+    def test_record_type_evicted_equality(self):
+        r = new_slotted(evicted=1)
+        _record_type.cache_clear()
+        self.assertEqual(r, new_slotted(evicted=1))
@@ -0,0 +1,72 @@
+import unittest
+from asq.queryables import Queryable
+from helpers import TracingGenerator
+
+__author__ = "Sixty North"
+
+class TestRightJoin(unittest.TestCase):
+
+    def test_right_join(self):
+        a = [1, 2, 3, 5]
+        b = [6, 4, 3, 2, 6, 3]
+        c = Queryable(a).right_join(b).to_list()
+        d = [(2, 2), (3, 3), (3, 3), (None, 6), (None, 6), (None, 4)]
+        self.assertEqual(c, d)
+
+    def test_right_join_selectors(self):
+        a = [1, 4]
+        b = ['a', 'to', 'I', 'of', 'cat']
+        c = Queryable(a).right_join(b, lambda outer: outer, lambda inner: len(inner),
+                                    lambda outer, inner: str(outer) + ':' + inner).to_list()
+        d = ['1:a', '1:I', 'None:to', 'None:of', 'None:cat']
+        self.assertEqual(c, d)
+
+    def test_right_join_default(self):
+        a = [1, 2]
+        b = [2, 3]
+        c = Queryable(a).right_join(b, default=0).to_list()
+        d = [(2, 2), (0, 3)]
+        self.assertEqual(c, d)
+
+    def test_right_join_duplicate_outer(self):
+        a = [2, 2]
+        b = [2, 3]
+        c = Queryable(a).right_join(b).to_list()
+        d = [(2, 2), (2, 2), (None, 3)]
+        self.assertEqual(c, d)
+
+    def test_right_join_empty_outer(self):
+        c = Queryable([]).right_join([1, 2]).to_list()
+        d = [(None, 1), (None, 2)]
+        self.assertEqual(c, d)
+
+    def test_right_join_empty_inner(self):
+        c = Queryable([1, 2]).right_join([]).to_list()
+        self.assertEqual(c, [])
+
+    def test_right_join_non_iterable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).right_join(None))
+
+    def test_right_join_outer_selector_not_callable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).right_join([1], "not callable"))
+
+    def test_right_join_inner_selector_not_callable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).right_join([1], lambda outer: outer, "not callable"))
+
+    def test_right_join_result_selector_not_callable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).right_join([1], lambda outer: outer,
+                                                                       lambda inner: inner, "not callable"))
+
+    def test_right_join_is_deferred(self):
+        a = TracingGenerator()
+        self.assertEqual(a.trace, [])
+        b = [2, 3]
+        c = Queryable(a).right_join(b)
+        self.assertEqual(a.trace, [])
+        d = c.take(1).to_list()
+        self.assertEqual(d, [(2, 2)])
+
+    def test_right_join_closed(self):
+        c = Queryable([1, 2, 3])
+        c.close()
+        self.assertRaises(ValueError, lambda: c.right_join([1]))
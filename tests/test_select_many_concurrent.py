@@ -0,0 +1,122 @@
+import asyncio
+import unittest
+from asq.queryables import Queryable
+from asq._concurrent import BUFFER_SIZE
+from helpers import TracingGenerator
+
+__author__ = "Sixty North"
+
+
+async def children(x):
+    await asyncio.sleep(0.001 * (5 - x % 5))
+    return [x, x * 10]
+
+
+async def async_children(x):
+    for i in range(3):
+        await asyncio.sleep(0.001 * (3 - x))
+        yield (x, i)
+
+
+class TestSelectManyConcurrent(unittest.TestCase):
+
+    def test_select_many_concurrent_coroutine(self):
+        a = list(range(10))
+        b = Queryable(a).select_many_concurrent(children, 4).to_list()
+        c = Queryable(a).select_many(lambda x: [x, x * 10]).to_list()
+        self.assertEqual(sorted(b), sorted(c))
+
+    def test_select_many_concurrent_ordered(self):
+        a = list(range(10))
+        b = Queryable(a).select_many_concurrent(children, 4, ordered=True).to_list()
+        c = Queryable(a).select_many(lambda x: [x, x * 10]).to_list()
+        self.assertEqual(b, c)
+
+    def test_select_many_concurrent_async_iterable_interleaves(self):
+        b = Queryable([0, 1, 2]).select_many_concurrent(async_children, 3).to_list()
+        self.assertEqual(sorted(b), [(x, i) for x in range(3) for i in range(3)])
+        self.assertNotEqual(b, [(x, i) for x in range(3) for i in range(3)])
+
+    def test_select_many_concurrent_async_iterable_ordered(self):
+        b = Queryable([0, 1, 2]).select_many_concurrent(async_children, 3, ordered=True).to_list()
+        self.assertEqual(b, [(x, i) for x in range(3) for i in range(3)])
+
+    def test_select_many_concurrent_sync_iterable(self):
+        b = Queryable(['ab', 'c']).select_many_concurrent(list, ordered=True).to_list()
+        self.assertEqual(b, ['a', 'b', 'c'])
+
+    def test_select_many_concurrent_is_concurrent(self):
+        in_flight = 0
+        peak = 0
+
+        async def slow(x):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return [x]
+
+        b = Queryable(range(10)).select_many_concurrent(slow, 10).to_list()
+        self.assertEqual(sorted(b), list(range(10)))
+        self.assertEqual(peak, 10)
+
+    def test_select_many_concurrent_ordered_buffer_is_bounded(self):
+        produced = []
+
+        async def project(x):
+            if x == 0:
+                await asyncio.sleep(0.01)
+                yield len(produced)
+                return
+            for i in range(10 * BUFFER_SIZE):
+                produced.append(i)
+                yield i
+
+        b = Queryable(range(2)).select_many_concurrent(project, 2, ordered=True)
+        c = b.to_list()
+        self.assertTrue(c[0] <= BUFFER_SIZE + 1)
+        self.assertEqual(c[1:], list(range(10 * BUFFER_SIZE)))
+
+    def test_select_many_concurrent_bounded(self):
+        in_flight = 0
+        peak = 0
+
+        async def project(x):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            return [x]
+
+        Queryable(range(20)).select_many_concurrent(project, 3).to_list()
+        self.assertEqual(peak, 3)
+
+    def test_select_many_concurrent_is_deferred(self):
+        a = TracingGenerator()
+        b = Queryable(a).select_many_concurrent(children, 2)
+        self.assertEqual(a.trace, [])
+        c = b.take(4).to_list()
+        self.assertEqual(len(c), 4)
+        self.assertTrue(len(a.trace) <= 4)
+
+    def test_select_many_concurrent_exception(self):
+        async def fail(x):
+            if x == 3:
+                raise ZeroDivisionError
+            return [x]
+
+        b = Queryable(range(5)).select_many_concurrent(fail, 2)
+        self.assertRaises(ZeroDivisionError, lambda: b.to_list())
+
+    def test_select_many_concurrent_closed(self):
+        a = Queryable([1])
+        a.close()
+        self.assertRaises(ValueError, lambda: a.select_many_concurrent(children))
+
+    def test_select_many_concurrent_non_callable(self):
+        self.assertRaises(TypeError, lambda: Queryable([1]).select_many_concurrent("not callable"))
+
+    def test_select_many_concurrent_invalid_concurrency(self):
+        self.assertRaises(ValueError, lambda: Queryable([1]).select_many_concurrent(children, 0))
@@ -1,5 +1,7 @@
 import unittest
-from asq.selectors import k_, a_, m_, identity
+from asq.initiators import query
+from asq.selectors import (k_, a_, m_, identity, make_selector, project,
+                           selector_field)
 
 __author__ = "Sixty North"
 
@@ -83,4 +85,89 @@ class TestIdentity(unittest.TestCase):
 
     def test_identity(self):
         sentinel = object()
-        self.assertTrue(identity(sentinel) is sentinel)
\ No newline at end of file
+        self.assertTrue(identity(sentinel) is sentinel)
+
+class _Row(object):
+
+    def __init__(self, x, items):
+        self.x = x
+        self.items = items
+
+    def __getitem__(self, index):
+        return 'r'
+
+    def strip(self):
+        return 'row'
+
+
+class TestProject(unittest.TestCase):
+
+    class Point(object):
+
+        def __init__(self, x, y, label):
+            self.x = x
+            self.y = y
+            self.label = label
+
+    def test_project(self):
+        projection = project(a_('x'), k_(0), m_('strip'))
+        self.assertEqual(projection(_Row(x=5, items=[' a '])), (5, 'r', 'row'))
+
+    def test_mixed_selectors(self):
+        projection = project(a_('label'), lambda p: p.x * 10, 'y')
+        self.assertEqual(projection(TestProject.Point(1, 2, 'z')), ('z', 10, 2))
+
+    def test_inlined_kinds(self):
+        projection = project(k_(0), k_(1, 2), m_('count', 'a'), m_('upper'))
+        self.assertEqual(projection('aab'), ('a', ('a', 'b'), 2, 'AAB'))
+
+    def test_method_keyword_arguments(self):
+        projection = project(m_('split', sep=','), m_('split', ',', maxsplit=1))
+        self.assertEqual(projection('a,b,c'), (['a', 'b', 'c'], ['a', 'b,c']))
+
+    def test_dotted_attributes(self):
+        p = TestProject.Point(TestProject.Point(5, 6, None), 2, 'q')
+        projection = project(a_('x.y', 'label'), 'x.x')
+        self.assertEqual(projection(p), ((6, 'q'), 5))
+
+    def test_empty(self):
+        self.assertRaises(ValueError, lambda: project())
+        self.assertRaises(ValueError, lambda: make_selector(()))
+        self.assertRaises(ValueError, lambda: project('x', ()))
+
+    def test_nested(self):
+        projection = project(['a'], (['b'], (['c'],)))
+        self.assertEqual(projection(dict(a=1, b=2, c=3)), (1, (2, (3,))))
+        self.assertEqual(projection.fields, ('a', ('b', ('c',))))
+
+    def test_fields(self):
+        projection = project(a_('x'), k_(0), m_('strip'), len, k_(1, 2))
+        self.assertEqual(projection.fields, ('x', 0, 'strip', None, (1, 2)))
+
+    def test_errors_propagate(self):
+        projection = project(k_('missing'))
+        self.assertRaises(KeyError, lambda: projection({}))
+        self.assertRaises(AttributeError, lambda: project('missing')(object()))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, lambda: project(5))
+
+    def test_make_selector_tuple(self):
+        selector = make_selector(('x', ['k']))
+        self.assertEqual(selector.fields, ('x', 'k'))
+
+    def test_select_tuple(self):
+        a = [TestProject.Point(1, 2, 'a'), TestProject.Point(3, 4, 'b')]
+        self.assertEqual(query(a).select(('x', 'label')).to_list(), [(1, 'a'), (3, 'b')])
+
+
+class TestSelectorField(unittest.TestCase):
+
+    def test_single(self):
+        self.assertEqual(selector_field(a_('x')), 'x')
+        self.assertEqual(selector_field(k_(3)), 3)
+        self.assertEqual(selector_field(m_('strip')), 'strip')
+        self.assertEqual(selector_field(a_('x', 'y')), ('x', 'y'))
+
+    def test_opaque(self):
+        self.assertEqual(selector_field(len), None)
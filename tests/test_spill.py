@@ -0,0 +1,33 @@
+import unittest
+
+from asq._spill import BLOCK_SIZE, Run, write_run
+
+__author__ = "Sixty North"
+
+
+class TestRun(unittest.TestCase):
+
+    def test_write_run(self):
+        a = list(range(BLOCK_SIZE * 2 + 5))
+        run = write_run(a)
+        self.assertEqual(len(run), len(a))
+        self.assertEqual(list(run), a)
+        run.close()
+
+    def test_append(self):
+        run = Run()
+        run.write(['a', 'b'])
+        run.write([])
+        run.write([('c', 1)])
+        self.assertEqual(list(run), ['a', 'b', ('c', 1)])
+        self.assertEqual(list(run), ['a', 'b', ('c', 1)])
+        run.close()
+
+    def test_empty(self):
+        run = write_run([])
+        self.assertEqual(len(run), 0)
+        self.assertEqual(list(run), [])
+        run.close()
+
+    def test_unpicklable(self):
+        self.assertRaises(Exception, lambda: write_run([lambda x: x]))
@@ -93,3 +93,11 @@ class TestToLookup(unittest.TestCase):
         b = Queryable(a)
         b.close()
         self.assertRaises(ValueError, lambda: b.to_lookup())
+
+    def test_to_lookup_value_selector(self):
+        a = ['Aardvark', 'Balloon', 'Baboon', 'Carrot']
+        b = Queryable(a).to_lookup(lambda x: x[0], len)
+        self.assertEqual(b['A'].to_list(), [8])
+        self.assertEqual(b['B'].to_list(), [7, 6])
+        self.assertEqual(b['C'].to_list(), [6])
+        self.assertEqual(b.select(lambda g: g.key).to_list(), ['A', 'B', 'C'])
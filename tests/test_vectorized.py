@@ -0,0 +1,138 @@
+import array
+import unittest
+
+from asq.queryables import Queryable, Lookup, Grouping
+from asq.predicates import lt_, gt_, ge_, eq_, and_, or_, not_
+from asq.selectors import k_
+from asq.vectorized import VectorizedQueryable
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__author__ = "Sixty North"
+
+
+class TestVectorizedFallback(unittest.TestCase):
+
+    def test_as_vectorized(self):
+        b = Queryable([1, 2, 3]).as_vectorized()
+        self.assertTrue(isinstance(b, VectorizedQueryable))
+
+    def test_as_vectorized_closed(self):
+        a = Queryable([1, 2, 3])
+        a.close()
+        self.assertRaises(ValueError, lambda: a.as_vectorized())
+
+    def test_as_vectorized_ordered(self):
+        b = Queryable([3, 1, 2]).order_by().as_vectorized().to_list()
+        self.assertEqual(b, [1, 2, 3])
+
+    def test_as_vectorized_ordered_descending(self):
+        b = Queryable([3, 1, 2]).order_by_descending().then_by().as_vectorized()
+        self.assertEqual(b.where(lambda x: x > 1).to_list(), [3, 2])
+
+    def test_as_vectorized_lookup(self):
+        lookup = Lookup([('a', 1), ('b', 2), ('a', 3)])
+        b = lookup.as_vectorized().to_list()
+        self.assertEqual(b, [Grouping('a', [1, 3]), Grouping('b', [2])])
+
+    def test_list_is_not_vectorized(self):
+        b = Queryable([1, 2, 3]).as_vectorized()
+        self.assertFalse(b.is_vectorized())
+
+    def test_fallback_where_sum(self):
+        a = [3.0, 1.5, 7.25, 2.0]
+        b = Queryable(a).as_vectorized().where(lt_(5)).sum()
+        self.assertEqual(b, 6.5)
+
+    def test_fallback_lambda(self):
+        a = array.array('i', [1, 2, 3, 4])
+        b = Queryable(a).as_vectorized().where(lambda x: x % 2 == 0).select(lambda x: x * 10).to_list()
+        self.assertEqual(b, [20, 40])
+
+    def test_fallback_key_selector(self):
+        a = [{'v': 1}, {'v': 4}]
+        b = Queryable(a).as_vectorized().max(k_('v'))
+        self.assertEqual(b, 4)
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestVectorized(unittest.TestCase):
+
+    def setUp(self):
+        self.a = numpy.array([3.0, 1.5, 7.25, 2.0, 9.5, 4.0])
+
+    def test_is_vectorized(self):
+        b = Queryable(self.a).as_vectorized()
+        self.assertTrue(b.is_vectorized())
+
+    def test_buffer_protocol_is_not_vectorized(self):
+        b = Queryable(array.array('q', [1, 2, 3])).as_vectorized()
+        self.assertFalse(b.is_vectorized())
+        self.assertEqual(b.to_list(), [1, 2, 3])
+        self.assertEqual([type(x) for x in b.to_list()], [int] * 3)
+        c = Queryable(array.array('q', [2 ** 62, 2 ** 62])).as_vectorized()
+        self.assertEqual(c.sum(), 2 ** 63)
+
+    def test_elements_are_python_objects(self):
+        b = Queryable(numpy.arange(3)).as_vectorized()
+        self.assertEqual([type(x) for x in b.to_list()], [int] * 3)
+        c = b.where(lambda x: x > 0).to_list()
+        self.assertEqual([type(x) for x in c], [int] * 2)
+
+    def test_integer_sum_does_not_overflow(self):
+        a = numpy.array([2 ** 62, 2 ** 62, 5], dtype=numpy.int64)
+        self.assertEqual(Queryable(a).as_vectorized().sum(), 2 ** 63 + 5)
+        b = numpy.array([-2 ** 62, -2 ** 62, -1], dtype=numpy.int64)
+        self.assertEqual(Queryable(b).as_vectorized().sum(), -2 ** 63 - 1)
+        c = numpy.array([2 ** 63, 2 ** 63], dtype=numpy.uint64)
+        self.assertEqual(Queryable(c).as_vectorized().sum(), 2 ** 64)
+        self.assertEqual(Queryable(numpy.arange(10)).as_vectorized().sum(), 45)
+
+    def test_where_is_vectorized(self):
+        b = Queryable(self.a).as_vectorized().where(gt_(2.5))
+        self.assertTrue(b.is_vectorized())
+        self.assertEqual(b.to_list(), [3.0, 7.25, 9.5, 4.0])
+
+    def test_where_combinators(self):
+        predicate = or_(and_(ge_(2.0), not_(gt_(4.0))), eq_(9.5))
+        b = Queryable(self.a).as_vectorized().where(predicate)
+        self.assertTrue(b.is_vectorized())
+        self.assertEqual(b.to_list(), [x for x in self.a.tolist() if predicate(x)])
+
+    def test_where_lambda_falls_back(self):
+        b = Queryable(self.a).as_vectorized().where(lambda x: x > 2.5)
+        self.assertFalse(b.is_vectorized())
+        self.assertEqual(list(b), [3.0, 7.25, 9.5, 4.0])
+
+    def test_reductions(self):
+        b = Queryable(self.a).as_vectorized()
+        self.assertEqual(b.sum(), 27.25)
+        self.assertEqual(b.min(), 1.5)
+        self.assertEqual(b.max(), 9.5)
+        self.assertAlmostEqual(b.average(), 27.25 / 6)
+        self.assertEqual(b.count(lt_(3.0)), 2)
+        self.assertTrue(type(b.sum()) is float)
+
+    def test_reductions_empty(self):
+        b = Queryable(numpy.array([], dtype=float)).as_vectorized()
+        self.assertEqual(b.sum(), 0.0)
+        self.assertRaises(ValueError, lambda: b.average())
+        self.assertRaises(ValueError, lambda: b.min())
+        self.assertRaises(ValueError, lambda: b.max())
+
+    def test_structured_array(self):
+        a = numpy.array([(1, 2.5), (2, 0.5), (3, 4.0)], dtype=[('id', 'i4'), ('value', 'f8')])
+        b = Queryable(a).as_vectorized()
+        self.assertEqual(b.sum(k_('value')), 7.0)
+        c = b.select(k_('value')).where(gt_(1.0))
+        self.assertTrue(c.is_vectorized())
+        self.assertEqual(c.to_list(), [2.5, 4.0])
+
+    def test_two_dimensional_column(self):
+        a = numpy.array([[1, 10], [2, 20], [3, 30]])
+        b = Queryable(a).as_vectorized()
+        self.assertEqual(b.max(k_(1)), 30)
+        self.assertEqual(b.select([0]).sum(), 6)